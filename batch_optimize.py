@@ -0,0 +1,202 @@
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional
+
+from ilp.incumbents import JsonLinesWriter
+from ilp.model import Model
+from ilp.solution_cache import SolutionCache
+from ilp.solver_backend import BACKENDS, GUROBI
+from nn.movement_duration_nn import MovementDurationNN
+from nn.movement_energy_nn import MovementEnergyNN
+from nn.position_nn import PositionNN
+from utils.json import read_json_from_file, save_to_json_file
+from utils.result_file import save_columns
+from utils.validation import check_cell
+
+RESULT_SUFFIX = '_result.json'
+RESULT_SUFFIXES = {
+    'json': RESULT_SUFFIX,
+    'npz': '_result.npz',
+}
+INCUMBENTS_SUFFIX = '_incumbents.jsonl'
+
+SUMMARY_COLUMNS = ['file', 'status', 'activities', 'build_time', 'solve_time', 'objective', 'mip_gap']
+
+
+def find_cell_files(path: str, exclude: Iterable[str] = ()) -> List[str]:
+    """
+    Returns sorted robotic cell files in the given directory or matching the given glob pattern.
+    Result files and given excluded files (e.g. the summary file of a previous run) are skipped.
+    """
+    pattern = os.path.join(path, '*.json') if os.path.isdir(path) else path
+    excluded = {os.path.abspath(f) for f in exclude}
+    return sorted(
+        f for f in glob.glob(pattern)
+        if not f.endswith(RESULT_SUFFIX) and os.path.abspath(f) not in excluded
+    )
+
+
+def result_filename(input_filename: str, result_format: str = 'json') -> str:
+    return '{}{}'.format(os.path.splitext(input_filename)[0], RESULT_SUFFIXES[result_format])
+
+
+def summary_row(input_filename: str, status: str = 'ok') -> Dict:
+    return {'file': input_filename, 'status': status, 'activities': 0, 'build_time': None, 'solve_time': None,
+            'objective': None, 'mip_gap': None, 'variables': None, 'binaries': None, 'constraints': None}
+
+
+def optimize_cell(
+    input_filename: str,
+    threads: int = 1,
+    bulk: bool = True,
+    result_format: str = 'json',
+    time_limit: Optional[float] = None,
+    mip_gap: Optional[float] = None,
+    stream: bool = False,
+    cache_dir: Optional[str] = None,
+    presolve: bool = True,
+    backend: str = GUROBI,
+) -> Dict:
+    """
+    Loads, validates, optimizes and saves the result of one robotic cell file with given solver backend
+    and collision presolve (see Model.load_from_json). The solver uses at most given number of threads and stops
+    at given time limit or MIP gap. Returns a summary row with build time, solve time, objective, MIP gap
+    and model size.
+
+    The result is saved as a rounded JSON file or, for 'npz' result format, as a columnar binary file with full
+    precision values and the summary row as its metadata (see utils.result_file). If stream is True, each improved
+    solution is appended to a JSON-lines file next to the input as soon as it is found. If a cache directory
+    is given, solutions are shared through a solution cache in it, so semantically identical cells are solved
+    only once (see ilp.solution_cache).
+    """
+    row = summary_row(input_filename)
+    try:
+        cache = SolutionCache(cache_dir) if cache_dir is not None else None
+        model = Model(PositionNN(), MovementEnergyNN(), MovementDurationNN(), backend=backend, solution_cache=cache)
+        model.backend.set_params(threads=threads, output=False)
+
+        cell_json = read_json_from_file(input_filename)
+        # rejects invalid files before any expensive preprocessing, all errors are reported at once
+        check_cell(cell_json)
+
+        start = time.perf_counter()
+        model.load_from_json(cell_json, bulk=bulk, presolve=presolve)
+        # also registers pending changes of the model with the solver
+        statistics = model.backend.statistics()
+        row['build_time'] = time.perf_counter() - start
+        row.update(statistics)
+        row['activities'] = len(model.activities)
+
+        start = time.perf_counter()
+        if stream:
+            with JsonLinesWriter('{}{}'.format(os.path.splitext(input_filename)[0], INCUMBENTS_SUFFIX)) as writer:
+                model.optimize(time_limit=time_limit, mip_gap=mip_gap, on_incumbent=writer)
+        else:
+            model.optimize(time_limit=time_limit, mip_gap=mip_gap)
+        row['solve_time'] = time.perf_counter() - start
+
+        if model.cached_entry is not None:
+            row['status'] = 'ok (cached)'
+            row['objective'] = model.cached_entry['objective']
+            row['mip_gap'] = model.cached_entry['mip_gap']
+        elif not model.backend.has_solution():
+            row['status'] = 'no solution (status {})'.format(model.backend.status())
+            return row
+        else:
+            row['objective'] = model.backend.objective_value()
+            row['mip_gap'] = model.backend.mip_gap()
+        if result_format == 'npz':
+            # columns keep full precision of the solution, only the JSON result is rounded
+            save_columns(result_filename(input_filename, result_format), model.solution_columns(),
+                         dict(row, cycle_time=model.cycle_time))
+        else:
+            save_to_json_file(result_filename(input_filename, result_format), model.solution_json_dict())
+    except Exception as e:
+        row['status'] = 'error: {}'.format(repr(e))
+    return row
+
+
+def batch_optimize(
+    input_filenames: List[str],
+    workers: int = 1,
+    threads: int = 1,
+    bulk: bool = True,
+    result_format: str = 'json',
+    time_limit: Optional[float] = None,
+    mip_gap: Optional[float] = None,
+    stream: bool = False,
+    cache_dir: Optional[str] = None,
+    presolve: bool = True,
+    backend: str = GUROBI,
+) -> List[Dict]:
+    """
+    Optimizes given robotic cell files in a pool of worker processes, each solver run uses at most given number
+    of threads. Each result file is saved as soon as its cell is optimized. Returns summary rows in input order.
+    See optimize_cell for the other arguments. If a worker process dies (e.g. it runs out of memory),
+    its cells get an error row and the other rows are still returned.
+    """
+    rows: Dict[str, Dict] = dict()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                optimize_cell, f, threads, bulk, result_format, time_limit, mip_gap, stream, cache_dir, presolve,
+                backend,
+            ): f
+            for f in input_filenames
+        }
+        for future in as_completed(futures):
+            try:
+                row = future.result()
+            except Exception as e:
+                row = summary_row(futures[future], 'error: {}'.format(repr(e)))
+            rows[row['file']] = row
+            print('{} - {}'.format(row['file'], row['status']), flush=True)
+    return [rows[f] for f in input_filenames]
+
+
+def format_summary(rows: List[Dict]) -> str:
+    """
+    Formats summary rows as a text table.
+    """
+    def cell(value) -> str:
+        if isinstance(value, float):
+            return '{:.6g}'.format(value)
+        return str(value) if value is not None else '-'
+
+    table = [SUMMARY_COLUMNS] + [[cell(row[c]) for c in SUMMARY_COLUMNS] for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(SUMMARY_COLUMNS))]
+    return '\n'.join('  '.join(value.ljust(width) for value, width in zip(line, widths)) for line in table)
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Optimizes many robotic cell files in parallel.')
+    parser.add_argument('path', help='directory with robotic cell files or a glob pattern')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='number of worker processes')
+    parser.add_argument('--threads', type=int, default=1, help='solver threads per worker')
+    parser.add_argument('--backend', choices=sorted(BACKENDS.keys()), default=GUROBI, help='MILP solver')
+    parser.add_argument('--no-presolve', action='store_true', help='do not presolve collision pairs')
+    parser.add_argument('--format', choices=sorted(RESULT_SUFFIXES.keys()), default='json', help='result file format')
+    parser.add_argument('--time-limit', type=float, help='time limit of each optimization in seconds')
+    parser.add_argument('--mip-gap', type=float, help='relative MIP gap at which optimizations stop')
+    parser.add_argument('--stream', action='store_true',
+                        help='stream improved solutions of each cell to a {} file'.format(INCUMBENTS_SUFFIX))
+    parser.add_argument('--cache', help='directory of a solution cache shared by all runs')
+    parser.add_argument('--summary', help='JSON file to save the summary table to (it is never optimized as a cell)')
+    parsed = parser.parse_args(args)
+
+    rows = batch_optimize(
+        find_cell_files(parsed.path, exclude=[parsed.summary] if parsed.summary is not None else []),
+        parsed.workers, parsed.threads, result_format=parsed.format, time_limit=parsed.time_limit,
+        mip_gap=parsed.mip_gap, stream=parsed.stream, cache_dir=parsed.cache, presolve=not parsed.no_presolve,
+        backend=parsed.backend,
+    )
+    print(format_summary(rows))
+    if parsed.summary is not None:
+        save_to_json_file(parsed.summary, rows)
+
+
+if __name__ == '__main__':
+    main()
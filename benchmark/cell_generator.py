@@ -0,0 +1,189 @@
+import math
+import random
+from typing import Dict, List, Tuple
+
+MOVEMENT_TYPES = ['linear', 'joint', 'compound']
+
+ROBOT_SPACING = 3000
+"""
+Distance between neighbouring robots in millimeters.
+"""
+
+
+def _point(rnd: random.Random, center: Dict) -> Dict:
+    """
+    Random reachable point around the robot.
+    """
+    distance = rnd.uniform(400, 1400)
+    angle = rnd.uniform(0, 2 * math.pi)
+    return {
+        'x': round(center['x'] + distance * math.cos(angle), 1),
+        'y': round(center['y'] + distance * math.sin(angle), 1),
+        'z': round(rnd.uniform(0, 1200), 1),
+    }
+
+
+def _dynamic_activity(
+    rnd: random.Random,
+    activity_id: str,
+    movement_type: str,
+    start: Dict,
+    end: Dict,
+    center: Dict,
+    payload_weight: float,
+) -> Dict:
+    min_duration = round(rnd.uniform(0.5, 1.5), 3)
+    activity = {
+        'type': 'dynamic',
+        'id': activity_id,
+        'movement_type': movement_type,
+        'min_duration': min_duration,
+        'max_duration': round(min_duration * rnd.uniform(2, 4), 3),
+        'payload_weight': payload_weight,
+    }
+    if movement_type == 'compound':
+        points = [start] + [_point(rnd, center) for _ in range(rnd.randint(1, 2))] + [end]
+        activity['partial_movements'] = [
+            {'movement_type': rnd.choice(MOVEMENT_TYPES[:2]), 'start': points[i], 'end': points[i + 1]}
+            for i in range(len(points) - 1)
+        ]
+    else:
+        activity['start'] = start
+        activity['end'] = end
+    return activity
+
+
+def _robot(
+    rnd: random.Random,
+    index: int,
+    activity_count: int,
+    movement_mix: Tuple[float, float, float],
+) -> Dict:
+    """
+    Creates a robot with alternating static and dynamic activities. Dynamic activities move the payload between
+    positions of the neighbouring static activities and the last movement returns to the first position.
+    """
+    position = {'x': float(index * ROBOT_SPACING), 'y': 0.0, 'z': 0.0}
+    robot_id = 'r_{}'.format(index)
+    static_count = (activity_count + 1) // 2
+    positions = [_point(rnd, position) for _ in range(static_count)]
+
+    activities = []
+    for i in range(activity_count):
+        activity_id = '{}_a_{}'.format(robot_id, i)
+        payload_weight = round(rnd.uniform(0, 10), 2)
+        if i % 2 == 0:
+            activities.append({
+                'type': 'static',
+                'id': activity_id,
+                'min_duration': round(rnd.uniform(0.5, 2), 3),
+                'payload_weight': payload_weight,
+                'position': positions[i // 2],
+            })
+        else:
+            movement_type = rnd.choices(MOVEMENT_TYPES, weights=movement_mix)[0]
+            start, end = positions[i // 2], positions[(i // 2 + 1) % static_count]
+            activities.append(_dynamic_activity(rnd, activity_id, movement_type, start, end, position, payload_weight))
+
+    return {
+        'id': robot_id,
+        'position': position,
+        'weight': 200.0,
+        'load_capacity': 15.0,
+        'input_power': 2000.0,
+        'activities': activities,
+    }
+
+
+def _reference_schedule(
+    rnd: random.Random,
+    robots: List[Dict],
+    cycle_time: float,
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Feasible schedule of all activities (start time and duration): dynamic activities take their minimal duration,
+    static activities share the rest of the cycle and each robot starts at a random time of the first cycle.
+    """
+    schedule = dict()
+    for robot in robots:
+        activities = robot['activities']
+        static_count = sum(1 for a in activities if a['type'] == 'static')
+        slack = (cycle_time - sum(a['min_duration'] for a in activities)) / static_count
+        time = rnd.uniform(0, cycle_time)
+        for activity in activities:
+            duration = activity['min_duration'] + (slack if activity['type'] == 'static' else 0)
+            schedule[activity['id']] = (time, duration)
+            time += duration
+    return schedule
+
+
+def _resolves_collision(a: Tuple[float, float], b: Tuple[float, float], cycle_time: float) -> bool:
+    """
+    Returns whether given start times and durations satisfy collision constraints of the model in some order.
+    """
+    difference = b[0] - a[0]
+    return a[1] <= difference <= cycle_time - b[1] or a[1] - cycle_time <= difference <= -b[1]
+
+
+def generate_cell(
+    robots: int = 2,
+    activities_per_robot: int = 10,
+    movement_mix: Tuple[float, float, float] = (1, 1, 1),
+    collision_density: float = 0.1,
+    offset_density: float = 0.05,
+    cycle_time_slack: float = 1.5,
+    seed: int = 0,
+) -> Dict:
+    """
+    Generates a schema-valid and feasible robotic cell.
+
+    :param robots: number of robots
+    :param activities_per_robot: number of activities of each robot (alternating static and dynamic, at least 2)
+    :param movement_mix: relative weights of linear, joint and compound dynamic activities
+    :param collision_density: number of collision pairs per activity
+    :param offset_density: number of time offsets per activity
+    :param cycle_time_slack: ratio of the cycle time and the longest sum of minimal durations of a robot
+    :param seed: seed of the random generator, the same parameters and seed give the same cell
+    """
+    if activities_per_robot < 2:
+        raise ValueError('Each robot needs at least 2 activities, not {}'.format(activities_per_robot))
+    rnd = random.Random(seed)
+    robots_json = [_robot(rnd, i, activities_per_robot, movement_mix) for i in range(robots)]
+    min_cycle = max(sum(a['min_duration'] for a in robot['activities']) for robot in robots_json)
+    cycle_time = round(min_cycle * max(1.0, cycle_time_slack), 3)
+
+    # collisions and time offsets are satisfied by the reference schedule, so the cell is feasible
+    schedule = _reference_schedule(rnd, robots_json, cycle_time)
+    activity_robots = [(robot['id'], a['id']) for robot in robots_json for a in robot['activities']]
+    total = len(activity_robots)
+
+    collisions = []
+    pairs = set()
+    for _ in range(10 * int(collision_density * total)):
+        if len(collisions) >= int(collision_density * total):
+            break
+        (robot_a, a), (robot_b, b) = rnd.sample(activity_robots, 2)
+        if robot_a != robot_b and (a, b) not in pairs and _resolves_collision(schedule[a], schedule[b], cycle_time):
+            pairs.add((a, b))
+            collisions.append({'a_id': a, 'b_id': b})
+
+    time_offsets = []
+    for _ in range(int(offset_density * total)):
+        (_, a), (_, b) = rnd.sample(activity_robots, 2)
+        difference = schedule[b][0] - schedule[a][0]
+        time_offsets.append({
+            'a_id': a,
+            'b_id': b,
+            'min_offset': round(difference - rnd.uniform(0.5, 0.25 * cycle_time), 3),
+            'max_offset': round(difference + rnd.uniform(0.5, 0.25 * cycle_time), 3),
+        })
+
+    return {
+        'description': 'Generated cell: {} robots, {} activities per robot, seed {}'.format(
+            robots, activities_per_robot, seed
+        ),
+        'cycle_time': cycle_time,
+        'robots': robots_json,
+        'time_offsets': time_offsets,
+        'collisions': collisions,
+    }
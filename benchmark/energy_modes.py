@@ -0,0 +1,151 @@
+import argparse
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from benchmark.cell_generator import generate_cell
+from benchmark.run_benchmark import DEFAULT_SIZES, _parse_sizes, _version
+from ilp.activity import DynamicActivity
+from ilp.model import Model
+from nn.movement_duration_nn import MovementDurationNN
+from nn.movement_energy_nn import MovementEnergyNN
+from nn.position_nn import PositionNN
+from preprocessing.piecewise_linearization import evaluate
+from utils.json import save_to_json_file
+
+EnergyMode = Tuple[str, Dict]
+"""
+Name of an energy mode and keyword arguments of Model creating it.
+"""
+
+
+def energy_modes(breakpoints: List[int], tolerances: List[float]) -> List[EnergyMode]:
+    """
+    Returns the linearized profile (the default mode), piecewise linear general constraints with given numbers
+    of breakpoints and adaptive refinement with given tolerances.
+    """
+    return [('linearized', dict())] \
+        + [('pwl-{}'.format(n), {'energy_breakpoints': n}) for n in breakpoints] \
+        + [('adaptive-{:g}'.format(t), {'energy_tolerance': t}) for t in tolerances]
+
+
+def true_energy(model: Model) -> float:
+    """
+    Returns total energy of the solution with energy of dynamic activities evaluated by their exact energy functions
+    in the solution durations.
+    """
+    return sum(
+        evaluate(activity.energy_function(model.movement_energy_nn), activity.duration.x)
+        if isinstance(activity, DynamicActivity) else activity.energy.x
+        for activity in model.activities.values()
+    )
+
+
+def benchmark_mode(cell_json: Dict, model_kwargs: Dict, threads: int) -> Dict:
+    """
+    Builds and solves the cell in one energy mode and returns build and solve time, model size, objective
+    and true energy of the solution.
+    """
+    row = {'status': None, 'objective': None, 'true_energy': None}
+    model = Model(PositionNN(), MovementEnergyNN(), MovementDurationNN(), **model_kwargs)
+    model.backend.set_params(threads=threads, output=False)
+
+    start = time.perf_counter()
+    model.load_from_json(cell_json, bulk=True)
+    row['build_time'] = time.perf_counter() - start
+    row.update(model.backend.statistics())
+    row['general_constraints'] = model.model.NumGenConstrs
+
+    start = time.perf_counter()
+    model.optimize()
+    row['solve_time'] = time.perf_counter() - start
+    row['status'] = model.backend.status()
+    row['refinement_rounds'] = model.refinement_rounds
+    if model.backend.has_solution():
+        row['objective'] = model.backend.objective_value()
+        row['true_energy'] = true_energy(model)
+    return row
+
+
+def run_energy_benchmark(
+    sizes: List[Tuple[int, int]],
+    modes: List[EnergyMode],
+    seed: int = 0,
+    threads: int = 1,
+) -> Dict:
+    """
+    Solves a generated cell of each size in all energy modes. Besides times, each row has the estimation error
+    (objective minus true energy of the solution) and the excess of its true energy over the best true energy
+    of all modes, i.e. how much energy the approximation wastes.
+    """
+    rows = []
+    for robots, activities in sizes:
+        cell_json = generate_cell(robots, activities, seed=seed)
+        size_rows = []
+        for name, model_kwargs in modes:
+            row = benchmark_mode(cell_json, model_kwargs, threads)
+            row.update({'robots': robots, 'activities_per_robot': activities, 'mode': name})
+            size_rows.append(row)
+        energies = [r['true_energy'] for r in size_rows if r['true_energy'] is not None]
+        best = min(energies) if len(energies) > 0 else None
+        for row in size_rows:
+            solved = row['true_energy'] is not None
+            row['estimation_error'] = row['objective'] - row['true_energy'] if solved else None
+            row['excess_energy'] = row['true_energy'] - best if solved else None
+            print('{}x{} {}: {} ({:.3f} s build, {:.3f} s solve)'.format(
+                robots, activities, row['mode'], row['status'], row['build_time'], row['solve_time'],
+            ), flush=True)
+        rows.extend(size_rows)
+    return {
+        'version': _version(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'settings': {'seed': seed, 'threads': threads, 'modes': modes},
+        'rows': rows,
+    }
+
+
+def format_energy_report(report: Dict) -> str:
+    lines = ['{:<8} {:<16} {:>10} {:>10} {:>8} {:>14} {:>12} {:>12}'.format(
+        'size', 'mode', 'build [s]', 'solve [s]', 'constrs', 'true energy', 'est. error', 'excess',
+    )]
+
+    def number(value: Optional[float], pattern: str) -> str:
+        return pattern.format(value) if value is not None else '-'
+
+    for row in report['rows']:
+        lines.append('{:<8} {:<16} {:>10.4f} {:>10.4f} {:>8} {:>14} {:>12} {:>12}'.format(
+            '{}x{}'.format(row['robots'], row['activities_per_robot']), row['mode'], row['build_time'],
+            row['solve_time'], row['constraints'] + row['general_constraints'],
+            number(row['true_energy'], '{:.6g}'), number(row['estimation_error'], '{:.3e}'),
+            number(row['excess_energy'], '{:.3e}'),
+        ))
+    return '\n'.join(lines)
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Compares energy modes of the model on generated robotic cells.')
+    parser.add_argument('output_dir', help='directory for the report')
+    parser.add_argument('--sizes', type=_parse_sizes, default=DEFAULT_SIZES,
+                        help='comma separated sizes as ROBOTSxACTIVITIES, e.g. 2x10,4x20')
+    parser.add_argument('--breakpoints', type=int, nargs='*', default=[16, 64],
+                        help='numbers of breakpoints of piecewise linear energy')
+    parser.add_argument('--tolerances', type=float, nargs='*', default=[1e-2],
+                        help='tolerances of adaptive energy refinement')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--threads', type=int, default=1, help='Gurobi threads')
+    parsed = parser.parse_args(args)
+
+    report = run_energy_benchmark(
+        parsed.sizes, energy_modes(parsed.breakpoints, parsed.tolerances), parsed.seed, parsed.threads,
+    )
+    os.makedirs(parsed.output_dir, exist_ok=True)
+    report_filename = os.path.join(parsed.output_dir, 'energy_report_{}_{}.json'.format(
+        report['version'] or 'unknown', report['created'].replace(':', '-'),
+    ))
+    save_to_json_file(report_filename, report)
+    print('Report saved to {}'.format(report_filename))
+    print(format_energy_report(report))
+
+
+if __name__ == '__main__':
+    main()
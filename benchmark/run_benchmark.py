@@ -0,0 +1,217 @@
+import argparse
+import os
+import platform
+import subprocess
+import time
+from typing import Dict, List, Optional, Tuple
+
+import gurobipy as g
+
+from benchmark.cell_generator import generate_cell
+from ilp.model import Model
+from ilp.solver_backend import BACKENDS, GUROBI
+from nn.movement_duration_nn import MovementDurationNN
+from nn.movement_energy_nn import MovementEnergyNN
+from nn.position_nn import PositionNN
+from utils import profiling
+from utils.json import read_json_from_file, save_to_json_file
+from utils.validation import validate_cell
+
+DEFAULT_SIZES = [(1, 10), (2, 10), (2, 20), (4, 20), (4, 40), (8, 20)]
+"""
+Default benchmarked sizes as (robots, activities per robot), small enough for size-limited Gurobi licenses.
+"""
+
+STAGES = [
+    'json.parse', 'validation', 'model.load', 'model.preprocess', 'model.build', 'model.relations',
+    'model.bulk_build', 'model.optimize',
+]
+"""
+Timed stages, see utils.profiling for phases of the model.
+"""
+
+
+def _version() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_cell(cell_filename: str, bulk: bool, presolve: bool, threads: int, backend: str = GUROBI) -> Dict:
+    """
+    Loads and optimizes one cell file by given solver backend and returns wall times of all stages with model
+    statistics.
+    """
+    row = {'backend': backend, 'status': 'ok', 'objective': None, 'variables': None, 'binaries': None,
+           'constraints': None}
+    with profiling.session() as profiler:
+        try:
+            cell_json = read_json_from_file(cell_filename)
+            with profiling.phase('validation'):
+                errors = validate_cell(cell_json)
+            if len(errors) > 0:
+                raise ValueError('Generated cell is not valid: {}'.format(errors[:3]))
+
+            model = Model(PositionNN(), MovementEnergyNN(), MovementDurationNN(), backend=backend)
+            model.backend.set_params(threads=threads, output=False)
+            model.load_from_json(cell_json, bulk=bulk, presolve=presolve)
+            row.update(model.backend.statistics())
+            model.optimize()
+            if model.backend.has_solution():
+                row['objective'] = model.backend.objective_value()
+            else:
+                row['status'] = 'no solution ({})'.format(model.backend.status())
+        except Exception as e:
+            row['status'] = 'error: {}'.format(repr(e))
+    row['total'] = profiler.wall_time
+    for stage in STAGES:
+        stats = profiler.stats.get(stage)
+        row[stage] = stats.wall_time if stats is not None else 0.0
+    return row
+
+
+def run_benchmark(
+    sizes: List[Tuple[int, int]],
+    output_dir: str,
+    repeats: int = 3,
+    seed: int = 0,
+    bulk: bool = True,
+    presolve: bool = True,
+    threads: int = 1,
+    generator_kwargs: Optional[Dict] = None,
+    backends: Optional[List[str]] = None,
+) -> Dict:
+    """
+    Generates a cell for each size and seed (saved in output_dir/cells), benchmarks it repeatedly by each of given
+    solver backends (Gurobi by default) and returns the report with the best (minimal) time of each stage
+    over repeats.
+    """
+    backends = backends or [GUROBI]
+    generator_kwargs = generator_kwargs or dict()
+    cells_dir = os.path.join(output_dir, 'cells')
+    os.makedirs(cells_dir, exist_ok=True)
+
+    rows = []
+    for robots, activities in sizes:
+        cell_filename = os.path.join(cells_dir, 'cell_{}x{}_{}.json'.format(robots, activities, seed))
+        cell = generate_cell(robots, activities, seed=seed, **generator_kwargs)
+        save_to_json_file(cell_filename, cell)
+
+        for backend in backends:
+            runs = [benchmark_cell(cell_filename, bulk, presolve, threads, backend) for _ in range(repeats)]
+            row = dict(runs[0])
+            for key in STAGES + ['total']:
+                row[key] = min(run[key] for run in runs)
+            row.update({
+                'robots': robots,
+                'activities_per_robot': activities,
+                'activities': robots * activities,
+                'collisions': len(cell['collisions']),
+                'time_offsets': len(cell['time_offsets']),
+            })
+            rows.append(row)
+            print('{}x{} {}: {} ({:.3f} s, objective {})'.format(
+                robots, activities, backend, row['status'], row['total'], row['objective']
+            ), flush=True)
+
+    return {
+        'version': _version(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'gurobi': '.'.join(map(str, g.gurobi.version())),
+        'settings': {
+            'repeats': repeats, 'seed': seed, 'bulk': bulk, 'presolve': presolve, 'threads': threads,
+            'generator': generator_kwargs, 'backends': backends,
+        },
+        'rows': rows,
+    }
+
+
+def _row_key(row: Dict) -> Tuple[int, int, str]:
+    return row['robots'], row['activities_per_robot'], row.get('backend', GUROBI)
+
+
+def format_comparison(report: Dict, baseline: Dict) -> str:
+    """
+    Formats ratios of stage times of the report and a baseline report (< 1 means faster) for matching sizes
+    and backends.
+    """
+    baseline_rows = {_row_key(r): r for r in baseline['rows']}
+    columns = ['total'] + STAGES
+    lines = ['{:<16} '.format('size') + ' '.join('{:>16}'.format(c) for c in columns)]
+    for row in report['rows']:
+        old = baseline_rows.get(_row_key(row))
+        if old is None:
+            continue
+        ratios = [row[c] / old[c] if old.get(c) else float('nan') for c in columns]
+        lines.append('{:<16} '.format('{}x{} {}'.format(*_row_key(row))) + ' '.join(
+            '{:>16.2f}'.format(r) for r in ratios
+        ))
+    return '\n'.join(lines)
+
+
+def format_backends(report: Dict) -> str:
+    """
+    Formats build (load) and solve (optimize) times and objectives of backends side by side for each size.
+    """
+    lines = ['{:<8} {:<8} {:>12} {:>12} {:>14}  {}'.format('size', 'backend', 'build [s]', 'solve [s]', 'objective',
+                                                         'status')]
+    for row in report['rows']:
+        lines.append('{:<8} {:<8} {:>12.4f} {:>12.4f} {:>14}  {}'.format(
+            '{}x{}'.format(row['robots'], row['activities_per_robot']), row['backend'], row['model.load'],
+            row['model.optimize'], '{:.6g}'.format(row['objective']) if row['objective'] is not None else '-',
+            row['status'],
+        ))
+    return '\n'.join(lines)
+
+
+def _parse_sizes(sizes: str) -> List[Tuple[int, int]]:
+    return [tuple(map(int, size.split('x'))) for size in sizes.split(',')]
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Benchmarks loading and optimization of generated robotic cells.')
+    parser.add_argument('output_dir', help='directory for generated cells and the report')
+    parser.add_argument('--sizes', type=_parse_sizes, default=DEFAULT_SIZES,
+                        help='comma separated sizes as ROBOTSxACTIVITIES, e.g. 2x10,4x20')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--threads', type=int, default=1, help='Gurobi threads')
+    parser.add_argument('--mix', type=float, nargs=3, default=(1, 1, 1), metavar=('LINEAR', 'JOINT', 'COMPOUND'),
+                        help='relative weights of movement types')
+    parser.add_argument('--collision-density', type=float, default=0.1, help='collision pairs per activity')
+    parser.add_argument('--offset-density', type=float, default=0.05, help='time offsets per activity')
+    parser.add_argument('--no-bulk', action='store_true', help='build the model by single Gurobi calls')
+    parser.add_argument('--no-presolve', action='store_true', help='do not presolve collisions')
+    parser.add_argument('--backends', type=lambda b: b.split(','), default=[GUROBI],
+                        help='comma separated solver backends to compare ({})'.format(', '.join(BACKENDS)))
+    parser.add_argument('--compare', help='previous report to compare with')
+    parsed = parser.parse_args(args)
+
+    report = run_benchmark(
+        parsed.sizes, parsed.output_dir, parsed.repeats, parsed.seed, not parsed.no_bulk, not parsed.no_presolve,
+        parsed.threads, {
+            'movement_mix': tuple(parsed.mix),
+            'collision_density': parsed.collision_density,
+            'offset_density': parsed.offset_density,
+        },
+        parsed.backends,
+    )
+    report_filename = os.path.join(parsed.output_dir, 'report_{}_{}.json'.format(
+        report['version'] or 'unknown', report['created'].replace(':', '-'),
+    ))
+    save_to_json_file(report_filename, report)
+    print('Report saved to {}'.format(report_filename))
+    if len(parsed.backends) > 1:
+        print(format_backends(report))
+    if parsed.compare is not None:
+        print(format_comparison(report, read_json_from_file(parsed.compare)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,19 @@
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 import gurobipy as g
 
+from ilp.energy_profile_cache import EnergyProfileCache
 from nn.movement_duration_nn import MovementDurationNN
 from nn.movement_energy_nn import MovementEnergyNN
 from nn.position_nn import PositionNN
 from preprocessing.movement import Movement
+from preprocessing.interpolation import InterpolationCoefs
 from preprocessing.piecewise_linearization import piecewise_linearize
 from preprocessing.position import Position
 from preprocessing.robot import Robot
 from utils.geometry_2d import Line2D
-from utils.geometry_3d import Point3D
+from utils.geometry_3d import Points3D
+from utils.profiling import phase
 
 
 class Activity:
@@ -24,6 +27,11 @@ class Activity:
         self.start_time: Optional[g.Var] = None
         self.duration: Optional[g.Var] = None
         self.energy: Optional[g.Var] = None
+        # constraints which can be changed after the model is built
+        self.start_time_constr: Optional[g.Constr] = None
+        self.min_duration_constr: Optional[g.Constr] = None
+        self.max_duration_constr: Optional[g.Constr] = None
+        self.energy_constrs: List[g.Constr] = []
 
     def cycle_start_time(self, cycle_time: float) -> float:
         return self.start_time.x % cycle_time
@@ -32,16 +40,34 @@ class Activity:
         result = (self.start_time.x + self.duration.x) % cycle_time
         return result if result > 0 else cycle_time
 
-    def solution_json_dict(self, cycle_time: float):
+    def solution_values(
+        self,
+        cycle_time: float,
+        values: Optional[Tuple[float, float, float]] = None,
+    ) -> Tuple[float, float, float, float]:
+        """
+        Returns unrounded start time and end time within the cycle, duration and energy of the activity. If values
+        are given as (start time, duration, energy), they are used instead of solution values of the variables.
+        """
+        if values is None:
+            return self.cycle_start_time(cycle_time), self.duration.x, self.cycle_end_time(cycle_time), self.energy.x
+        start_time, duration, energy = values
+        end_time = (start_time + duration) % cycle_time
+        return start_time % cycle_time, duration, end_time if end_time > 0 else cycle_time, energy
+
+    def solution_json_dict(self, cycle_time: float, values: Optional[Tuple[float, float, float]] = None):
         """
-        Saves activity id and variables in a dictionary ready to be saved in a JSON file.
+        Saves activity id and variables in a dictionary ready to be saved in a JSON file. If values are given
+        as (start time, duration, energy), they are used instead of solution values of the variables
+        (e.g. for an incumbent found during optimization).
         """
+        start_time, duration, end_time, energy = self.solution_values(cycle_time, values)
         return {
             'id': self.id,
-            'start_time': round(self.cycle_start_time(cycle_time), 3),
-            'duration': round(self.duration.x, 3),
-            'end_time': round(self.cycle_end_time(cycle_time), 3),
-            'energy': round(self.energy.x, 6),
+            'start_time': round(start_time, 3),
+            'duration': round(duration, 3),
+            'end_time': round(end_time, 3),
+            'energy': round(energy, 6),
         }
 
     def is_split(self, cycle_time: float) -> bool:
@@ -90,13 +116,14 @@ class StaticActivity(Activity):
         # params
         self.min_duration: Optional[float] = None
         self.energy_coef: Optional[float] = None
+        self.position: Optional[Position] = None
 
-    def compute_energy_coef(self, point: Point3D, payload_weight: float, robot: Robot, nn: PositionNN):
+    def compute_energy_coef(self, point: Points3D, payload_weight: float, robot: Robot, nn: PositionNN):
         """
         Computes static activity energy coefficient using given input parameters and neural network.
         """
-        position = Position(point, payload_weight, robot)
-        self.energy_coef = nn.estimate(position)
+        self.position = Position(point, payload_weight, robot)
+        self.energy_coef = nn.estimate(self.position)
 
     def __str__(self):
         super_str = super().__str__()
@@ -120,6 +147,7 @@ class DynamicActivity(Activity):
         self.min_duration: Optional[float] = None
         self.max_duration: Optional[float] = None
         self.energy_profile_lines: List[Line2D] = []
+        self.energy_coefs: Optional[InterpolationCoefs] = None
 
     def set_movement(self, movement):
         self.movement = movement
@@ -132,14 +160,62 @@ class DynamicActivity(Activity):
     ):
         estimates_min, estimated_max = 0, 0
         if given_min is None or given_max is None:
-            estimates_min, estimated_max = duration_nn.estimate(self.movement)
+            with phase('nn.duration'):
+                estimates_min, estimated_max = duration_nn.estimate(self.movement)
 
         self.min_duration = given_min if given_min is not None else estimates_min
         self.max_duration = given_max if given_max is not None else estimated_max
 
-    def compute_energy_profile(self, energy_nn: MovementEnergyNN):
-        non_linear_coefs = energy_nn.estimate(self.movement)
-        self.energy_profile_lines = piecewise_linearize(non_linear_coefs, self.min_duration, self.max_duration)
+    def compute_energy_profile(self, energy_nn: MovementEnergyNN, linearize: bool = True):
+        """
+        Estimates the energy consumption function and, if linearize is True, its piecewise-linearized profile.
+        """
+        with phase('nn.energy'):
+            self.energy_coefs = energy_nn.estimate(self.movement)
+        if not linearize:
+            self.energy_profile_lines = []
+            return
+        with phase('linearization'):
+            self.energy_profile_lines = piecewise_linearize(self.energy_coefs, self.min_duration, self.max_duration)
+
+    def energy_function(self, energy_nn: MovementEnergyNN) -> InterpolationCoefs:
+        """
+        Returns coefficients of the interpolated energy consumption function. They are estimated again if the energy
+        profile was taken from a cache.
+        """
+        if self.energy_coefs is None:
+            with phase('nn.energy'):
+                self.energy_coefs = energy_nn.estimate(self.movement)
+        return self.energy_coefs
+
+    def compute_params(
+        self,
+        given_min: Optional[float],
+        given_max: Optional[float],
+        duration_nn: MovementDurationNN,
+        energy_nn: MovementEnergyNN,
+        cache: Optional[EnergyProfileCache] = None,
+        linearize: bool = True,
+    ):
+        """
+        Computes minimal and maximal duration and energy profile. If a cache is given, the results are reused
+        for movements with the same signature. If linearize is False (energy modes of the model which use
+        the energy function directly), only the energy function is estimated and the cache is not used,
+        as it stores linearized profiles.
+        """
+        if cache is None or not linearize:
+            self.compute_min_max_duration(given_min, given_max, duration_nn)
+            self.compute_energy_profile(energy_nn, linearize)
+            return
+
+        def compute():
+            self.compute_min_max_duration(given_min, given_max, duration_nn)
+            self.compute_energy_profile(energy_nn)
+            return self.min_duration, self.max_duration, self.energy_profile_lines
+
+        key = cache.key(self.movement, given_min, given_max, duration_nn, energy_nn)
+        self.min_duration, self.max_duration, lines = cache.get_or_compute(key, compute)
+        self.energy_profile_lines = list(lines)
 
     def __str__(self):
         super_str = super().__str__()
@@ -0,0 +1,125 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from ilp.activity import Activity, StaticActivity, DynamicActivity
+from ilp.energy_profile_cache import EnergyProfileCache
+from nn.movement_duration_nn import MovementDurationNN
+from nn.movement_energy_nn import MovementEnergyNN
+from nn.position_nn import PositionNN
+from preprocessing.position import Position
+from preprocessing.robot import Robot
+from utils.bad_input_file_error import BadInputFileError
+from utils.json import points3d_from_json, dynamic_movement_from_json
+from utils.profiling import phase
+
+ActivityInput = Tuple[Dict, Robot]
+"""
+Activity JSON dictionary and robot of the activity.
+"""
+
+DEFAULT_CHUNK_SIZE = 16
+"""
+Default number of activities preprocessed by one task of the process pool.
+"""
+
+
+class ActivityPreprocessor:
+    """
+    Computes ILP parameters of activities (energy coefficients of static activities, durations and energy
+    profiles of dynamic activities) from their JSON description. It does not touch the Gurobi model,
+    so it can run in worker processes. If linearize is False, energy profiles of dynamic activities are not
+    linearized (see DynamicActivity.compute_params).
+    """
+    def __init__(
+        self,
+        position_nn: PositionNN,
+        movement_energy_nn: MovementEnergyNN,
+        movement_duration_nn: MovementDurationNN,
+        energy_profile_cache: Optional[EnergyProfileCache] = None,
+        linearize: bool = True,
+    ):
+        self.position_nn = position_nn
+        self.movement_energy_nn = movement_energy_nn
+        self.movement_duration_nn = movement_duration_nn
+        self.energy_profile_cache = energy_profile_cache
+        self.linearize = linearize
+
+    def preprocess(self, inputs: List[ActivityInput]) -> List[Activity]:
+        """
+        Preprocesses given activities and returns them in the same order. Energy coefficients of all static
+        activities are estimated by one batched NN call.
+        """
+        activities = [self._preprocess_activity(activity_json, robot) for activity_json, robot in inputs]
+
+        static_activities = [a for a in activities if isinstance(a, StaticActivity)]
+        if len(static_activities) > 0:
+            positions = [a.position for a in static_activities]
+            with phase('nn.position'):
+                energy_coefs = self.position_nn.estimate_batch(self.position_nn.features(positions))[:, 0]
+            for static_activity, energy_coef in zip(static_activities, energy_coefs):
+                static_activity.energy_coef = float(energy_coef)
+
+        return activities
+
+    def _preprocess_activity(self, activity_json: Dict, robot: Robot) -> Activity:
+        activity_type = activity_json['type']
+        if activity_type == 'static':
+            with phase('activity.static'):
+                return self._preprocess_static_activity(activity_json, robot)
+        elif activity_type == 'dynamic':
+            with phase('activity.dynamic.{}'.format(activity_json.get('movement_type'))):
+                return self._preprocess_dynamic_activity(activity_json, robot)
+        else:
+            raise BadInputFileError('Activity type must be "static" or "dynamic", not {}'.format(activity_type))
+
+    @staticmethod
+    def _preprocess_static_activity(activity_json: Dict, robot: Robot) -> StaticActivity:
+        static_activity = StaticActivity(activity_json['id'])
+        static_activity.min_duration = activity_json.get('min_duration')
+        static_activity.position = Position(
+            points3d_from_json((activity_json['position'],)),
+            activity_json['payload_weight'],
+            robot,
+        )
+        return static_activity
+
+    def _preprocess_dynamic_activity(self, activity_json: Dict, robot: Robot) -> DynamicActivity:
+        dynamic_activity = DynamicActivity(activity_json['id'])
+        dynamic_activity.movement_type = activity_json['movement_type']
+        dynamic_activity.set_movement(dynamic_movement_from_json(activity_json, robot))
+        dynamic_activity.compute_params(
+            activity_json.get('min_duration'),
+            activity_json.get('max_duration'),
+            self.movement_duration_nn,
+            self.movement_energy_nn,
+            self.energy_profile_cache,
+            self.linearize,
+        )
+        return dynamic_activity
+
+
+def _preprocess_chunk(preprocessor: ActivityPreprocessor, inputs: List[ActivityInput]) -> List[Activity]:
+    return preprocessor.preprocess(inputs)
+
+
+def preprocess_activities(
+    preprocessor: ActivityPreprocessor,
+    inputs: List[ActivityInput],
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> List[Activity]:
+    """
+    Preprocesses given activities and returns them in the same order.
+
+    If workers is greater than 1, the activities are split into chunks of chunk_size activities preprocessed
+    in a process pool with given number of workers. Preprocessing is deterministic and results are collected
+    in the input order, so they are identical to the serial preprocessing. Workers use copies
+    of the energy profile cache, i.e. its persistent tier is shared but in-memory counters are not updated.
+    """
+    if workers is None or workers <= 1 or len(inputs) <= chunk_size:
+        return preprocessor.preprocess(inputs)
+
+    chunks = [inputs[i:i + chunk_size] for i in range(0, len(inputs), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_preprocess_chunk, [preprocessor] * len(chunks), chunks)
+        return [activity for chunk_result in results for activity in chunk_result]
@@ -0,0 +1,223 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Union, Iterable, Optional
+
+import gurobipy as g
+import numpy as np
+import scipy.sparse as sp
+
+
+Operand = Union['SparseVar', 'SparseExpr', float, int]
+
+
+class SparseOperand(ABC):
+    """
+    Base class of SparseVar and SparseExpr. Supports the same arithmetic and comparison operators which are used
+    with Gurobi variables in the model, so the model can be described in the same way in both direct and bulk
+    build mode.
+    """
+    # makes numpy scalars (e.g. line coefficients) defer to the reflected operators of this class
+    __array_ufunc__ = None
+
+    @abstractmethod
+    def to_expr(self) -> 'SparseExpr':
+        pass
+
+    def __add__(self, other: Operand) -> 'SparseExpr':
+        return self.to_expr().add(other, 1.0)
+
+    def __radd__(self, other: Operand) -> 'SparseExpr':
+        return self.to_expr().add(other, 1.0)
+
+    def __sub__(self, other: Operand) -> 'SparseExpr':
+        return self.to_expr().add(other, -1.0)
+
+    def __rsub__(self, other: Operand) -> 'SparseExpr':
+        return self.to_expr().scale(-1.0).add(other, 1.0)
+
+    def __neg__(self) -> 'SparseExpr':
+        return self.to_expr().scale(-1.0)
+
+    def __mul__(self, other: float) -> 'SparseExpr':
+        return self.to_expr().scale(float(other))
+
+    def __rmul__(self, other: float) -> 'SparseExpr':
+        return self.to_expr().scale(float(other))
+
+    def __le__(self, other: Operand) -> 'SparseConstr':
+        return SparseConstr(self - other, g.GRB.LESS_EQUAL)
+
+    def __ge__(self, other: Operand) -> 'SparseConstr':
+        return SparseConstr(self - other, g.GRB.GREATER_EQUAL)
+
+    def __eq__(self, other: Operand) -> 'SparseConstr':
+        return SparseConstr(self - other, g.GRB.EQUAL)
+
+    __hash__ = None
+
+
+class SparseExpr(SparseOperand):
+    """
+    Linear expression over SparseVar-s stored as a sparse mapping from variable index to coefficient
+    plus a constant term.
+    """
+    def __init__(self, coefs: Dict[int, float] = None, constant: float = 0.0):
+        self.coefs: Dict[int, float] = coefs if coefs is not None else dict()
+        self.constant = constant
+
+    def to_expr(self) -> 'SparseExpr':
+        return self
+
+    def add(self, other: Operand, sign: float) -> 'SparseExpr':
+        """
+        Returns a new expression (self + sign * other).
+        """
+        result = SparseExpr(dict(self.coefs), self.constant)
+        other = as_sparse_expr(other)
+        for index, coef in other.coefs.items():
+            result.coefs[index] = result.coefs.get(index, 0.0) + sign * coef
+        result.constant += sign * other.constant
+        return result
+
+    def scale(self, factor: float) -> 'SparseExpr':
+        """
+        Returns a new expression (factor * self).
+        """
+        return SparseExpr({i: c * factor for i, c in self.coefs.items()}, self.constant * factor)
+
+
+class SparseVar(SparseOperand):
+    """
+    Placeholder of a variable registered in BulkModelBuilder. It remembers its column index in the bulk
+    variable vector.
+    """
+    def __init__(self, index: int):
+        self.index = index
+
+    def to_expr(self) -> SparseExpr:
+        return SparseExpr({self.index: 1.0})
+
+    def __hash__(self):
+        return hash(self.index)
+
+
+class SparseConstr:
+    """
+    Linear constraint "expr <sense> 0" created by comparing two sparse operands.
+    """
+    def __init__(self, expr: SparseExpr, sense: str):
+        self.expr = expr
+        self.sense = sense
+
+
+def as_sparse_expr(operand: Operand) -> SparseExpr:
+    if isinstance(operand, SparseOperand):
+        return operand.to_expr()
+    return SparseExpr(constant=float(operand))
+
+
+class BulkModelBuilder:
+    """
+    Collects variables and linear constraints of the model in sparse coefficient arrays and registers them with
+    a Gurobi model in a few bulk matrix calls (addMVar/addMConstr/setMObjective) instead of one call per
+    variable and constraint. Variables and constraints keep the order in which they were added.
+    """
+    def __init__(self):
+        self.lbs: List[float] = []
+        self.ubs: List[float] = []
+        self.vtypes: List[str] = []
+        self.names: List[str] = []
+        self.rows: List[int] = []
+        self.cols: List[int] = []
+        self.values: List[float] = []
+        self.senses: List[str] = []
+        self.rhs: List[float] = []
+        self.vars: List[g.Var] = []
+        self.constrs: List[g.Constr] = []
+
+    def add_var(
+        self,
+        lb: float = 0,
+        ub: float = g.GRB.INFINITY,
+        vtype: str = g.GRB.CONTINUOUS,
+        name: str = '',
+    ) -> SparseVar:
+        self.lbs.append(lb)
+        self.ubs.append(ub)
+        self.vtypes.append(vtype)
+        self.names.append(name)
+        return SparseVar(len(self.lbs) - 1)
+
+    def add_constr(self, constr: SparseConstr) -> int:
+        """
+        Collects given constraint and returns its row index, which can be resolved to Gurobi constraint after build.
+        """
+        row = len(self.senses)
+        for index, coef in constr.expr.coefs.items():
+            self.rows.append(row)
+            self.cols.append(index)
+            self.values.append(coef)
+        self.senses.append(constr.sense)
+        self.rhs.append(-constr.expr.constant)
+        return row
+
+    @staticmethod
+    def quicksum(operands: Iterable[Operand]) -> SparseExpr:
+        result = SparseExpr()
+        for operand in operands:
+            operand = as_sparse_expr(operand)
+            for index, coef in operand.coefs.items():
+                result.coefs[index] = result.coefs.get(index, 0.0) + coef
+            result.constant += operand.constant
+        return result
+
+    def constraint_matrix(self) -> sp.csr_matrix:
+        """
+        Returns sparse matrix of collected constraints with a row for each constraint and a column for each variable.
+        """
+        return sp.csr_matrix(
+            (np.array(self.values, dtype=float), (np.array(self.rows, dtype=int), np.array(self.cols, dtype=int))),
+            shape=(len(self.senses), len(self.lbs)),
+        )
+
+    @staticmethod
+    def objective_coefs(objective: SparseExpr, var_count: int) -> np.ndarray:
+        c = np.zeros(var_count)
+        for index, coef in objective.coefs.items():
+            c[index] += coef
+        return c
+
+    def build(self, model: g.Model, objective: SparseExpr, sense: int = g.GRB.MINIMIZE) -> List[g.Var]:
+        """
+        Registers all collected variables, constraints and given objective with the given Gurobi model.
+        Returns created Gurobi variables ordered by their SparseVar indices.
+        """
+        var_count = len(self.lbs)
+        x = model.addMVar(
+            var_count,
+            lb=np.array(self.lbs, dtype=float),
+            ub=np.array(self.ubs, dtype=float),
+            vtype=np.array(self.vtypes),
+            name=self.names,
+        )
+        if len(self.senses) > 0:
+            constrs = model.addMConstr(
+                self.constraint_matrix(), x, np.array(self.senses), np.array(self.rhs, dtype=float)
+            )
+            self.constrs = constrs.tolist()
+
+        model.setMObjective(None, self.objective_coefs(objective, var_count), objective.constant, sense=sense)
+
+        self.vars = x.tolist()
+        return self.vars
+
+    def resolve(self, var: SparseVar) -> g.Var:
+        """
+        Returns Gurobi variable created for the given placeholder. The model has to be built first.
+        """
+        return self.vars[var.index]
+
+    def resolve_constr(self, row: Optional[int]) -> Optional[g.Constr]:
+        """
+        Returns Gurobi constraint created for the given row index (None for None). The model has to be built first.
+        """
+        return self.constrs[row] if row is not None else None
@@ -0,0 +1,162 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ilp.activity import Activity, DynamicActivity
+
+TOLERANCE = 1e-9
+
+FREE = 'free'
+A_BEFORE_B = 'a_before_b'
+B_BEFORE_A = 'b_before_a'
+REDUNDANT = 'redundant'
+
+CollisionDecision = Tuple[str, float, float]
+"""
+Presolve decision of a collision pair (FREE, A_BEFORE_B, B_BEFORE_A or REDUNDANT) and big-M coefficients
+of its "a before b" and "b before a" constraints.
+"""
+
+
+class CollisionPresolver:
+    """
+    Bounds differences of activity start times and decides collision pairs before their binaries are created.
+
+    Start time of the i-th activity of a robot is s_i = A_r + o_i, where A_r is start time of the first
+    activity of the robot and o_i is sum of durations of the preceding activities. Offsets o_i are bounded
+    by minimal and maximal durations (and by the cycle time, as durations of a robot sum up to it), differences
+    of robot anchors A_r are bounded by time offsets of their activities and by the 0 <= s <= 2 * cycle_time
+    window. Tightest anchor bounds are computed by Floyd-Warshall algorithm over robots, so the presolve costs
+    O(R^3 + A + T) for R robots, A activities and T time offsets.
+
+    For a collision pair (a, b) with start time difference s_b - s_a in [L, U]:
+      - the pair is REDUNDANT if one order holds for all its feasible start times (the binary and its constraints
+        are not needed), e.g. activities of the same robot never overlap,
+      - the order is forced (A_BEFORE_B or B_BEFORE_A) if the other one is infeasible (the binary is fixed),
+      - big-M of each constraint is the maximal violation of the constraint, at most the cycle time.
+    """
+    def __init__(
+        self,
+        cycle_time: float,
+        robot_to_activities: Dict[str, List[Activity]],
+        time_offsets: List[Tuple[Activity, Activity, Optional[float], Optional[float]]],
+    ):
+        self.cycle_time = cycle_time
+        self.activity_robot: Dict[str, int] = dict()
+        self.activity_index: Dict[str, int] = dict()
+        self.min_durations: Dict[str, float] = dict()
+        self.max_durations: Dict[str, float] = dict()
+        self.min_offsets: Dict[str, float] = dict()
+        self.max_offsets: Dict[str, float] = dict()
+
+        robot_activities = list(robot_to_activities.values())
+        last_min_offsets = []
+        for r, activities in enumerate(robot_activities):
+            self._bound_robot(r, activities)
+            last_min_offsets.append(self.min_offsets[activities[-1].id] if len(activities) > 0 else 0)
+        self.anchor_bounds = self._bound_anchors(len(robot_activities), last_min_offsets, time_offsets)
+
+    def _bound_robot(self, robot: int, activities: List[Activity]):
+        min_durations = [self._given_min_duration(a) for a in activities]
+        total_min = sum(min_durations)
+        min_offset, max_offset = 0.0, 0.0
+        for i, activity in enumerate(activities):
+            # durations of a robot sum up to the cycle time
+            max_duration = self.cycle_time - (total_min - min_durations[i])
+            if isinstance(activity, DynamicActivity):
+                max_duration = min(max_duration, activity.max_duration)
+            self.activity_robot[activity.id] = robot
+            self.activity_index[activity.id] = i
+            self.min_durations[activity.id] = min_durations[i]
+            self.max_durations[activity.id] = max_duration
+            self.min_offsets[activity.id] = min_offset
+            self.max_offsets[activity.id] = min(max_offset, self.cycle_time - (total_min - min_offset))
+            min_offset += min_durations[i]
+            max_offset += max_duration
+
+    @staticmethod
+    def _given_min_duration(activity: Activity) -> float:
+        return activity.min_duration if activity.min_duration is not None else 0.0
+
+    def _bound_anchors(
+        self,
+        robot_count: int,
+        last_min_offsets: List[float],
+        time_offsets: List[Tuple[Activity, Activity, Optional[float], Optional[float]]],
+    ) -> Optional[np.ndarray]:
+        """
+        Returns matrix D of upper bounds D[u, v] >= A_v - A_u of robot anchors, the last node is time 0.
+        Returns None if the bounds are contradictory (the model is infeasible and it is left to the solver).
+        """
+        zero = robot_count
+        bounds = np.full((robot_count + 1, robot_count + 1), np.inf)
+        np.fill_diagonal(bounds, 0)
+        for r in range(robot_count):
+            # 0 <= s_i <= 2 * cycle_time for all activities of the robot
+            bounds[zero, r] = 2 * self.cycle_time - last_min_offsets[r]
+            bounds[r, zero] = 0
+
+        for a, b, min_offset, max_offset in time_offsets:
+            ra, rb = self.activity_robot[a.id], self.activity_robot[b.id]
+            if ra == rb:
+                continue
+            # s_b - s_a = A_rb - A_ra + o_b - o_a
+            if max_offset is not None:
+                upper = max_offset - self.min_offsets[b.id] + self.max_offsets[a.id]
+                bounds[ra, rb] = min(bounds[ra, rb], upper)
+            if min_offset is not None:
+                lower = min_offset - self.max_offsets[b.id] + self.min_offsets[a.id]
+                bounds[rb, ra] = min(bounds[rb, ra], -lower)
+
+        for k in range(robot_count + 1):
+            bounds = np.minimum(bounds, bounds[:, k, None] + bounds[None, k, :])
+        if np.any(np.diag(bounds) < -TOLERANCE):
+            return None
+        return bounds
+
+    def start_difference_bounds(self, a: Activity, b: Activity) -> Tuple[float, float]:
+        """
+        Returns lower and upper bound of s_b - s_a.
+        """
+        ra, rb = self.activity_robot[a.id], self.activity_robot[b.id]
+        if ra == rb:
+            lower = self.min_offsets[b.id] - self.max_offsets[a.id]
+            upper = self.max_offsets[b.id] - self.min_offsets[a.id]
+        elif self.anchor_bounds is None:
+            return -2 * self.cycle_time, 2 * self.cycle_time
+        else:
+            lower = -self.anchor_bounds[rb, ra] + self.min_offsets[b.id] - self.max_offsets[a.id]
+            upper = self.anchor_bounds[ra, rb] + self.max_offsets[b.id] - self.min_offsets[a.id]
+        # start times are in [0, 2 * cycle_time]
+        return max(lower, -2 * self.cycle_time), min(upper, 2 * self.cycle_time)
+
+    def decide(self, a: Activity, b: Activity) -> CollisionDecision:
+        """
+        Decides collision pair of given activities, see the class description.
+        """
+        cycle_time = self.cycle_time
+        same_robot = self.activity_robot[a.id] == self.activity_robot[b.id]
+        if same_robot and self.activity_index[a.id] != self.activity_index[b.id]:
+            # activities of a robot are sequenced and fit in one cycle, so they never overlap
+            return REDUNDANT, 0.0, 0.0
+
+        lower, upper = self.start_difference_bounds(a, b)
+        a_min, a_max = self.min_durations[a.id], self.max_durations[a.id]
+        b_min, b_max = self.min_durations[b.id], self.max_durations[b.id]
+
+        # "a before b" (x = 1) needs d_a <= s_b - s_a <= cycle_time - d_b
+        # "b before a" (x = 0) needs d_a - cycle_time <= s_b - s_a <= -d_b
+        if lower >= a_max and upper <= cycle_time - b_max:
+            return REDUNDANT, 0.0, 0.0
+        if upper <= -b_max and lower >= a_max - cycle_time:
+            return REDUNDANT, 0.0, 0.0
+
+        a_before_b_m = min(cycle_time, max(0.0, a_max - lower))
+        b_before_a_m = min(cycle_time, max(0.0, b_max + upper))
+        a_before_b_feasible = upper >= a_min - TOLERANCE and lower <= cycle_time - b_min + TOLERANCE
+        b_before_a_feasible = lower <= -b_min + TOLERANCE and upper >= a_min - cycle_time - TOLERANCE
+        if a_before_b_feasible and not b_before_a_feasible:
+            return A_BEFORE_B, a_before_b_m, b_before_a_m
+        if b_before_a_feasible and not a_before_b_feasible:
+            return B_BEFORE_A, a_before_b_m, b_before_a_m
+        return FREE, a_before_b_m, b_before_a_m
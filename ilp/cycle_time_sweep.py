@@ -0,0 +1,142 @@
+import time
+from typing import Dict, List, Optional, Sequence, Any
+
+from ilp.model import Model
+from ilp.solver_backend import OPTIMAL, LIMIT_REACHED
+
+SweepPoint = Dict[str, Any]
+"""
+Result of one cycle time: 'cycle_time', 'status', 'energy' (None without a solution), 'mip_gap', 'solve_time'
+and 'solution' (solution JSON dictionary, only if solutions are kept).
+"""
+
+
+def cycle_time_grid(cycle_time: float, relative_range: float = 0.1, count: int = 9) -> List[float]:
+    """
+    Returns count cycle times evenly spread from (1 - relative_range) to (1 + relative_range) multiple
+    of given cycle time, e.g. relative_range=0.05 gives cycle times from 5 % faster to 5 % slower takt.
+    """
+    if count < 2:
+        return [cycle_time]
+    step = 2 * relative_range / (count - 1)
+    return [round(cycle_time * (1 - relative_range + i * step), 6) for i in range(count)]
+
+
+def solve_at_cycle_time(
+    model: Model,
+    cycle_time: float,
+    keep_solution: bool = False,
+    time_limit: Optional[float] = None,
+) -> SweepPoint:
+    """
+    Changes cycle time of the loaded model and re-solves it, collision orders of the last solution are used
+    as a partial MIP start.
+    """
+    model.set_cycle_time(cycle_time)
+    model.set_collision_start()
+    start = time.perf_counter()
+    model.optimize(warm_start=False, time_limit=time_limit)
+    point = {
+        'cycle_time': cycle_time,
+        'status': model.backend.status(),
+        'energy': model.backend.objective_value(),
+        'mip_gap': model.backend.mip_gap(),
+        'solve_time': time.perf_counter() - start,
+    }
+    if keep_solution and model.backend.has_solution():
+        point['solution'] = model.solution_json_dict()
+    return point
+
+
+def _check_sweepable(model: Model):
+    if model.presolved:
+        raise ValueError('Cycle time of a model loaded with collision presolve cannot be changed, '
+                         'load it without presolve')
+
+
+def sweep_cycle_times(
+    model: Model,
+    cycle_times: Sequence[float],
+    keep_solutions: bool = False,
+    time_limit: Optional[float] = None,
+) -> List[SweepPoint]:
+    """
+    Re-solves the loaded model for each of given cycle times and returns the results sorted by cycle time.
+    The variables and constraints of the model are reused, only coefficients depending on the cycle time
+    are changed, and each solve starts from collision orders of its neighbour. Cycle time of the model is set back
+    to the original value at the end (the model is not re-solved).
+
+    The model has to be solved by Gurobi backend and loaded without collision presolve, whose decisions hold
+    for the loaded cycle time only (ValueError is raised otherwise).
+    """
+    _check_sweepable(model)
+    original = model.cycle_time
+    try:
+        return [
+            solve_at_cycle_time(model, cycle_time, keep_solutions, time_limit)
+            for cycle_time in sorted(cycle_times)
+        ]
+    finally:
+        model.set_cycle_time(original)
+
+
+def pareto_front(points: List[SweepPoint]) -> List[SweepPoint]:
+    """
+    Returns solved points which are not dominated in (cycle time, energy), i.e. no other point has shorter or equal
+    cycle time and lower energy. The front is sorted by cycle time (energy is decreasing along it).
+    """
+    front = []
+    for point in sorted(points, key=lambda p: (p['cycle_time'], p['energy'] if p['energy'] is not None else 0)):
+        if point['energy'] is None:
+            continue
+        if len(front) == 0 or point['energy'] < front[-1]['energy']:
+            front.append(point)
+    return front
+
+
+def minimize_cycle_time(
+    model: Model,
+    energy_cap: float,
+    cycle_times: Sequence[float],
+    tolerance: float = 1e-3,
+    time_limit: Optional[float] = None,
+) -> Optional[SweepPoint]:
+    """
+    Finds (up to given tolerance) the shortest cycle time not shorter than the shortest of given cycle times
+    at which the minimal energy does not exceed given cap and returns its point with the solution, None if the cap
+    is exceeded at all given cycle times.
+
+    The cycle times are solved in ascending order until the first one within the cap, then the cycle time is bisected
+    between it and its over-cap (or infeasible) predecessor. The result is exact if the set of within-cap
+    cycle times is an interval, e.g. for cells without collisions, whose minimal energy is convex in the cycle time,
+    otherwise an earlier within-cap interval between the given cycle times can be missed. Cycle time of the model
+    is set back to the original value at the end. As with sweep_cycle_times, the model must not be presolved.
+    """
+    _check_sweepable(model)
+
+    def within_cap(point: SweepPoint) -> bool:
+        return point['status'] in (OPTIMAL, LIMIT_REACHED) and point['energy'] is not None \
+            and point['energy'] <= energy_cap
+
+    original = model.cycle_time
+    try:
+        lower = None
+        for cycle_time in sorted(cycle_times):
+            best = solve_at_cycle_time(model, cycle_time, True, time_limit)
+            if within_cap(best):
+                break
+            lower = cycle_time
+        else:
+            return None
+
+        upper = best['cycle_time']
+        while lower is not None and upper - lower > tolerance:
+            middle = (lower + upper) / 2
+            point = solve_at_cycle_time(model, middle, True, time_limit)
+            if within_cap(point):
+                upper, best = middle, point
+            else:
+                lower = middle
+        return best
+    finally:
+        model.set_cycle_time(original)
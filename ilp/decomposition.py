@@ -0,0 +1,186 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from ilp.model import Model
+from ilp.solver_backend import OPTIMAL
+from nn.movement_duration_nn import MovementDurationNN
+from nn.movement_energy_nn import MovementEnergyNN
+from nn.position_nn import PositionNN
+from utils.bad_input_file_error import BadInputFileError
+
+
+def robot_components(cell_json: Dict) -> List[List[str]]:
+    """
+    Builds robot interaction graph (robots are connected if any of their activities share a time offset
+    or a collision) and returns its connected components as lists of robot ids in input order.
+    """
+    robot_ids = [robot['id'] for robot in cell_json.get('robots', [])]
+    activity_to_robot = {
+        activity['id']: robot['id']
+        for robot in cell_json.get('robots', [])
+        for activity in robot['activities']
+    }
+    parents = {robot_id: robot_id for robot_id in robot_ids}
+
+    def find(robot_id: str) -> str:
+        while parents[robot_id] != robot_id:
+            parents[robot_id] = parents[parents[robot_id]]
+            robot_id = parents[robot_id]
+        return robot_id
+
+    for pair in cell_json.get('time_offsets', []) + cell_json.get('collisions', []):
+        for activity_id in (pair['a_id'], pair['b_id']):
+            if activity_id not in activity_to_robot:
+                raise BadInputFileError('Unknown activity id {}'.format(activity_id))
+        a_root = find(activity_to_robot[pair['a_id']])
+        b_root = find(activity_to_robot[pair['b_id']])
+        if a_root != b_root:
+            parents[b_root] = a_root
+
+    components: Dict[str, List[str]] = dict()
+    for robot_id in robot_ids:
+        components.setdefault(find(robot_id), []).append(robot_id)
+    return list(components.values())
+
+
+def split_cell(cell_json: Dict) -> List[Dict]:
+    """
+    Splits robotic cell JSON into independent sub-cells, one for each connected component of robot
+    interaction graph. Each sub-cell has the same cycle time and only its robots, time offsets and collisions.
+    """
+    activity_to_robot = {
+        activity['id']: robot['id']
+        for robot in cell_json.get('robots', [])
+        for activity in robot['activities']
+    }
+    sub_cells = []
+    for component in robot_components(cell_json):
+        robot_ids = set(component)
+        sub_cells.append({
+            'cycle_time': cell_json['cycle_time'],
+            'robots': [robot for robot in cell_json['robots'] if robot['id'] in robot_ids],
+            'time_offsets': [
+                time_offset for time_offset in cell_json.get('time_offsets', [])
+                if activity_to_robot[time_offset['a_id']] in robot_ids
+            ],
+            'collisions': [
+                collision for collision in cell_json.get('collisions', [])
+                if activity_to_robot[collision['a_id']] in robot_ids
+            ],
+        })
+    return sub_cells
+
+
+ComponentResult = Tuple[Optional[Dict], Optional[float], str]
+"""
+Solution JSON dictionary (None if there is no solution), objective value and solver status of one sub-model.
+"""
+
+
+def _solve_component(
+    sub_cell: Dict,
+    position_nn: PositionNN,
+    movement_energy_nn: MovementEnergyNN,
+    movement_duration_nn: MovementDurationNN,
+    threads: Optional[int],
+    model_kwargs: Dict,
+    load_kwargs: Dict,
+) -> ComponentResult:
+    model = Model(position_nn, movement_energy_nn, movement_duration_nn, **model_kwargs)
+    model.backend.set_params(threads=threads, output=False)
+    model.load_from_json(sub_cell, **load_kwargs)
+    model.optimize()
+    if model.cached_entry is not None:
+        return model.solution_json_dict(), model.cached_entry['objective'], OPTIMAL
+    if not model.backend.has_solution():
+        return None, None, model.backend.status()
+    return model.solution_json_dict(), model.backend.objective_value(), model.backend.status()
+
+
+class DecomposedModel:
+    """
+    Energy consumption optimization of a robotic cell split into independent sub-models. Robots interact only
+    through time offsets and collisions, so each connected component of robot interaction graph is solved
+    as a separate model and the solutions are merged. The objective (sum of activity energies) is separable,
+    so the merged solution is optimal for the whole cell, while MIP branching cost grows only with the largest
+    component.
+    """
+    def __init__(
+        self,
+        position_nn: PositionNN,
+        movement_energy_nn: MovementEnergyNN,
+        movement_duration_nn: MovementDurationNN,
+        workers: Optional[int] = None,
+        threads: Optional[int] = None,
+        **model_kwargs,
+    ):
+        """
+        Creates a new decomposed model. If workers is greater than 1, sub-models are built and solved in a process
+        pool, each solver run uses at most given number of threads. Other keyword arguments (solver backend, energy
+        modes, caches) are passed to the Model constructor of each sub-model, so the merged solution is the same
+        as of one Model of the whole cell with the same arguments. Caches given to sub-models in a process pool
+        are copied to the worker processes, only a solution cache is shared through its directory.
+        """
+        self.position_nn = position_nn
+        self.movement_energy_nn = movement_energy_nn
+        self.movement_duration_nn = movement_duration_nn
+        self.workers = workers
+        self.threads = threads
+        self._model_kwargs: Dict = model_kwargs
+        self.cycle_time = 0
+        self.robot_ids: List[str] = []
+        self.sub_cells: List[Dict] = []
+        self.results: List[ComponentResult] = []
+        self._load_kwargs: Dict = dict()
+
+    def load_from_json(self, cell_json: Dict, **load_kwargs):
+        """
+        Splits given JSON dictionary into independent sub-cells. Keyword arguments (e.g. bulk or presolve) are passed
+        to Model.load_from_json of each sub-model.
+        """
+        self.cycle_time = cell_json['cycle_time']
+        self.robot_ids = [robot['id'] for robot in cell_json.get('robots', [])]
+        self.sub_cells = split_cell(cell_json)
+        self._load_kwargs = load_kwargs
+
+    def optimize(self):
+        """
+        Builds and optimizes all sub-models.
+        """
+        args = [
+            (sub_cell, self.position_nn, self.movement_energy_nn, self.movement_duration_nn, self.threads,
+             self._model_kwargs, self._load_kwargs)
+            for sub_cell in self.sub_cells
+        ]
+        if self.workers is None or self.workers <= 1 or len(self.sub_cells) <= 1:
+            self.results = [_solve_component(*arg) for arg in args]
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            self.results = list(executor.map(_solve_component, *zip(*args)))
+
+    def is_solved(self) -> bool:
+        return len(self.results) > 0 and all(solution is not None for solution, _, _ in self.results)
+
+    def objective(self) -> float:
+        """
+        Returns total energy of the merged solution.
+        """
+        return sum(objective for _, objective, _ in self.results)
+
+    def solution_json_dict(self):
+        """
+        Creates a dictionary with the merged optimization solution ready to be saved in a JSON file.
+        Robots are in the same order as in the input.
+        """
+        if not self.is_solved():
+            raise ValueError('Some of the sub-models has no solution')
+        robots = {
+            robot['id']: robot
+            for solution, _, _ in self.results
+            for robot in solution['robots']
+        }
+        return {
+            'cycle_time': self.cycle_time,
+            'robots': [robots[robot_id] for robot_id in self.robot_ids],
+        }
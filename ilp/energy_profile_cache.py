@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from nn.movement_duration_nn import MovementDurationNN
+from nn.movement_energy_nn import MovementEnergyNN
+from preprocessing.movement import Movement
+from utils.geometry_2d import Line2D
+from utils.json import read_json_from_file, save_to_json_file
+
+
+EnergyProfile = Tuple[float, float, List[Line2D]]
+"""
+Minimal duration, maximal duration and piecewise-linearized energy consumption function of a movement.
+"""
+
+
+class EnergyProfileCache:
+    """
+    Content-addressed LRU cache of movement energy profiles, i.e. of the (movement features -> duration bounds ->
+    energy lines) pipeline. Entries are keyed by a hash of the movement signature (payload, robot parameters and
+    trajectory, but not ids), given duration bounds, used neural networks and linearization settings,
+    so repeated movements are estimated and linearized only once.
+
+    If a directory is given, entries are also persisted there as JSON files and reused by later runs.
+    """
+    def __init__(self, max_size: int = 4096, directory: Optional[str] = None):
+        self.max_size = max_size
+        self.directory = directory
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, EnergyProfile]' = OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get_or_compute(self, key: str, compute: Callable[[], EnergyProfile]) -> EnergyProfile:
+        """
+        Returns energy profile stored under the given key. Computes it using given function only if it is
+        not cached yet.
+        """
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        profile = self._read_from_disk(key)
+        if profile is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            profile = compute()
+            self._write_to_disk(key, profile)
+
+        self._entries[key] = profile
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return profile
+
+    @staticmethod
+    def key(
+        movement: Movement,
+        given_min: Optional[float],
+        given_max: Optional[float],
+        duration_nn: MovementDurationNN,
+        energy_nn: MovementEnergyNN,
+        count: int = 4,
+    ) -> str:
+        """
+        Returns content hash of all inputs of the energy profile computation, count is the number of linear pieces.
+        """
+        content = [
+            movement.signature(),
+            given_min,
+            given_max,
+            duration_nn.get_nn(),
+            duration_nn.network.digest() if duration_nn.network is not None else None,
+            energy_nn.get_nn(),
+            energy_nn.network.digest() if energy_nn.network is not None else None,
+            count,
+        ]
+        return hashlib.sha256(json.dumps(content).encode('utf-8')).hexdigest()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns hit/miss counters and current number of entries in memory.
+        """
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+        }
+
+    def clear(self):
+        """
+        Removes all entries from memory (persisted entries are kept) and resets counters.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _filename(self, key: str) -> str:
+        return os.path.join(self.directory, '{}.json'.format(key))
+
+    def _read_from_disk(self, key: str) -> Optional[EnergyProfile]:
+        if self.directory is None or not os.path.isfile(self._filename(key)):
+            return None
+        data = read_json_from_file(self._filename(key))
+        return data['min_duration'], data['max_duration'], [Line2D(q, c) for q, c in data['lines']]
+
+    def _write_to_disk(self, key: str, profile: EnergyProfile):
+        if self.directory is None:
+            return
+        min_duration, max_duration, lines = profile
+        # writes to a temporary file first, so concurrent readers never see a partially written entry
+        tmp_filename = '{}.{}.tmp'.format(self._filename(key), os.getpid())
+        save_to_json_file(tmp_filename, {
+            'min_duration': min_duration,
+            'max_duration': max_duration,
+            'lines': [[line.q, line.c] for line in lines],
+        })
+        os.replace(tmp_filename, self._filename(key))
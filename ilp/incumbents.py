@@ -0,0 +1,112 @@
+import json
+import math
+from typing import Callable, Dict, Any, Iterator, Optional
+
+IncumbentHandler = Callable[[Dict[str, Any]], None]
+"""
+Function called with each improved solution found during optimization. The solution dictionary has the format
+of Model.solution_json_dict with additional keys 'objective', 'bound', 'gap' (relative MIP gap) and 'runtime'
+(seconds since the optimization started). Bound and gap are None if they are not finite.
+"""
+
+
+def relative_gap(objective: float, bound: Optional[float]) -> Optional[float]:
+    """
+    Relative MIP gap as defined by Gurobi, i.e. |objective - bound| / |objective|, None if it is not finite.
+    """
+    if bound is None or not math.isfinite(bound):
+        return None
+    if objective == bound:
+        return 0.0
+    if objective == 0:
+        return None
+    return abs(objective - bound) / abs(objective)
+
+
+class IncumbentStream:
+    """
+    Passes solutions to an incumbent handler if they improve the best reported objective, so each handled solution
+    is strictly better than the previous one (minimization is assumed).
+    """
+    TOLERANCE = 1e-9
+    """
+    Relative improvement of the objective needed to report a solution.
+    """
+
+    def __init__(self, handler: IncumbentHandler):
+        self.handler = handler
+        self.best: Optional[float] = None
+        self.count = 0
+
+    def offer(
+        self,
+        objective: float,
+        bound: Optional[float],
+        runtime: float,
+        solution: Callable[[], Dict[str, Any]],
+    ) -> bool:
+        """
+        Reports the solution created by given function if the objective is an improvement. Returns whether
+        it was reported.
+        """
+        if self.best is not None and objective >= self.best - self.TOLERANCE * max(1.0, abs(self.best)):
+            return False
+        self.best = objective
+        self.count += 1
+        record = solution()
+        record['objective'] = objective
+        record['bound'] = bound if bound is not None and math.isfinite(bound) else None
+        record['gap'] = relative_gap(objective, bound)
+        record['runtime'] = runtime
+        self.handler(record)
+        return True
+
+
+class JsonLinesWriter:
+    """
+    Incumbent handler appending each solution as one line of JSON to a file. The file is flushed after each line,
+    so the progress can be followed (e.g. by tail -f) while the model is being solved.
+
+        with JsonLinesWriter('progress.jsonl') as writer:
+            model.optimize(time_limit=60, on_incumbent=writer)
+    """
+    def __init__(self, filename: str, append: bool = False):
+        self.filename = filename
+        self.file = open(filename, 'a' if append else 'w')
+
+    def __call__(self, solution: Dict[str, Any]):
+        self.file.write(json.dumps(solution))
+        self.file.write('\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self) -> 'JsonLinesWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def read_json_lines(filename: str) -> Iterator[Dict[str, Any]]:
+    """
+    Reads solutions saved by JsonLinesWriter in the order they were found. A partially written last line
+    (of a still running optimization) is skipped.
+    """
+    with open(filename) as file:
+        for line in file:
+            if not line.endswith('\n'):
+                break
+            yield json.loads(line)
+
+
+def last_solution(filename: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the best (last) solution saved by JsonLinesWriter, None if there is no solution yet.
+    """
+    solution = None
+    for solution in read_json_lines(filename):
+        pass
+    return solution
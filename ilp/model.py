@@ -1,24 +1,42 @@
+import time
 from typing import Dict, List, Tuple, Optional
 
 import gurobipy as g
 import matplotlib.pyplot as plt
+import numpy as np
 
 from ilp.activity import StaticActivity, Activity, DynamicActivity
+from ilp.activity_preprocessing import ActivityPreprocessor, preprocess_activities, DEFAULT_CHUNK_SIZE
+from ilp.bulk_builder import BulkModelBuilder
+from ilp.collision_presolve import CollisionPresolver, REDUNDANT, A_BEFORE_B, B_BEFORE_A
+from ilp.energy_profile_cache import EnergyProfileCache
+from ilp.incumbents import IncumbentHandler, IncumbentStream
+from ilp.solution_cache import SolutionCache, CacheEntry, cell_signature
+from ilp.solver_backend import SolverBackend, create_backend, GUROBI, OPTIMAL, DEFAULT_MIP_GAP
 from nn.movement_duration_nn import MovementDurationNN
 from nn.movement_energy_nn import MovementEnergyNN
 from nn.position_nn import PositionNN
-from preprocessing.movement import LinearMovement, JointMovement, CompoundMovement
+from preprocessing.piecewise_linearization import evaluate, tangent_line, tangent_lines, interpolation_points
 from preprocessing.robot import Robot
 from utils.bad_input_file_error import BadInputFileError
-from utils.json import point3d_from_json, simple_movement_from_partial_json
+from utils.json import robot_from_json
+from utils.json_stream import JsonStreamReader, read_top_level_value
+from utils.profiling import phase, profiled
+from utils.result_file import Columns, rows_to_columns, solution_columns
 
 TimeOffset = Tuple[Activity, Activity, Optional[float], Optional[float]]
 Collision = Tuple[Activity, Activity, g.Var]
 
+ROBOT_KEYS = {'id', 'position', 'weight', 'load_capacity', 'input_power'}
+"""
+Robot parameters needed before its activities can be preprocessed.
+"""
+
 
 class Model:
     """
-    ILP model for energy consumption optimization wrapping Gurobi model.
+    ILP model for energy consumption optimization wrapping Gurobi model (or a model of another MILP engine,
+    see ilp.solver_backend).
 
     It uses (3*A + 1) real variables, C binary variables, less then (8*A + 2*T) linear constraints,
     and 2*C quadratic constraints, where A is total number of activities, C is number of collision pairs,
@@ -30,48 +48,603 @@ class Model:
         position_nn: PositionNN,
         movement_energy_nn: MovementEnergyNN,
         movement_duration_nn: MovementDurationNN,
+        energy_profile_cache: Optional[EnergyProfileCache] = None,
+        backend: str = GUROBI,
+        energy_tolerance: Optional[float] = None,
+        initial_energy_lines: int = 2,
+        max_refinement_rounds: int = 20,
+        energy_breakpoints: Optional[int] = None,
+        solution_cache: Optional[SolutionCache] = None,
     ):
+        """
+        Creates a new model using given neural networks. If an energy profile cache is given, durations
+        and energy profiles of dynamic activities are reused for repeated movements (only with the default
+        linearized profiles, the other energy modes below do not linearize the energy functions at all).
+
+        The model is solved by given solver backend ('gurobi' or 'highs'). Other backends than Gurobi always build
+        the model in bulk mode and do not support incremental editing, self.model is None for them.
+
+        If energy_tolerance is given, energy of dynamic activities is refined adaptively instead of the fixed
+        piecewise linear profile: each activity starts with initial_energy_lines tangents of its energy function
+        and after each solve a tangent at the chosen duration is added to activities whose energy is underestimated
+        by more than the tolerance, until no activity is (or max_refinement_rounds is reached). The energy functions
+        are assumed to be convex, as by the piecewise linearization. Adaptive refinement needs Gurobi backend.
+
+        If energy_breakpoints is given, energy of each dynamic activity is tied to its duration by Gurobi piecewise
+        linear general constraint (addGenConstrPWL) through given number of breakpoints of the exact energy function
+        placed densely where the function bends, instead of the linearized profile with a few lines. It also needs
+        Gurobi backend and cannot be combined with adaptive refinement.
+
+        If a solution cache is given, optimal solutions of cells loaded by load_from_json are stored in it and optimize
+        takes the cached solution of a semantically identical cell instead of solving (see ilp.solution_cache).
+        """
         self.position_nn = position_nn
         self.movement_energy_nn = movement_energy_nn
         self.movement_duration_nn = movement_duration_nn
-        self.model = g.Model()
+        self.energy_profile_cache = energy_profile_cache
+        self.backend: SolverBackend = create_backend(backend)
+        self.model: Optional[g.Model] = self.backend.model
+        if energy_tolerance is not None and not self.backend.supports_editing:
+            raise ValueError('Adaptive energy refinement needs an editable model, {} backend is not'.format(backend))
+        if energy_breakpoints is not None and (not self.backend.supports_editing or energy_tolerance is not None):
+            raise ValueError('Piecewise linear energy needs Gurobi backend and no adaptive refinement')
+        if energy_breakpoints is not None and energy_breakpoints < 2:
+            raise ValueError('Piecewise linear energy needs at least 2 breakpoints, not {}'.format(energy_breakpoints))
+        self.energy_tolerance = energy_tolerance
+        self.energy_breakpoints = energy_breakpoints
+        self.initial_energy_lines = initial_energy_lines
+        self.max_refinement_rounds = max_refinement_rounds
+        self.refinement_rounds = 0
+        self.solution_cache = solution_cache
+        self.cached_entry: Optional[CacheEntry] = None
+        self._cache_signature: Optional[Tuple[str, str, List[float]]] = None
         self.cycle_time = 0
         self.robot_to_activities: Dict[str, List[Activity]] = dict()
         self.activities: Dict[str, Activity] = dict()
         self.time_offsets: List[TimeOffset] = []
         self.collisions: List[Collision] = []
-
-    def load_from_json(self, cell_json: Dict):
+        # constraints which can be changed after the model is built, lists are aligned with offsets and collisions
+        self.robot_cycle_constrs: Dict[str, g.Constr] = dict()
+        self.time_offset_constrs: List[List[g.Constr]] = []
+        self.collision_constrs: List[Tuple[g.Constr, g.Constr]] = []
+        self._bulk_builder: Optional[BulkModelBuilder] = None
+        self._collision_presolver: Optional[CollisionPresolver] = None
+        self._presolved = False
+        # piecewise linear energy constraints of bulk mode are added after the model is built
+        self._pending_pwl_activities: List[DynamicActivity] = []
+        self._last_solution: Dict[str, float] = dict()
+        # collision orders set by set_collision_start as the start of the next optimization
+        self._collision_start: List[Tuple[g.Var, float]] = []
+
+    @profiled('model.load')
+    def load_from_json(
+        self,
+        cell_json: Dict,
+        bulk: bool = False,
+        workers: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        presolve: bool = False,
+        preprocessed: Optional[List[Activity]] = None,
+    ):
         """
         Loads data from given JSON dictionary. If the JSON does not contain required data, throws BadInputFileError.
+
+        If bulk is True, variables and constraints are collected in sparse coefficient arrays first and registered
+        with Gurobi in a few matrix calls at the end, which is faster for large cells. The created model is the same.
+
+        If workers is greater than 1, activities are preprocessed (NN estimations, geometry and linearization)
+        in a process pool in chunks of chunk_size activities. Only Gurobi variables and constraints are created
+        in the main process and the created model is the same as with serial preprocessing.
+
+        If presolve is True, collision pairs which can never overlap are dropped, binaries of pairs with a forced
+        order are fixed and big-M coefficients are tightened with bounds derived from activity durations, robot
+        sequencing and time offsets (see CollisionPresolver). The optimal objective is the same. The decisions hold
+        for the loaded cell only, so the cycle time, time offsets and activity bounds of a presolved model cannot be
+        changed (the edit functions raise ValueError).
+
+        If preprocessed activities of the cell are given (in the input order, e.g. shared by models of similar cells,
+        see ilp.scenarios), they are used instead of preprocessing activities of cell_json. They must not be used
+        by another model.
         """
         self.cycle_time = cell_json['cycle_time']
+        if self.solution_cache is not None:
+            self._cache_signature = cell_signature(cell_json, self._cache_settings(), self.solution_cache.precision)
+        if bulk or not self.backend.supports_editing:
+            self._bulk_builder = BulkModelBuilder()
+
+        robots_json = cell_json.get('robots', [])
+        robots = list(map(robot_from_json, robots_json))
+        activity_inputs = [
+            (activity_json, robot)
+            for robot_json, robot in zip(robots_json, robots)
+            for activity_json in robot_json['activities']
+        ]
+        if preprocessed is not None:
+            activities = preprocessed
+        else:
+            with phase('model.preprocess'):
+                activities = preprocess_activities(self._preprocessor(), activity_inputs, workers, chunk_size)
 
-        for robot in cell_json.get('robots', []):
-            self._process_robot(robot)
+        with phase('model.build'):
+            offset = 0
+            for robot_json, robot in zip(robots_json, robots):
+                count = len(robot_json['activities'])
+                self._process_robot(robot, activities[offset:offset + count])
+                offset += count
 
-        for time_offset in cell_json.get('time_offsets', []):
+            self._process_relations(cell_json.get('time_offsets', []), cell_json.get('collisions', []), presolve)
+            self._set_objective()
+
+    @profiled('model.load_stream')
+    def load_from_json_stream(
+        self,
+        filename: str,
+        bulk: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        presolve: bool = False,
+    ):
+        """
+        Loads data from given JSON file without parsing the whole file into memory. Robots and their activities
+        are read one at a time, activities are preprocessed in chunks of chunk_size activities and turned
+        into model variables and constraints right away, so only the chunk being read and the model itself are held
+        in memory. Time offsets and collisions are processed after all robots. The created model is the same
+        as with load_from_json, bulk and presolve have the same meaning.
+        """
+        if bulk or not self.backend.supports_editing:
+            self._bulk_builder = BulkModelBuilder()
+        preprocessor = self._preprocessor()
+        cycle_time = None
+        time_offsets, collisions = [], []
+
+        with open(filename) as file:
+            reader = JsonStreamReader(file)
+            for key in reader.iter_object():
+                if key == 'cycle_time':
+                    cycle_time = reader.read_value()
+                elif key == 'robots':
+                    if cycle_time is None:
+                        # constraints of activities need the cycle time, so it is looked up in advance
+                        cycle_time = read_top_level_value(filename, 'cycle_time')
+                    if cycle_time is None:
+                        raise BadInputFileError('Cycle time is missing')
+                    self.cycle_time = cycle_time
+                    for _ in reader.iter_array():
+                        self._load_robot_stream(reader, preprocessor, chunk_size)
+                elif key == 'time_offsets':
+                    time_offsets = reader.read_value()
+                elif key == 'collisions':
+                    collisions = reader.read_value()
+                else:
+                    reader.skip_value()
+
+        if cycle_time is None:
+            raise BadInputFileError('Cycle time is missing')
+        self.cycle_time = cycle_time
+        self._process_relations(time_offsets, collisions, presolve)
+        self._set_objective()
+
+    def _load_robot_stream(self, reader: JsonStreamReader, preprocessor: ActivityPreprocessor, chunk_size: int):
+        """
+        Reads one robot from given reader. Its activities are streamed in chunks if the robot parameters
+        precede them in the file, otherwise the activities are read at once.
+        """
+        robot_json = dict()
+        activities: List[Activity] = []
+        for key in reader.iter_object():
+            if key != 'activities' or not ROBOT_KEYS.issubset(robot_json.keys()):
+                robot_json[key] = reader.read_value()
+                continue
+            robot = robot_from_json(robot_json)
+            chunk = []
+            for _ in reader.iter_array():
+                chunk.append((reader.read_value(), robot))
+                if len(chunk) == chunk_size:
+                    activities.extend(self._process_activities(preprocessor.preprocess(chunk)))
+                    chunk = []
+            activities.extend(self._process_activities(preprocessor.preprocess(chunk)))
+
+        robot = robot_from_json(robot_json)
+        if 'activities' in robot_json:
+            inputs = [(activity_json, robot) for activity_json in robot_json['activities']]
+            activities = self._process_activities(preprocessor.preprocess(inputs))
+        self._add_robot(robot, activities)
+
+    @profiled('model.relations')
+    def _process_relations(self, time_offsets_json: List[Dict], collisions_json: List[Dict], presolve: bool):
+        self._presolved = presolve
+        for time_offset in time_offsets_json:
             self._process_time_offset(time_offset)
 
-        for collision in cell_json.get('collisions', []):
+        if presolve:
+            self._collision_presolver = CollisionPresolver(
+                self.cycle_time,
+                self.robot_to_activities,
+                self.time_offsets,
+            )
+        for collision in collisions_json:
             self._process_collision(collision)
+        self._collision_presolver = None
 
+    def _set_objective(self):
         # the goal is to minimize sum of activity energies
-        self.model.setObjective(
-            g.quicksum(list(map(lambda a: a.energy, self.activities.values()))),
-            g.GRB.MINIMIZE,
+        objective = self._quicksum(list(map(lambda a: a.energy, self.activities.values())))
+        if self._bulk_builder is None:
+            self.model.setObjective(objective, g.GRB.MINIMIZE)
+        else:
+            self._build_bulk(objective)
+
+    def _preprocessor(self) -> ActivityPreprocessor:
+        return ActivityPreprocessor(
+            self.position_nn,
+            self.movement_energy_nn,
+            self.movement_duration_nn,
+            self.energy_profile_cache,
+            self._linearized_energy(),
         )
 
-    def optimize(self):
+    def _linearized_energy(self) -> bool:
+        """
+        Whether energy of dynamic activities is bounded by their piecewise-linearized profiles, other energy modes
+        use the energy function directly.
+        """
+        return self.energy_breakpoints is None and self.energy_tolerance is None
+
+    @profiled('model.bulk_build')
+    def _build_bulk(self, objective):
+        """
+        Registers variables and constraints collected in bulk mode with the solver and replaces variable placeholders
+        in activities and collisions with created solver variables.
+        """
+        builder = self._bulk_builder
+        self.backend.build(builder, objective)
+        for activity in self.activities.values():
+            activity.start_time = builder.resolve(activity.start_time)
+            activity.duration = builder.resolve(activity.duration)
+            activity.energy = builder.resolve(activity.energy)
+            activity.start_time_constr = builder.resolve_constr(activity.start_time_constr)
+            activity.min_duration_constr = builder.resolve_constr(activity.min_duration_constr)
+            activity.max_duration_constr = builder.resolve_constr(activity.max_duration_constr)
+            activity.energy_constrs = list(map(builder.resolve_constr, activity.energy_constrs))
+        self.collisions = [(a, b, builder.resolve(x)) for a, b, x in self.collisions]
+        self.robot_cycle_constrs = {r: builder.resolve_constr(c) for r, c in self.robot_cycle_constrs.items()}
+        self.time_offset_constrs = [list(map(builder.resolve_constr, cs)) for cs in self.time_offset_constrs]
+        self.collision_constrs = [tuple(map(builder.resolve_constr, cs)) for cs in self.collision_constrs]
+        self._bulk_builder = None
+        for activity in self._pending_pwl_activities:
+            activity.energy_constrs = self._add_energy_profile_constrs(activity)
+        self._pending_pwl_activities = []
+
+    @profiled('model.optimize')
+    def optimize(
+        self,
+        warm_start: bool = True,
+        time_limit: Optional[float] = None,
+        mip_gap: Optional[float] = None,
+        on_incumbent: Optional[IncumbentHandler] = None,
+    ):
         """
         Optimizes the model. The model needs to be loaded first using load_from_json function.
+        If warm_start is True and the model was already solved, the previous solution is used as a MIP start
+        (variables added since then have no start value). Otherwise no MIP start is used, except of collision orders
+        set by set_collision_start. Warm start is supported only by Gurobi backend.
+
+        If time_limit (in seconds) or relative mip_gap is given, the optimization stops when it is reached
+        and the best found solution is kept. The limits stay set for following optimizations.
+
+        If on_incumbent is given, it is called with each improved solution as soon as the solver finds it
+        (see ilp.incumbents, e.g. JsonLinesWriter streams them to a file), so a schedule is available before
+        the optimization finishes. The final solution is passed too if it was not reported yet. Other backends than
+        Gurobi report only the final solution.
+
+        With adaptive energy refinement (see energy_tolerance), the model is solved again after energy lines
+        are added, each solve is warm started by the previous one, the limits hold for each of them and each of them
+        reports its own improved solutions.
+
+        With a solution cache, a cached optimal solution of the same cell (with MIP gap within mip_gap, or within
+        the current gap of the solver if not given) is taken without solving: self.cached_entry is set
+        and solution_json_dict, solution_columns and create_gantt_chart use the cached solution (variables
+        of the model have no values, so activities cannot be printed). Otherwise collision orders of the cached
+        solution of the nearest cell with the same structure are used as a MIP start and the optimal solution
+        is cached if its MIP gap is within the default gap of the solvers.
+        """
+        self.backend.set_params(time_limit=time_limit, mip_gap=mip_gap)
+        self.refinement_rounds = 0
+        self.cached_entry = None
+        if self._cache_signature is not None:
+            if self._use_cached_solution(mip_gap, on_incumbent):
+                return
+            warm_start = warm_start and not self._set_nearest_cached_start()
+        self._optimize_once(warm_start, on_incumbent)
+        while self.energy_tolerance is not None and self.backend.has_solution() \
+                and self.refinement_rounds < self.max_refinement_rounds and self.refine_energy_profiles() > 0:
+            self.refinement_rounds += 1
+            self._optimize_once(True, on_incumbent)
+        if self._cache_signature is not None and self.backend.status() == OPTIMAL \
+                and self.backend.mip_gap() <= DEFAULT_MIP_GAP:
+            self._cache_solution()
+
+    def _cache_settings(self) -> Dict:
+        """
+        Model settings which change the optimal solution of a cell: neural networks and energy approximation.
+        """
+        return {
+            'nns': [
+                [nn.get_nn(), nn.network.digest() if nn.network is not None else None]
+                for nn in (self.position_nn, self.movement_energy_nn, self.movement_duration_nn)
+            ],
+            'energy_tolerance': self.energy_tolerance,
+            'initial_energy_lines': self.initial_energy_lines if self.energy_tolerance is not None else None,
+            'max_refinement_rounds': self.max_refinement_rounds if self.energy_tolerance is not None else None,
+            'energy_breakpoints': self.energy_breakpoints,
+        }
+
+    def _use_cached_solution(self, mip_gap: Optional[float], on_incumbent: Optional[IncumbentHandler]) -> bool:
+        key, structure, _ = self._cache_signature
+        entry = self.solution_cache.get(key, structure)
+        tolerance = mip_gap if mip_gap is not None else self.backend.mip_gap_tolerance()
+        if entry is None or entry['mip_gap'] > tolerance:
+            return False
+        self.solution_cache.hits += 1
+        self.cached_entry = entry
+        if on_incumbent is not None:
+            stream = IncumbentStream(on_incumbent)
+            stream.offer(entry['objective'], entry['objective'], 0.0, lambda: dict(entry['solution']))
+        return True
+
+    def _set_nearest_cached_start(self) -> bool:
+        """
+        Sets collision orders of the nearest cached solution as a MIP start, returns whether any was found.
+        """
+        _, structure, features = self._cache_signature
+        entry = self.solution_cache.nearest(structure, features) if self.backend.supports_editing else None
+        if entry is None:
+            self.solution_cache.misses += 1
+            return False
+        self.solution_cache.near_misses += 1
+        self.set_collision_start(entry['start'])
+        return True
+
+    def _cache_solution(self):
+        key, structure, features = self._cache_signature
+        self.solution_cache.put({
+            'key': key,
+            'structure': structure,
+            'features': features,
+            'objective': self.backend.objective_value(),
+            'mip_gap': self.backend.mip_gap(),
+            'solution': self.solution_json_dict(),
+            'values': {a.id: [a.start_time.x, a.duration.x, a.energy.x] for a in self.activities.values()},
+            'start': {x.VarName: x.X for _, _, x in self.collisions} if self.backend.supports_editing else dict(),
+        })
+
+    def _optimize_once(self, warm_start: bool, on_incumbent: Optional[IncumbentHandler]):
+        stream = IncumbentStream(on_incumbent) if on_incumbent is not None else None
+        start = time.perf_counter()
+        if not self.backend.supports_editing:
+            self.backend.optimize()
+        else:
+            if warm_start and len(self._last_solution) > 0:
+                for var in self.model.getVars():
+                    var.Start = self._last_solution.get(var.VarName, g.GRB.UNDEFINED)
+            else:
+                # start values of a previous warm start may be stale (e.g. for another cycle time), so only
+                # the collision start is kept
+                variables = self.model.getVars()
+                self.model.setAttr('Start', variables, [g.GRB.UNDEFINED] * len(variables))
+                for x, value in self._collision_start:
+                    x.Start = value
+            self._collision_start = []
+            if stream is None:
+                self.model.optimize()
+            else:
+                self._optimize_with_stream(stream)
+            if self.model.SolCount > 0:
+                self._last_solution = dict(zip(
+                    self.model.getAttr('VarName', self.model.getVars()),
+                    self.model.getAttr('X', self.model.getVars()),
+                ))
+
+        if stream is not None and self.backend.has_solution():
+            stream.offer(
+                self.backend.objective_value(),
+                self.backend.objective_bound(),
+                time.perf_counter() - start,
+                self.solution_json_dict,
+            )
+
+    def _optimize_with_stream(self, stream: IncumbentStream):
+        """
+        Optimizes the Gurobi model with a callback reporting new incumbents to given stream. An exception raised
+        by the incumbent handler stops the optimization and is raised again.
+        """
+        activities = list(self.activities.values())
+        variables = [var for a in activities for var in (a.start_time, a.duration, a.energy)]
+        errors = []
+
+        def solution(values: List[float]) -> Dict:
+            return self.solution_json_dict({a.id: values[3 * i:3 * i + 3] for i, a in enumerate(activities)})
+
+        def callback(model: g.Model, where: int):
+            if where != g.GRB.Callback.MIPSOL:
+                return
+            try:
+                bound = model.cbGet(g.GRB.Callback.MIPSOL_OBJBND)
+                stream.offer(
+                    model.cbGet(g.GRB.Callback.MIPSOL_OBJ),
+                    bound if abs(bound) < g.GRB.INFINITY else None,
+                    model.cbGet(g.GRB.Callback.RUNTIME),
+                    lambda: solution(model.cbGetSolution(variables)),
+                )
+            except Exception as e:
+                errors.append(e)
+                model.terminate()
+
+        self.model.optimize(callback)
+        if len(errors) > 0:
+            raise errors[0]
+
+    def set_collision_start(self, values: Optional[Dict[str, float]] = None):
+        """
+        Sets collision orders (binary variables) of the last solution (or given values by variable names) as a partial
+        MIP start of the next optimization, which should be run without warm_start. Continuous variables are
+        completed by the solver, so unlike the full warm start the start stays usable when the cycle time or activity
+        bounds change. Start values of other variables are cleared by the optimization.
+        """
+        self._check_editable()
+        values = values if values is not None else self._last_solution
+        self.model.update()
+        self._collision_start = [(x, values.get(x.VarName, g.GRB.UNDEFINED)) for _, _, x in self.collisions]
+
+    def set_cycle_time(self, cycle_time: float):
+        """
+        Changes cycle time of the loaded model in place.
+        """
+        self._check_not_presolved()
+        self._check_editable()
+        self._cache_signature = None
+        self.cycle_time = cycle_time
+        for constr in self.robot_cycle_constrs.values():
+            constr.RHS = cycle_time
+        for activity in self.activities.values():
+            activity.start_time_constr.RHS = 2 * cycle_time
+        for (_, _, x), (a_before_b, b_before_a) in zip(self.collisions, self.collision_constrs):
+            self.model.chgCoeff(a_before_b, x, cycle_time)
+            a_before_b.RHS = cycle_time
+            self.model.chgCoeff(b_before_a, x, -cycle_time)
+
+    def add_time_offset(self, time_offset_json: Dict):
+        """
+        Adds a relative time restriction of two activities to the loaded model (in the input JSON format).
+        """
+        self._check_not_presolved()
+        self._check_editable()
+        self._cache_signature = None
+        self._process_time_offset(time_offset_json)
+
+    def remove_time_offset(self, a_id: str, b_id: str):
+        """
+        Removes all relative time restrictions of given activities from the loaded model.
+        """
+        self._check_not_presolved()
+        self._check_editable()
+        self._cache_signature = None
+        kept = []
+        for time_offset, constrs in zip(self.time_offsets, self.time_offset_constrs):
+            if time_offset[0].id == a_id and time_offset[1].id == b_id:
+                for constr in constrs:
+                    self.model.remove(constr)
+            else:
+                kept.append((time_offset, constrs))
+        self.time_offsets = [time_offset for time_offset, _ in kept]
+        self.time_offset_constrs = [constrs for _, constrs in kept]
+
+    def add_collision(self, collision_json: Dict):
         """
-        self.model.optimize()
+        Adds a collision of two activities to the loaded model (in the input JSON format).
+        """
+        self._check_editable()
+        self._cache_signature = None
+        self._process_collision(collision_json)
+
+    def remove_collision(self, a_id: str, b_id: str):
+        """
+        Removes collision of given activities (and its binary variable) from the loaded model.
+        """
+        self._check_editable()
+        self._cache_signature = None
+        kept = []
+        for collision, constrs in zip(self.collisions, self.collision_constrs):
+            if collision[0].id == a_id and collision[1].id == b_id:
+                for constr in constrs:
+                    self.model.remove(constr)
+                self.model.remove(collision[2])
+                self._collision_start = [(x, value) for x, value in self._collision_start if x is not collision[2]]
+            else:
+                kept.append((collision, constrs))
+        self.collisions = [collision for collision, _ in kept]
+        self.collision_constrs = [constrs for _, constrs in kept]
+
+    def update_activity_bounds(
+        self,
+        activity_id: str,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+    ):
+        """
+        Changes minimal and/or maximal duration of an activity in the loaded model. Maximal duration can be changed
+        only for dynamic activities, their energy profile is recomputed for the new duration window.
+        """
+        self._check_not_presolved()
+        self._check_editable()
+        self._cache_signature = None
+        activity = self.activities[activity_id]
+        if max_duration is not None and not isinstance(activity, DynamicActivity):
+            raise BadInputFileError('Maximal duration can be set only for dynamic activities, not {}'.format(
+                activity_id
+            ))
+
+        if min_duration is not None:
+            activity.min_duration = min_duration
+            if activity.min_duration_constr is None:
+                activity.min_duration_constr = self._add_constr(min_duration <= activity.duration)
+            else:
+                activity.min_duration_constr.RHS = min_duration
+        if max_duration is not None:
+            activity.max_duration = max_duration
+            activity.max_duration_constr.RHS = max_duration
+
+        if isinstance(activity, DynamicActivity):
+            for constr in activity.energy_constrs:
+                self.model.remove(constr)
+            activity.compute_energy_profile(self.movement_energy_nn, self._linearized_energy())
+            activity.energy_constrs = self._add_energy_profile_constrs(activity)
+
+    def refine_energy_profiles(self) -> int:
+        """
+        Adds a tangent of the energy function at the solution duration to each dynamic activity whose solution energy
+        is lower than its energy function by more than energy tolerance. Returns the number of added lines.
+        """
+        self._check_editable()
+        added = 0
+        for activity in self.activities.values():
+            if not isinstance(activity, DynamicActivity):
+                continue
+            coefs = activity.energy_function(self.movement_energy_nn)
+            duration = activity.duration.x
+            if evaluate(coefs, duration) - activity.energy.x <= self.energy_tolerance:
+                continue
+            line = tangent_line(coefs, duration)
+            activity.energy_constrs.append(self._add_constr(
+                activity.energy >= line.q * activity.duration + line.c
+            ))
+            added += 1
+        return added
+
+    @property
+    def presolved(self) -> bool:
+        """
+        Whether the model was loaded with collision presolve, whose decisions hold for the loaded cell only.
+        """
+        return self._presolved
 
-    def solution_json_dict(self):
+    def _check_not_presolved(self):
+        if self._presolved:
+            raise ValueError('Cycle time, time offsets and activity bounds of a model loaded with presolve '
+                             'cannot be changed')
+
+    def _check_editable(self):
+        if not self.backend.supports_editing:
+            raise ValueError('Solver backend {} does not support editing of the loaded model'.format(
+                self.backend.name
+            ))
+
+    def solution_json_dict(self, values: Optional[Dict[str, Tuple[float, float, float]]] = None):
         """
-        Creates a dictionary with an optimization solution ready to be saved in a JSON file.
+        Creates a dictionary with an optimization solution ready to be saved in a JSON file. If values are given,
+        they are used instead of the solution of the model as (start time, duration, energy) for each activity id.
         """
+        if self.cached_entry is not None and values is None:
+            return self.cached_entry['solution']
         # TODO - save result energy
         return {
             'cycle_time': self.cycle_time,
@@ -79,7 +652,9 @@ class Model:
                 {
                     'id': robot,
                     'activities': [
-                        activity.solution_json_dict(self.cycle_time)
+                        activity.solution_json_dict(
+                            self.cycle_time, values[activity.id] if values is not None else None,
+                        )
                         for activity in self.robot_to_activities[robot]
                     ]
                 }
@@ -87,49 +662,68 @@ class Model:
             ]
         }
 
+    def solution_columns(self) -> Columns:
+        """
+        Returns the solution as result columns (see utils.result_file). Unlike solution_json_dict, the values
+        are not rounded, also for a cached solution (except entries cached without the unrounded values).
+        """
+        if self.cached_entry is not None and 'values' not in self.cached_entry:
+            return solution_columns(self.cached_entry['solution'])
+        values = self.cached_entry['values'] if self.cached_entry is not None else None
+        return rows_to_columns([
+            (robot, activity.id) + activity.solution_values(
+                self.cycle_time, tuple(values[activity.id]) if values is not None else None,
+            )
+            for robot, activities in self.robot_to_activities.items()
+            for activity in activities
+        ])
+
     def create_gantt_chart(self, gantt_filename: str, size: Tuple[float, float] = (10, 5)):
         """
-        Creates a Gantt's chart of the solution and saves it in the given file.
+        Creates a Gantt's chart of the solution and saves it in the given file. The chart is created from solution
+        columns, so it works also for a cached solution, whose variables have no values.
         """
-        activities = list(self.activities.values())
+        columns = self.solution_columns()
+        rows = {activity_id: i for i, activity_id in enumerate(columns['activity_id'])}
+        ids = list(self.activities.keys())
+        indices = [rows[activity_id] for activity_id in ids]
+        start_times = columns['start_time'][indices]
+        end_times = columns['end_time'][indices]
+        # split activities start in one cycle and end in the next one
+        is_split = end_times < start_times
 
         fig, ax = plt.subplots(figsize=size)
         ax.invert_yaxis()
 
         # add first parts of activities
         ax.barh(
-            list(map(lambda a: a.id, activities)),
-            list(map(lambda a: a.first_part_duration(self.cycle_time), activities)),
-            left=list(map(lambda _: 0, activities)),
+            ids,
+            np.where(is_split, end_times, 0),
+            left=np.zeros(len(ids)),
             color='b',
         )
         # add second parts of activities
         ax.barh(
-            list(map(lambda a: a.id, activities)),
-            list(map(lambda a: a.second_part_duration(self.cycle_time), activities)),
-            left=list(map(lambda a: a.cycle_start_time(self.cycle_time), activities)),
+            ids,
+            np.where(is_split, self.cycle_time - start_times, columns['duration'][indices]),
+            left=start_times,
             color='b',
         )
 
         plt.savefig(gantt_filename)
 
-    def _process_robot(self, robot_json: Dict):
-        robot = Robot(
-            robot_json['id'],
-            point3d_from_json(robot_json['position']),
-            robot_json['weight'],
-            robot_json['load_capacity'],
-            robot_json['input_power'],
-        )
+    def _process_robot(self, robot: Robot, activities: List[Activity]):
+        self._add_robot(robot, self._process_activities(activities))
 
-        activities: List[Activity] = list(map(
-            lambda activity_json: self._process_activity(activity_json, robot),
-            robot_json['activities'],
-        ))
+    def _process_activities(self, activities: List[Activity]) -> List[Activity]:
+        for activity in activities:
+            self._process_activity(activity)
+        return activities
 
+    def _add_robot(self, robot: Robot, activities: List[Activity]):
         # add time constraints
-        self._add_constr(
-            g.quicksum(list(map(lambda a: a.duration, activities))) == self.cycle_time
+        self.robot_cycle_constrs[robot.id] = self._add_constr(
+            self._quicksum(list(map(lambda a: a.duration, activities))) == self.cycle_time
         )
         for i in range(len(activities) - 1):
             j = i + 1
@@ -141,113 +735,79 @@ class Model:
         self.robot_to_activities[robot.id] = activities
         self.activities.update({a.id: a for a in activities})
 
-    def _process_activity(self, activity_json: Dict, robot: Robot) -> Activity:
-        activity_type = activity_json['type']
-        if activity_type == 'static':
-            return self._process_static_activity(activity_json, robot)
-        elif activity_type == 'dynamic':
-            return self._process_dynamic_activity(activity_json, robot)
+    def _process_activity(self, activity: Activity):
+        if isinstance(activity, StaticActivity):
+            self._process_static_activity(activity)
         else:
-            raise BadInputFileError('Activity type must be "static" or "dynamic", not {}'.format(activity_type))
-
-    def _process_static_activity(self, activity_json: Dict, robot: Robot) -> StaticActivity:
-        # add activity params
-        static_activity = StaticActivity(activity_json['id'])
-        static_activity.min_duration = activity_json.get('min_duration')
-        static_activity.compute_energy_coef(
-            point3d_from_json(activity_json['position']),
-            activity_json['payload_weight'],
-            robot,
-            self.position_nn,
-        )
+            self._process_dynamic_activity(activity)
 
+    def _process_static_activity(self, static_activity: StaticActivity):
         # add activity variables
         self._add_activity_vars(static_activity)
 
         # if minimal duration is specified, constraints the duration
         if static_activity.min_duration is not None:
-            self._add_constr(
+            static_activity.min_duration_constr = self._add_constr(
                 static_activity.min_duration <= static_activity.duration,
             )
 
         # computes activity energy consumption
-        self._add_constr(
+        static_activity.energy_constrs = [self._add_constr(
             static_activity.energy == static_activity.energy_coef * static_activity.duration
-        )
-
-        return static_activity
-
-    def _process_dynamic_activity(self, activity_json: Dict, robot: Robot) -> DynamicActivity:
-        # add activity params
-        dynamic_activity = DynamicActivity(activity_json['id'])
-
-        given_min = activity_json.get('min_duration')
-        given_max = activity_json.get('max_duration')
-        movement_type = activity_json['movement_type']
-        payload_weight = activity_json['payload_weight']
-
-        if movement_type == 'linear':
-            dynamic_activity.set_movement(
-                LinearMovement(
-                    point3d_from_json(activity_json['start']),
-                    point3d_from_json(activity_json['end']),
-                    payload_weight,
-                    robot,
-                )
-            )
-            dynamic_activity.compute_min_max_duration(given_min, given_max, self.movement_duration_nn)
-            dynamic_activity.compute_energy_profile(self.movement_energy_nn)
-
-        elif movement_type == 'joint':
-            dynamic_activity.set_movement(
-                JointMovement(
-                    point3d_from_json(activity_json['start']),
-                    point3d_from_json(activity_json['end']),
-                    payload_weight,
-                    robot,
-                )
-            )
-            dynamic_activity.compute_min_max_duration(given_min, given_max, self.movement_duration_nn)
-            dynamic_activity.compute_energy_profile(self.movement_energy_nn)
-
-        elif movement_type == 'compound':
-            partial_movements = list(map(
-                lambda json: simple_movement_from_partial_json(json, payload_weight, robot),
-                activity_json['partial_movements'],
-            ))
-            dynamic_activity.set_movement(
-                CompoundMovement(
-                    partial_movements,
-                    payload_weight,
-                    robot,
-                )
-            )
-            dynamic_activity.compute_min_max_duration(given_min, given_max, self.movement_duration_nn)
-            dynamic_activity.compute_energy_profile(self.movement_energy_nn)
-
-        else:
-            raise BadInputFileError(
-                'Movement type must be "linear", "joint" or "compound", not {}'.format(movement_type)
-            )
+        )]
 
+    def _process_dynamic_activity(self, dynamic_activity: DynamicActivity):
         # add activity variables
         self._add_activity_vars(dynamic_activity)
 
         # every dynamic activity has constrained minimal and maximal duration (with given or estimated values)
-        self._add_constr(
+        dynamic_activity.min_duration_constr = self._add_constr(
             dynamic_activity.min_duration <= dynamic_activity.duration,
         )
-        self._add_constr(
+        dynamic_activity.max_duration_constr = self._add_constr(
             dynamic_activity.duration <= dynamic_activity.max_duration,
         )
 
         # computes activity energy consumption
-        for line in dynamic_activity.energy_profile_lines:
+        dynamic_activity.energy_constrs = self._add_energy_profile_constrs(dynamic_activity)
+
+    def _add_energy_profile_constrs(self, dynamic_activity: DynamicActivity) -> List[g.Constr]:
+        if self.energy_breakpoints is not None:
+            return self._add_energy_pwl_constrs(dynamic_activity)
+        if self.energy_tolerance is None:
+            lines = dynamic_activity.energy_profile_lines
+        else:
+            # adaptive refinement starts with a few supporting lines, see refine_energy_profiles
+            lines = tangent_lines(
+                dynamic_activity.energy_function(self.movement_energy_nn),
+                dynamic_activity.min_duration,
+                dynamic_activity.max_duration,
+                self.initial_energy_lines,
+            )
+        return [
             self._add_constr(
                 dynamic_activity.energy >= line.q * dynamic_activity.duration + line.c
             )
-
-        return dynamic_activity
+            for line in lines
+        ]
+
+    def _add_energy_pwl_constrs(self, dynamic_activity: DynamicActivity) -> List[g.GenConstr]:
+        if self._bulk_builder is not None:
+            # general constraints are not supported by the bulk builder, so they wait until the model is built
+            self._pending_pwl_activities.append(dynamic_activity)
+            return []
+        xs, ys = interpolation_points(
+            dynamic_activity.energy_function(self.movement_energy_nn),
+            dynamic_activity.min_duration,
+            dynamic_activity.max_duration,
+            self.energy_breakpoints - 1,
+        )
+        if len(xs) == 1:
+            # degenerated duration window, the energy is a constant
+            return [self._add_constr(dynamic_activity.energy >= ys[0])]
+        return [self.model.addGenConstrPWL(
+            dynamic_activity.duration, dynamic_activity.energy, xs, ys, name='energy_{}'.format(dynamic_activity.id),
+        )]
 
     def _process_time_offset(self, time_offset_json: Dict):
         a_id = time_offset_json['a_id']
@@ -257,16 +817,18 @@ class Model:
         a = self.activities[a_id]
         b = self.activities[b_id]
         # adds offset constraint
+        constrs = []
         if min_offset is not None:
-            self._add_constr(
+            constrs.append(self._add_constr(
                 a.start_time + min_offset <= b.start_time
-            )
+            ))
         if max_offset is not None:
-            self._add_constr(
+            constrs.append(self._add_constr(
                 a.start_time + max_offset >= b.start_time
-            )
+            ))
         # saves offset info
         self.time_offsets.append((a, b, min_offset, max_offset))
+        self.time_offset_constrs.append(constrs)
 
     def _process_collision(self, collision_json: Dict):
         """
@@ -280,27 +842,47 @@ class Model:
         b_id = collision_json['b_id']
         a = self.activities[a_id]
         b = self.activities[b_id]
-        x = self._add_var(vtype=g.GRB.BINARY, name='x_{}_{}'.format(a_id, b_id))
+        a_before_b_m, b_before_a_m = self.cycle_time, self.cycle_time
+        lb, ub = 0, 1
+        if self._collision_presolver is not None:
+            decision, a_before_b_m, b_before_a_m = self._collision_presolver.decide(a, b)
+            if decision == REDUNDANT:
+                return
+            if decision == A_BEFORE_B:
+                lb = 1
+            elif decision == B_BEFORE_A:
+                ub = 0
+        x = self._add_var(lb=lb, ub=ub, vtype=g.GRB.BINARY, name='x_{}_{}'.format(a_id, b_id))
         # adds collision resolution constraints
-        self._add_constr(
-            a.start_time + a.duration <= b.start_time + (1 - x) * self.cycle_time
+        a_before_b = self._add_constr(
+            a.start_time + a.duration <= b.start_time + (1 - x) * a_before_b_m
         )
-        self._add_constr(
-            b.start_time + b.duration <= a.start_time + x * self.cycle_time
+        b_before_a = self._add_constr(
+            b.start_time + b.duration <= a.start_time + x * b_before_a_m
         )
         # saves collision info
         self.collisions.append((a, b, x))
+        self.collision_constrs.append((a_before_b, b_before_a))
 
     def _add_activity_vars(self, activity: Activity):
         activity.start_time = self._add_var(name='start_time_{}'.format(activity.id))
         activity.duration = self._add_var(name='duration_{}'.format(activity.id))
         activity.energy = self._add_var(name='energy_{}'.format(activity.id))
-        self._add_constr(
+        activity.start_time_constr = self._add_constr(
             activity.start_time <= 2 * self.cycle_time
         )
 
-    def _add_constr(self, constr):
-        self.model.addConstr(constr)
+    def _add_constr(self, constr) -> g.Constr:
+        if self._bulk_builder is not None:
+            return self._bulk_builder.add_constr(constr)
+        return self.model.addConstr(constr)
+
+    def _add_var(self, lb=0, ub=g.GRB.INFINITY, vtype=g.GRB.CONTINUOUS, name='') -> g.Var:
+        if self._bulk_builder is not None:
+            return self._bulk_builder.add_var(lb=lb, ub=ub, vtype=vtype, name=name)
+        return self.model.addVar(lb=lb, ub=ub, vtype=vtype, name=name)
 
-    def _add_var(self, lb=0, vtype=g.GRB.CONTINUOUS, name='') -> g.Var:
-        return self.model.addVar(lb=lb, vtype=vtype, name=name)
+    def _quicksum(self, operands):
+        if self._bulk_builder is not None:
+            return self._bulk_builder.quicksum(operands)
+        return g.quicksum(operands)
@@ -0,0 +1,248 @@
+import copy
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple, Any
+
+from ilp.activity import Activity
+from ilp.activity_preprocessing import ActivityPreprocessor
+from ilp.energy_profile_cache import EnergyProfileCache
+from ilp.model import Model
+from nn.movement_duration_nn import MovementDurationNN
+from nn.movement_energy_nn import MovementEnergyNN
+from nn.position_nn import PositionNN
+from utils.bad_input_file_error import BadInputFileError
+from utils.json import robot_from_json
+
+Scenario = Dict[str, Any]
+"""
+Perturbation of a base cell: 'id', 'payload_weights' (new payload weight for activity ids) and 'robot_offsets'
+(offset {'x', 'y', 'z'} added to the position of robot ids). Both perturbations are optional.
+"""
+
+ScenarioResult = Dict[str, Any]
+"""
+Result of one scenario: 'id', 'status', 'objective', 'mip_gap', 'recomputed' (number of preprocessed activities),
+'build_time', 'solve_time' and 'solution' (only if solutions are kept).
+"""
+
+
+def apply_scenario(cell_json: Dict, scenario: Scenario) -> Tuple[Dict, Set[str]]:
+    """
+    Returns a copy of the cell with given perturbation and ids of affected activities, i.e. activities with changed
+    payload and all activities of moved robots. Unchanged parts are shared with the base cell.
+    """
+    payload_weights = scenario.get('payload_weights', dict())
+    robot_offsets = scenario.get('robot_offsets', dict())
+    robot_ids = {robot['id'] for robot in cell_json['robots']}
+    for robot_id in robot_offsets:
+        if robot_id not in robot_ids:
+            raise BadInputFileError('Unknown robot id {} in scenario {}'.format(robot_id, scenario.get('id')))
+
+    affected = set()
+    robots = []
+    for robot in cell_json['robots']:
+        offset = robot_offsets.get(robot['id'])
+        activities = []
+        for activity in robot['activities']:
+            if activity['id'] in payload_weights:
+                activity = dict(activity, payload_weight=payload_weights[activity['id']])
+                affected.add(activity['id'])
+            elif offset is not None:
+                affected.add(activity['id'])
+            activities.append(activity)
+        if offset is not None:
+            position = {axis: robot['position'][axis] + offset.get(axis, 0.0) for axis in ('x', 'y', 'z')}
+            robot = dict(robot, position=position)
+        robots.append(dict(robot, activities=activities))
+
+    unknown = set(payload_weights) - {a['id'] for robot in robots for a in robot['activities']}
+    if len(unknown) > 0:
+        raise BadInputFileError('Unknown activity ids {} in scenario {}'.format(sorted(unknown), scenario.get('id')))
+    return dict(cell_json, robots=robots), affected
+
+
+def random_scenarios(
+    cell_json: Dict,
+    count: int,
+    payload_sigma: float = 0.1,
+    position_sigma: float = 10.0,
+    seed: int = 0,
+) -> List[Scenario]:
+    """
+    Generates scenarios with payload weights of all activities scaled by normally distributed factors
+    (with mean 1 and given relative deviation, non-negative) and robots moved by normally distributed offsets
+    (with given deviation in millimeters). Zero deviation leaves the parameter unperturbed.
+    """
+    rnd = random.Random(seed)
+    scenarios = []
+    for i in range(count):
+        scenario: Scenario = {'id': 'scenario_{}'.format(i)}
+        if payload_sigma > 0:
+            scenario['payload_weights'] = {
+                activity['id']: round(max(0.0, activity['payload_weight'] * rnd.gauss(1, payload_sigma)), 3)
+                for robot in cell_json['robots']
+                for activity in robot['activities']
+            }
+        if position_sigma > 0:
+            scenario['robot_offsets'] = {
+                robot['id']: {axis: round(rnd.gauss(0, position_sigma), 3) for axis in ('x', 'y', 'z')}
+                for robot in cell_json['robots']
+            }
+        scenarios.append(scenario)
+    return scenarios
+
+
+class _ScenarioContext:
+    """
+    Base cell with its preprocessed activities shared by all scenarios solved in one process.
+    """
+    def __init__(
+        self,
+        cell_json: Dict,
+        base_activities: Dict[str, Activity],
+        preprocessor: ActivityPreprocessor,
+        threads: Optional[int],
+        keep_solutions: bool,
+        load_kwargs: Dict,
+    ):
+        self.cell_json = cell_json
+        self.base_activities = base_activities
+        self.preprocessor = preprocessor
+        self.threads = threads
+        self.keep_solutions = keep_solutions
+        self.load_kwargs = load_kwargs
+
+    def solve(self, scenario: Scenario) -> ScenarioResult:
+        start = time.perf_counter()
+        cell_json, affected = apply_scenario(self.cell_json, scenario)
+
+        # only affected activities are preprocessed again, the others are copies of the base activities
+        inputs = []
+        for robot_json in cell_json['robots']:
+            robot = robot_from_json(robot_json)
+            inputs.extend((a, robot) for a in robot_json['activities'] if a['id'] in affected)
+        recomputed = {a.id: a for a in self.preprocessor.preprocess(inputs)}
+        activities = [
+            recomputed[a['id']] if a['id'] in recomputed else copy.copy(self.base_activities[a['id']])
+            for robot_json in cell_json['robots']
+            for a in robot_json['activities']
+        ]
+
+        model = Model(
+            self.preprocessor.position_nn,
+            self.preprocessor.movement_energy_nn,
+            self.preprocessor.movement_duration_nn,
+        )
+        model.backend.set_params(threads=self.threads, output=False)
+        model.load_from_json(cell_json, preprocessed=activities, **self.load_kwargs)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model.optimize()
+        result = {
+            'id': scenario.get('id'),
+            'status': model.backend.status(),
+            'objective': model.backend.objective_value(),
+            'mip_gap': model.backend.mip_gap(),
+            'recomputed': len(recomputed),
+            'build_time': build_time,
+            'solve_time': time.perf_counter() - start,
+        }
+        if self.keep_solutions and model.backend.has_solution():
+            result['solution'] = model.solution_json_dict()
+        return result
+
+
+_context: Optional[_ScenarioContext] = None
+
+
+def _init_worker(context: _ScenarioContext):
+    global _context
+    _context = context
+
+
+def _solve_in_worker(scenario: Scenario) -> ScenarioResult:
+    return _context.solve(scenario)
+
+
+def scenario_statistics(results: List[ScenarioResult], base_objective: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Aggregates objectives of solved scenarios: minimum, maximum, mean, standard deviation, 5th, 50th and 95th
+    percentile and, if the base objective is given, relative changes against it.
+    """
+    objectives = sorted(r['objective'] for r in results if r['objective'] is not None)
+    summary: Dict[str, Any] = {
+        'scenarios': len(results),
+        'solved': len(objectives),
+        'recomputed_activities': sum(r['recomputed'] for r in results),
+        'build_time': sum(r['build_time'] for r in results),
+        'solve_time': sum(r['solve_time'] for r in results),
+    }
+    if len(objectives) == 0:
+        return summary
+
+    def percentile(p: float) -> float:
+        position = p * (len(objectives) - 1)
+        lower = int(position)
+        upper = min(lower + 1, len(objectives) - 1)
+        return objectives[lower] + (objectives[upper] - objectives[lower]) * (position - lower)
+
+    summary['objective'] = {
+        'min': objectives[0],
+        'max': objectives[-1],
+        'mean': statistics.fmean(objectives),
+        'std': statistics.pstdev(objectives),
+        'p5': percentile(0.05),
+        'p50': percentile(0.5),
+        'p95': percentile(0.95),
+    }
+    if base_objective:
+        changes = [(objective - base_objective) / abs(base_objective) for objective in objectives]
+        summary['relative_change'] = {'min': min(changes), 'max': max(changes), 'mean': statistics.fmean(changes)}
+    return summary
+
+
+def solve_scenarios(
+    cell_json: Dict,
+    scenarios: List[Scenario],
+    position_nn: PositionNN,
+    movement_energy_nn: MovementEnergyNN,
+    movement_duration_nn: MovementDurationNN,
+    workers: Optional[int] = None,
+    threads: Optional[int] = 1,
+    keep_solutions: bool = False,
+    energy_profile_cache: Optional[EnergyProfileCache] = None,
+    **load_kwargs,
+) -> Dict[str, Any]:
+    """
+    Solves the base cell and each of given perturbation scenarios and returns {'base': base result,
+    'scenarios': results in input order, 'statistics': see scenario_statistics}.
+
+    Activities of the base cell are preprocessed once, each scenario preprocesses only its affected activities
+    (see apply_scenario) and reuses the others. If workers is greater than 1, scenarios are solved in a process pool,
+    each worker receives the preprocessed base cell once and Gurobi uses at most given number of threads in it.
+    An energy profile cache additionally shares profiles of movements repeated across scenarios (workers use its
+    copies). Other keyword arguments are passed to Model.load_from_json (e.g. bulk or presolve).
+    """
+    preprocessor = ActivityPreprocessor(position_nn, movement_energy_nn, movement_duration_nn, energy_profile_cache)
+    inputs = []
+    for robot_json in cell_json['robots']:
+        robot = robot_from_json(robot_json)
+        inputs.extend((activity_json, robot) for activity_json in robot_json['activities'])
+    base_activities = {a.id: a for a in preprocessor.preprocess(inputs)}
+    context = _ScenarioContext(cell_json, base_activities, preprocessor, threads, keep_solutions, load_kwargs)
+
+    base = context.solve({'id': 'base'})
+    if workers is None or workers <= 1:
+        results = [context.solve(scenario) for scenario in scenarios]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(context,)) as executor:
+            results = list(executor.map(_solve_in_worker, scenarios))
+
+    return {
+        'base': base,
+        'scenarios': results,
+        'statistics': scenario_statistics(results, base['objective']),
+    }
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.json import read_json_from_file, save_to_json_file
+
+IGNORED_KEYS = {'description'}
+"""
+Cell keys which do not affect the optimization and are left out of the canonical cell.
+"""
+
+DEFAULT_PRECISION = 9
+"""
+Default number of significant digits of numbers in the canonical cell.
+"""
+
+CacheEntry = Dict[str, Any]
+"""
+Cached result: 'key', 'structure', 'features' (numeric parameters of the cell), 'objective', 'mip_gap',
+'solution' (solution JSON dictionary), 'values' (unrounded start time, duration and energy by activity ids)
+and 'start' (variable values by names for MIP starts).
+"""
+
+
+def canonical_cell(cell_json: Dict, precision: int = DEFAULT_PRECISION) -> Dict:
+    """
+    Returns semantically equivalent cell in a canonical form: numbers rounded to given number of significant digits,
+    ignored keys dropped, collisions as sorted id pairs and collisions and time offsets sorted. Key order does not
+    matter, as the canonical cell is serialized with sorted keys. Order of robots and of activities of a robot
+    is kept, as activities form a sequence and robots define the order of the solution.
+    """
+    def canonical(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {k: canonical(v) for k, v in value.items() if k not in IGNORED_KEYS}
+        if isinstance(value, list):
+            return [canonical(v) for v in value]
+        if isinstance(value, float) or (isinstance(value, int) and not isinstance(value, bool)):
+            return float('{:.{}g}'.format(value, precision))
+        return value
+
+    result = canonical(cell_json)
+    result['collisions'] = sorted(
+        {tuple(sorted((c['a_id'], c['b_id']))) for c in result.get('collisions', [])}
+    )
+    result['time_offsets'] = sorted(
+        result.get('time_offsets', []),
+        key=lambda o: json.dumps(o, sort_keys=True),
+    )
+    return result
+
+
+def _numbers(value: Any, result: List[float]) -> List[Any]:
+    """
+    Moves numbers of the value to result list (in the order of sorted keys) and returns the value with numbers
+    replaced by None.
+    """
+    if isinstance(value, dict):
+        return {k: _numbers(value[k], result) for k in sorted(value.keys())}
+    if isinstance(value, (list, tuple)):
+        return [_numbers(v, result) for v in value]
+    if isinstance(value, float):
+        result.append(value)
+        return None
+    return value
+
+
+def _digest(content: Any) -> str:
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def cell_signature(
+    cell_json: Dict,
+    settings: Dict[str, Any],
+    precision: int = DEFAULT_PRECISION,
+) -> Tuple[str, str, List[float]]:
+    """
+    Returns hash of the canonical cell with given model settings (e.g. NN versions and linearization settings),
+    hash of its structure (the same ids, types and relations, any numbers) and the numeric parameters of the cell.
+    Cells with the same structure have the same model variables and differ only in the numeric parameters.
+    """
+    cell = canonical_cell(cell_json, precision)
+    features: List[float] = []
+    structure = _numbers(cell, features)
+    return _digest([cell, settings]), _digest([structure, settings]), features
+
+
+def feature_distance(a: List[float], b: List[float]) -> float:
+    """
+    Returns sum of relative differences of numeric parameters of two cells with the same structure.
+    """
+    return sum(abs(x - y) / max(1.0, abs(x), abs(y)) for x, y in zip(a, b))
+
+
+class SolutionCache:
+    """
+    Store of optimal solutions keyed by hash of the canonical cell and model settings, so semantically identical cells
+    (reordered keys, float noise, changed descriptions) are optimized only once. Cached solutions of cells with
+    the same structure but different numbers are used as MIP starts of near-miss cells.
+
+    If a directory is given, entries are persisted there as JSON files (in a subdirectory for each structure)
+    and reused by later runs.
+    """
+    def __init__(self, directory: Optional[str] = None, precision: int = DEFAULT_PRECISION):
+        self.directory = directory
+        self.precision = precision
+        self.hits = 0
+        self.near_misses = 0
+        self.misses = 0
+        self._entries: Dict[str, CacheEntry] = dict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str, structure: str) -> Optional[CacheEntry]:
+        """
+        Returns the entry stored under given key, None if it is not cached.
+        """
+        entry = self._entries.get(key)
+        if entry is None and self.directory is not None and os.path.isfile(self._filename(key, structure)):
+            entry = self._entries[key] = read_json_from_file(self._filename(key, structure))
+        return entry
+
+    def nearest(self, structure: str, features: List[float]) -> Optional[CacheEntry]:
+        """
+        Returns the entry of a cell with given structure whose numeric parameters are nearest to given features,
+        None if no cell with the structure is cached.
+        """
+        if self.directory is not None:
+            structure_dir = os.path.join(self.directory, structure)
+            if os.path.isdir(structure_dir):
+                for filename in os.listdir(structure_dir):
+                    key = filename[:-len('.json')]
+                    if filename.endswith('.json') and key not in self._entries:
+                        self._entries[key] = read_json_from_file(os.path.join(structure_dir, filename))
+        candidates = [entry for entry in self._entries.values() if entry['structure'] == structure]
+        if len(candidates) == 0:
+            return None
+        return min(candidates, key=lambda entry: feature_distance(entry['features'], features))
+
+    def put(self, entry: CacheEntry):
+        self._entries[entry['key']] = entry
+        if self.directory is None:
+            return
+        filename = self._filename(entry['key'], entry['structure'])
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        # writes to a temporary file first, so concurrent readers never see a partially written entry
+        tmp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+        save_to_json_file(tmp_filename, entry)
+        os.replace(tmp_filename, filename)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns hit/near-miss/miss counters and current number of entries in memory.
+        """
+        return {
+            'hits': self.hits,
+            'near_misses': self.near_misses,
+            'misses': self.misses,
+            'size': len(self._entries),
+        }
+
+    def _filename(self, key: str, structure: str) -> str:
+        return os.path.join(self.directory, structure, '{}.json'.format(key))
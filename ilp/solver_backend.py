@@ -0,0 +1,317 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+import gurobipy as g
+import numpy as np
+from scipy.optimize import milp, Bounds, LinearConstraint
+
+from ilp.bulk_builder import BulkModelBuilder, SparseExpr
+
+GUROBI = 'gurobi'
+HIGHS = 'highs'
+
+OPTIMAL = 'optimal'
+LIMIT_REACHED = 'limit reached'
+INFEASIBLE = 'infeasible'
+UNBOUNDED = 'unbounded'
+NOT_SOLVED = 'not solved'
+OTHER = 'other'
+
+DEFAULT_MIP_GAP = 1e-4
+"""
+Default relative MIP gap at which Gurobi and HiGHS stop the optimization.
+"""
+
+
+class SolverBackend(ABC):
+    """
+    MILP engine solving the model built by BulkModelBuilder. Variables of a built model are objects with
+    the solution value in 'x' attribute (like Gurobi variables), so activities and solutions do not depend
+    on the engine.
+    """
+    name = ''
+
+    supports_editing = False
+    """
+    Whether the built model can be changed in place (incremental editing and warm starts of Model).
+    """
+
+    model: Optional[g.Model] = None
+    """
+    Underlying Gurobi model, None for other engines.
+    """
+
+    @abstractmethod
+    def build(self, builder: BulkModelBuilder, objective: SparseExpr) -> List:
+        """
+        Builds the minimization model collected by given builder and returns its variables ordered by their indices.
+        Variables and constraints of the builder are replaced by the created ones.
+        """
+        pass
+
+    @abstractmethod
+    def optimize(self):
+        pass
+
+    @abstractmethod
+    def status(self) -> str:
+        pass
+
+    @abstractmethod
+    def has_solution(self) -> bool:
+        pass
+
+    @abstractmethod
+    def objective_value(self) -> Optional[float]:
+        pass
+
+    @abstractmethod
+    def mip_gap(self) -> Optional[float]:
+        pass
+
+    @abstractmethod
+    def mip_gap_tolerance(self) -> float:
+        """
+        Returns relative MIP gap at which the optimization currently stops.
+        """
+        pass
+
+    @abstractmethod
+    def statistics(self) -> Dict[str, int]:
+        """
+        Returns numbers of variables, binary variables and constraints of the built model.
+        """
+        pass
+
+    @abstractmethod
+    def objective_bound(self) -> Optional[float]:
+        """
+        Returns the best proven lower bound of the objective, None if the model has no solution.
+        """
+        pass
+
+    @abstractmethod
+    def set_params(
+        self,
+        threads: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        output: bool = None,
+        mip_gap: Optional[float] = None,
+    ):
+        """
+        Sets maximal number of threads, time limit in seconds, whether the solver log is printed and relative MIP gap
+        at which the optimization stops. None values are not changed.
+        """
+        pass
+
+
+class GurobiBackend(SolverBackend):
+    name = GUROBI
+    supports_editing = True
+
+    _STATUSES = {
+        g.GRB.OPTIMAL: OPTIMAL,
+        g.GRB.TIME_LIMIT: LIMIT_REACHED,
+        g.GRB.SOLUTION_LIMIT: LIMIT_REACHED,
+        g.GRB.NODE_LIMIT: LIMIT_REACHED,
+        g.GRB.INTERRUPTED: LIMIT_REACHED,
+        g.GRB.INFEASIBLE: INFEASIBLE,
+        g.GRB.INF_OR_UNBD: INFEASIBLE,
+        g.GRB.UNBOUNDED: UNBOUNDED,
+        g.GRB.LOADED: NOT_SOLVED,
+    }
+
+    def __init__(self):
+        self.model = g.Model()
+
+    def build(self, builder: BulkModelBuilder, objective: SparseExpr) -> List[g.Var]:
+        return builder.build(self.model, objective, g.GRB.MINIMIZE)
+
+    def optimize(self):
+        self.model.optimize()
+
+    def status(self) -> str:
+        return self._STATUSES.get(self.model.Status, OTHER)
+
+    def has_solution(self) -> bool:
+        return self.model.SolCount > 0
+
+    def objective_value(self) -> Optional[float]:
+        return self.model.ObjVal if self.has_solution() else None
+
+    def mip_gap(self) -> Optional[float]:
+        if not self.has_solution():
+            return None
+        return self.model.MIPGap if self.model.IsMIP else 0.0
+
+    def mip_gap_tolerance(self) -> float:
+        return self.model.Params.MIPGap
+
+    def statistics(self) -> Dict[str, int]:
+        self.model.update()
+        return {
+            'variables': self.model.NumVars,
+            'binaries': self.model.NumBinVars,
+            'constraints': self.model.NumConstrs,
+        }
+
+    def objective_bound(self) -> Optional[float]:
+        if not self.has_solution():
+            return None
+        return self.model.ObjBound if self.model.IsMIP else self.model.ObjVal
+
+    def set_params(
+        self,
+        threads: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        output: bool = None,
+        mip_gap: Optional[float] = None,
+    ):
+        if threads is not None:
+            self.model.Params.Threads = threads
+        if time_limit is not None:
+            self.model.Params.TimeLimit = time_limit
+        if output is not None:
+            self.model.Params.OutputFlag = int(output)
+        if mip_gap is not None:
+            self.model.Params.MIPGap = mip_gap
+
+
+class HighsVar:
+    """
+    Variable of a model solved by HighsBackend, its value is available after optimization.
+    """
+    __slots__ = ('backend', 'index', 'VarName')
+
+    def __init__(self, backend: 'HighsBackend', index: int, name: str):
+        self.backend = backend
+        self.index = index
+        self.VarName = name
+
+    @property
+    def x(self) -> float:
+        if self.backend.solution is None:
+            raise AttributeError('The model has no solution')
+        return float(self.backend.solution[self.index])
+
+    @property
+    def X(self) -> float:
+        return self.x
+
+    def __repr__(self):
+        return '<HighsVar {}>'.format(self.VarName)
+
+
+class HighsBackend(SolverBackend):
+    """
+    Open-source backend solving the model by HiGHS through scipy.optimize.milp, so it runs without Gurobi license.
+    The built model is not editable.
+    """
+    name = HIGHS
+
+    _STATUSES = {0: OPTIMAL, 1: LIMIT_REACHED, 2: INFEASIBLE, 3: UNBOUNDED}
+
+    def __init__(self):
+        self.options = {'disp': False}
+        self.objective = None
+        self.objective_constant = 0.0
+        self.constraints = None
+        self.bounds = None
+        self.integrality = None
+        self.result = None
+        self.solution: Optional[np.ndarray] = None
+
+    def build(self, builder: BulkModelBuilder, objective: SparseExpr) -> List[HighsVar]:
+        var_count = len(builder.lbs)
+        is_integer = np.array([vtype in (g.GRB.BINARY, g.GRB.INTEGER) for vtype in builder.vtypes], dtype=bool)
+        is_binary = np.array([vtype == g.GRB.BINARY for vtype in builder.vtypes], dtype=bool)
+        lbs = np.array(builder.lbs, dtype=float)
+        ubs = np.array(builder.ubs, dtype=float)
+        ubs[ubs >= g.GRB.INFINITY] = np.inf
+        lbs[is_binary] = np.maximum(lbs[is_binary], 0)
+        ubs[is_binary] = np.minimum(ubs[is_binary], 1)
+
+        senses = np.array(builder.senses)
+        rhs = np.array(builder.rhs, dtype=float)
+        self.constraints = LinearConstraint(
+            builder.constraint_matrix(),
+            np.where(senses == g.GRB.LESS_EQUAL, -np.inf, rhs),
+            np.where(senses == g.GRB.GREATER_EQUAL, np.inf, rhs),
+        ) if len(senses) > 0 else None
+        self.bounds = Bounds(lbs, ubs)
+        self.integrality = is_integer.astype(int)
+        self.objective = builder.objective_coefs(objective, var_count)
+        self.objective_constant = objective.constant
+
+        builder.vars = [HighsVar(self, i, name) for i, name in enumerate(builder.names)]
+        builder.constrs = list(range(len(builder.senses)))
+        return builder.vars
+
+    def optimize(self):
+        self.result = milp(
+            self.objective,
+            constraints=self.constraints,
+            integrality=self.integrality,
+            bounds=self.bounds,
+            options=self.options,
+        )
+        self.solution = self.result.x
+
+    def status(self) -> str:
+        if self.result is None:
+            return NOT_SOLVED
+        return self._STATUSES.get(self.result.status, OTHER)
+
+    def has_solution(self) -> bool:
+        return self.solution is not None
+
+    def objective_value(self) -> Optional[float]:
+        return float(self.result.fun) + self.objective_constant if self.has_solution() else None
+
+    def mip_gap(self) -> Optional[float]:
+        if not self.has_solution():
+            return None
+        return float(getattr(self.result, 'mip_gap', 0.0) or 0.0)
+
+    def mip_gap_tolerance(self) -> float:
+        return self.options.get('mip_rel_gap', DEFAULT_MIP_GAP)
+
+    def statistics(self) -> Dict[str, int]:
+        return {
+            'variables': len(self.objective),
+            'binaries': int(np.sum(self.integrality)),
+            'constraints': self.constraints.A.shape[0] if self.constraints is not None else 0,
+        }
+
+    def objective_bound(self) -> Optional[float]:
+        if not self.has_solution():
+            return None
+        bound = getattr(self.result, 'mip_dual_bound', None)
+        return float(bound) + self.objective_constant if bound is not None else self.objective_value()
+
+    def set_params(
+        self,
+        threads: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        output: bool = None,
+        mip_gap: Optional[float] = None,
+    ):
+        # HiGHS through scipy does not expose the number of threads
+        if time_limit is not None:
+            self.options['time_limit'] = time_limit
+        if output is not None:
+            self.options['disp'] = output
+        if mip_gap is not None:
+            self.options['mip_rel_gap'] = mip_gap
+
+
+BACKENDS = {
+    GUROBI: GurobiBackend,
+    HIGHS: HighsBackend,
+}
+
+
+def create_backend(name: str) -> SolverBackend:
+    if name not in BACKENDS:
+        raise ValueError('Unknown solver backend {}, supported are {}'.format(name, ', '.join(BACKENDS)))
+    return BACKENDS[name]()
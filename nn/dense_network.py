@@ -0,0 +1,75 @@
+import hashlib
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from nn.train_common import read_nn_data_from_file
+from preprocessing.features import nn_features
+from preprocessing.robot_activity import RobotActivity
+from utils.bad_input_file_error import BadInputFileError
+
+
+class DenseNetwork:
+    """
+    Fully connected feed-forward network described by NN JSON data ('parameters', 'hidden_layers', 'outputs')
+    and its trained inner parameters ('nn_parameters'). Inference is a chain of NumPy matrix multiplications
+    over a whole (N x P) feature matrix, i.e. it does not need torch.
+
+    Inner parameters are stored as a flat list of weights layer by layer, each layer as a row-major
+    (inputs x outputs) matrix (see 'nn_parameters_count' in read_nn_data_from_file). Hidden layers use
+    ReLU activation, the output layer is linear.
+    """
+    def __init__(self, parameters: List[str], nn_layers: List[int], nn_parameters: Sequence[float]):
+        self.parameters = parameters
+        self.nn_layers = nn_layers
+        self.weights: List[np.ndarray] = []
+
+        expected_count = sum([nn_layers[i] * nn_layers[i + 1] for i in range(len(nn_layers) - 1)])
+        if len(nn_parameters) != expected_count:
+            raise BadInputFileError('NN with layers {} needs {} inner parameters, not {}'.format(
+                nn_layers, expected_count, len(nn_parameters)
+            ))
+
+        flat = np.asarray(nn_parameters, dtype=float)
+        offset = 0
+        for i in range(len(nn_layers) - 1):
+            size = nn_layers[i] * nn_layers[i + 1]
+            self.weights.append(flat[offset:offset + size].reshape(nn_layers[i], nn_layers[i + 1]))
+            offset += size
+
+    @staticmethod
+    def from_nn_data(nn_data: Dict) -> 'DenseNetwork':
+        """
+        Creates a network from NN data as returned by read_nn_data_from_file with trained 'nn_parameters'.
+        """
+        return DenseNetwork(nn_data['parameters'], nn_data['nn_layers'], nn_data['nn_parameters'])
+
+    @staticmethod
+    def from_file(filename: str) -> 'DenseNetwork':
+        return DenseNetwork.from_nn_data(read_nn_data_from_file(filename))
+
+    def digest(self) -> str:
+        """
+        Returns content hash of network parameters, layers and weights.
+        """
+        content = hashlib.sha256(repr((self.parameters, self.nn_layers)).encode('utf-8'))
+        for weights in self.weights:
+            content.update(weights.tobytes())
+        return content.hexdigest()
+
+    def features(self, activities: Sequence[RobotActivity]) -> np.ndarray:
+        """
+        Builds (N x P) feature matrix of given activities from their values of network parameters.
+        """
+        return nn_features(activities, self.parameters)
+
+    def forward(self, features: np.ndarray) -> np.ndarray:
+        """
+        Evaluates the network for all rows of (N x P) feature matrix and returns (N x O) output matrix.
+        """
+        values = np.asarray(features, dtype=float).reshape(-1, self.nn_layers[0])
+        for i, weights in enumerate(self.weights):
+            values = values @ weights
+            if i < len(self.weights) - 1:
+                np.maximum(values, 0, out=values)
+        return values
@@ -1,5 +1,8 @@
-from typing import Tuple, List
+from typing import Tuple, List, Optional, Sequence
 
+import numpy as np
+
+from nn.dense_network import DenseNetwork
 from preprocessing.movement import Movement
 
 MovementEnergyNNOutput = Tuple[float, float, float, float]
@@ -16,8 +19,9 @@ class MovementEnergyNN:
     """
     Neural network for polynomial approximation of movement energy consumption.
     """
-    def __init__(self, nn: str = ''):
+    def __init__(self, nn: str = '', network: Optional[DenseNetwork] = None):
         self.nn = nn
+        self.network = network
 
     def train(self, data: List[MovementEnergyNNTrainingData]):
         self.nn = 'Trained...'
@@ -28,5 +32,26 @@ class MovementEnergyNN:
     def set_nn(self, nn: str):
         self.nn = nn
 
+    def set_network(self, network: DenseNetwork):
+        self.network = network
+
     def estimate(self, movement: Movement) -> MovementEnergyNNOutput:
-        return 6, 0, 1, 1
+        if self.network is None:
+            return 6, 0, 1, 1
+        return tuple(map(float, self.estimate_batch(self.features([movement]))[0]))
+
+    def features(self, movements: Sequence[Movement]) -> np.ndarray:
+        """
+        Builds (N x P) feature matrix of given movements from values of network parameters.
+        """
+        if self.network is None:
+            return np.zeros((len(movements), 0))
+        return self.network.features(movements)
+
+    def estimate_batch(self, features: np.ndarray) -> np.ndarray:
+        """
+        Estimates outputs for all rows of (N x P) feature matrix at once and returns (N x 4) array.
+        """
+        if self.network is None:
+            return np.tile(np.array([6, 0, 1, 1], dtype=float), (features.shape[0], 1))
+        return self.network.forward(features)
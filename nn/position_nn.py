@@ -1,5 +1,8 @@
-from typing import Tuple, List
+from typing import Tuple, List, Optional, Sequence
 
+import numpy as np
+
+from nn.dense_network import DenseNetwork
 from preprocessing.position import Position
 
 PositionNNOutput = float
@@ -16,8 +19,9 @@ class PositionNN:
     """
     Neural network for approximation of position energy consumption.
     """
-    def __init__(self, nn: str = ''):
+    def __init__(self, nn: str = '', network: Optional[DenseNetwork] = None):
         self.nn = nn
+        self.network = network
 
     def train(self, data: List[PositionNNTrainingData]):
         self.nn = 'Trained...'
@@ -28,5 +32,26 @@ class PositionNN:
     def set_nn(self, nn: str):
         self.nn = nn
 
+    def set_network(self, network: DenseNetwork):
+        self.network = network
+
     def estimate(self, params: Position) -> PositionNNOutput:
-        return 1
+        if self.network is None:
+            return 1
+        return float(self.estimate_batch(self.features([params]))[0, 0])
+
+    def features(self, positions: Sequence[Position]) -> np.ndarray:
+        """
+        Builds (N x P) feature matrix of given positions from values of network parameters.
+        """
+        if self.network is None:
+            return np.zeros((len(positions), 0))
+        return self.network.features(positions)
+
+    def estimate_batch(self, features: np.ndarray) -> np.ndarray:
+        """
+        Estimates outputs for all rows of (N x P) feature matrix at once and returns (N x 1) array.
+        """
+        if self.network is None:
+            return np.tile(np.array([1], dtype=float), (features.shape[0], 1))
+        return self.network.forward(features)
@@ -0,0 +1,227 @@
+from typing import List, Sequence, Dict, Callable
+
+import numpy as np
+
+from preprocessing.movement import Movement, SimpleMovement, JointMovement, CompoundMovement, joint_lengths
+from preprocessing.position import Position
+from preprocessing.robot_activity import RobotActivity
+import utils.geometry_2d as g2d
+import utils.geometry_3d as g3d
+from utils.geometry_3d import Point3D, Points3D
+from utils.profiling import profiled
+from utils.unsupported_parameter_error import UnsupportedParameterError
+
+
+class _Segments:
+    """
+    Struct of arrays with simple movements (linear or joint parts) of a batch of movements.
+    """
+    def __init__(self, parts: List[SimpleMovement], owners: List[int]):
+        self.parts = parts
+        self.owners = np.array(owners, dtype=int)
+        # simple movements have two rows (start and end), their coordinate arrays are stacked without creating points
+        points = Points3D.concatenate([p.points for p in parts])
+        self.start = points.select(slice(0, None, 2))
+        self.end = points.select(slice(1, None, 2))
+        self.axis = Points3D.from_points(p.axis() for p in parts)
+        self.is_joint = np.array([isinstance(p, JointMovement) for p in parts], dtype=bool)
+
+
+TOP_VECTOR = Point3D(0, 0, 1)
+
+
+def _vertical_angles(vectors: Points3D) -> np.ndarray:
+    """
+    Angles of vectors relative to vertical line (z-axis).
+    """
+    return g3d.angles(vectors, TOP_VECTOR)
+
+
+def horizontal_angles(segments: _Segments) -> np.ndarray:
+    """
+    Absolute horizontal angular changes of simple movements with respect to robot axis.
+    """
+    u = (segments.start - segments.axis).null_z()
+    v = (segments.end - segments.axis).null_z()
+    non_zero = ~(u.is_zero() | v.is_zero())
+    return np.where(non_zero, g3d.angles(u, v), 0)
+
+
+def signed_vertical_angles(segments: _Segments) -> np.ndarray:
+    """
+    Signed vertical angular changes of simple movements - positive when going down, negative when going up.
+    """
+    return _vertical_angles(segments.end - segments.axis) - _vertical_angles(segments.start - segments.axis)
+
+
+def lengths(segments: _Segments) -> np.ndarray:
+    """
+    Lengths of simple movements.
+    """
+    result = g3d.distances(segments.end, segments.start)
+    if np.any(segments.is_joint):
+        joint = segments.is_joint
+        start_vectors = (segments.start - segments.axis).select(joint)
+        result[joint], _ = joint_lengths(
+            start_vectors.magnitude(),
+            g3d.distances(segments.end.select(joint), segments.axis.select(joint)),
+            horizontal_angles(segments)[joint],
+            _vertical_angles(start_vectors),
+            signed_vertical_angles(segments)[joint],
+        )
+    return result
+
+
+def avg_distances_from_axis(segments: _Segments) -> np.ndarray:
+    """
+    Average 2D distances from robot axis of simple movements.
+    """
+    joint_distances = (
+        g3d.horizontal_distances(segments.start, segments.axis) +
+        g3d.horizontal_distances(segments.end, segments.start)
+    ) / 2
+    linear_distances = g2d.avg_distances_to_segments(
+        segments.axis.coords[:, :2], segments.start.coords[:, :2], segments.end.coords[:, :2]
+    )
+    return np.where(segments.is_joint, joint_distances, linear_distances)
+
+
+class _MovementColumns:
+    """
+    Lazily computed feature columns of a batch of movements.
+    """
+    def __init__(self, movements: Sequence[Movement]):
+        parts, owners = [], []
+        for i, movement in enumerate(movements):
+            movement_parts = movement.parts() if isinstance(movement, CompoundMovement) else [movement]
+            parts.extend(movement_parts)
+            owners.extend([i] * len(movement_parts))
+
+        self.count = len(movements)
+        self.segments = _Segments(parts, owners)
+        points = Points3D.concatenate([m.points for m in movements])
+        self.start = points.select(slice(0, None, 2))
+        self.end = points.select(slice(1, None, 2))
+        self.axis = Points3D.from_points(m.axis() for m in movements)
+        self.mass = np.array([m.mass() for m in movements], dtype=float)
+        self.is_compound = np.array([isinstance(m, CompoundMovement) for m in movements], dtype=bool)
+        self._cache: Dict[str, np.ndarray] = dict()
+
+    def _sum_parts(self, values: np.ndarray) -> np.ndarray:
+        return np.bincount(self.segments.owners, weights=values, minlength=self.count)
+
+    def _cached(self, name: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
+
+    def segment_lengths(self) -> np.ndarray:
+        return self._cached('segment_lengths', lambda: lengths(self.segments))
+
+    def length(self) -> np.ndarray:
+        return self._cached('length', lambda: self._sum_parts(self.segment_lengths()))
+
+    def height_change(self) -> np.ndarray:
+        return self.end.z - self.start.z
+
+    def horizontal_angle(self) -> np.ndarray:
+        return self._sum_parts(horizontal_angles(self.segments))
+
+    def vertical_angle(self) -> np.ndarray:
+        return self._sum_parts(np.abs(signed_vertical_angles(self.segments)))
+
+    def avg_distance_from_axis(self) -> np.ndarray:
+        def compute():
+            distances = avg_distances_from_axis(self.segments)
+            # compound movements average their parts weighted by part lengths, simple movements have just one part
+            result = np.zeros(self.count)
+            result[self.segments.owners] = distances
+            weighted = self._sum_parts(distances * self.segment_lengths())
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(self.is_compound, weighted / self.length(), result)
+
+        return self._cached('avg_distance_from_axis', compute)
+
+    def start_distance(self) -> np.ndarray:
+        return g3d.horizontal_distances(self.start, self.axis)
+
+    def end_distance(self) -> np.ndarray:
+        return g3d.horizontal_distances(self.end, self.axis)
+
+
+MOVEMENT_PARAMS: Dict[str, Callable[[_MovementColumns], np.ndarray]] = {
+    'movement_length': lambda c: c.length(),
+    'height_change': lambda c: c.height_change(),
+    'horizontal_angle': lambda c: c.horizontal_angle(),
+    'vertical_angle': lambda c: c.vertical_angle(),
+    'average_distance': lambda c: c.avg_distance_from_axis(),
+    'gravitational_pseudo_torque': lambda c: c.avg_distance_from_axis() * c.mass,
+    'start_distance': lambda c: c.start_distance(),
+    'end_distance': lambda c: c.end_distance(),
+    'margin_distance': lambda c: (c.start_distance() + c.end_distance()) / 2,
+}
+"""
+Movement specific NN parameters computed over a whole batch of movements.
+"""
+
+
+def _position_distances(positions: Sequence[Position]) -> np.ndarray:
+    coordinates = Points3D.concatenate([p.points for p in positions])
+    axis = Points3D.from_points(p.axis() for p in positions)
+    return g3d.horizontal_distances(coordinates, axis)
+
+
+POSITION_PARAMS: Dict[str, Callable[[Sequence[Position]], np.ndarray]] = {
+    'distance_from_axis': lambda ps: _position_distances(ps),
+    'gravitational_pseudo_torque': lambda ps: _position_distances(ps) * np.array([p.mass() for p in ps]),
+}
+"""
+Position specific NN parameters computed over a whole batch of positions.
+"""
+
+ROBOT_ACTIVITY_PARAMS: Dict[str, Callable[[RobotActivity], float]] = {
+    'mass': lambda a: a.mass(),
+    'max_load': lambda a: a.max_load(),
+    'load_ratio': lambda a: a.load_ratio(),
+    'robot_weight': lambda a: a.robot_weight(),
+    'input_power': lambda a: a.input_power(),
+}
+"""
+NN parameters common to all robot activities.
+"""
+
+
+@profiled('geometry.features')
+def nn_features(activities: Sequence[RobotActivity], parameters: List[str]) -> np.ndarray:
+    """
+    Computes (N x P) matrix of given NN parameters of given movements and positions. Geometric parameters are
+    computed with array operations over stacked coordinates of all activities at once.
+    Raises UnsupportedParameterError if a parameter is not supported by some of the activities.
+
+    :param activities: list of N movements or positions
+    :param parameters: list of P parameter names (as in NN JSON files)
+    :return: float64 array with a row for each activity and a column for each parameter
+    """
+    movement_indices = [i for i, a in enumerate(activities) if isinstance(a, Movement)]
+    position_indices = [i for i, a in enumerate(activities) if isinstance(a, Position)]
+    movements = [activities[i] for i in movement_indices]
+    positions = [activities[i] for i in position_indices]
+    movement_columns = _MovementColumns(movements)
+
+    result = np.zeros((len(activities), len(parameters)))
+    for j, param in enumerate(parameters):
+        if param in ROBOT_ACTIVITY_PARAMS:
+            result[:, j] = [ROBOT_ACTIVITY_PARAMS[param](activity) for activity in activities]
+            continue
+        if len(movements) > 0:
+            if param not in MOVEMENT_PARAMS:
+                raise UnsupportedParameterError('Parameter {} is not supported by Movement class'.format(param))
+            result[movement_indices, j] = MOVEMENT_PARAMS[param](movement_columns)
+        if len(positions) > 0:
+            if param not in POSITION_PARAMS:
+                raise UnsupportedParameterError('Parameter {} is not supported by Position class'.format(param))
+            result[position_indices, j] = POSITION_PARAMS[param](positions)
+        if len(movements) + len(positions) < len(activities):
+            raise UnsupportedParameterError('Parameter {} is not supported by RobotActivity class'.format(param))
+
+    return result
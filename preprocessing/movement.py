@@ -1,22 +1,110 @@
 from abc import abstractmethod, ABC
-from typing import List
+from functools import lru_cache
+from math import nan
+from typing import List, Optional, Tuple
 
-from numpy import sqrt, abs, sin
-from scipy.integrate import quad as integral
+import numpy as np
+from numpy import sqrt, abs
 
+import utils.geometry_2d as g2d
 import utils.geometry_3d as g3d
 from preprocessing.robot import Robot
 from preprocessing.robot_activity import RobotActivity
-from utils.geometry_3d import Point3D
+from utils.geometry_3d import Point3D, Points3D
+from utils.profiling import profiled
+
+
+GAUSS_LEGENDRE_ORDER = 16
+"""
+Default number of Gauss-Legendre nodes used for joint movement length integration.
+"""
+
+
+@lru_cache(maxsize=None)
+def _gauss_legendre_nodes(order: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns Gauss-Legendre nodes and weights of given order transformed from [-1, 1] to [0, 1].
+    """
+    nodes, weights = np.polynomial.legendre.leggauss(order)
+    return (nodes + 1) / 2, weights / 2
+
+
+@profiled('geometry.joint_lengths')
+def joint_lengths(
+    start_dist: np.ndarray,
+    end_dist: np.ndarray,
+    horizontal_angle: np.ndarray,
+    start_vertical_angle: np.ndarray,
+    signed_vertical_angle: np.ndarray,
+    order: int = GAUSS_LEGENDRE_ORDER,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Computes lengths of joint movements given by arrays of their parameters. The movement is parametrized
+    in spherical form, i.e. t = r*sin(theta)*cos(phi), y = r*sin(theta)*sin(phi), z = r*cos(theta) (where r, theta
+    and phi are functions of t, 0 <= t <= 1), and its length relation is integrated by Gauss-Legendre quadrature
+    with fixed number of nodes, evaluated for all movements at once.
+
+    For the default order, the result differs from adaptive quadrature (scipy quad) by less than 1e-10 relatively.
+
+    :param start_dist: distances of movement starts from axis
+    :param end_dist: distances of movement ends from axis
+    :param horizontal_angle: absolute horizontal angular changes
+    :param start_vertical_angle: starting angles relative to vertical line
+    :param signed_vertical_angle: signed vertical angular changes
+    :param order: number of quadrature nodes
+    :return: array of lengths and array of error estimates (difference from the rule with half of the nodes)
+    """
+    def integrate(nodes_order: int) -> np.ndarray:
+        nodes, weights = _gauss_legendre_nodes(nodes_order)
+        t = nodes[np.newaxis, :]
+        r = start_dist[:, np.newaxis] + (end_dist - start_dist)[:, np.newaxis] * t
+        r_t_derivative = (end_dist - start_dist)[:, np.newaxis]
+        sin_theta = np.sin(start_vertical_angle[:, np.newaxis] + signed_vertical_angle[:, np.newaxis] * t)
+        phi_t_derivative = horizontal_angle[:, np.newaxis]
+        theta_t_derivative = signed_vertical_angle[:, np.newaxis]
+        values = np.sqrt(
+            r_t_derivative**2 + sin_theta**2 * phi_t_derivative**2 + r**2 * theta_t_derivative**2
+        )
+        return values @ weights
+
+    start_dist, end_dist, horizontal_angle, start_vertical_angle, signed_vertical_angle = (
+        np.atleast_1d(np.asarray(a, dtype=float))
+        for a in (start_dist, end_dist, horizontal_angle, start_vertical_angle, signed_vertical_angle)
+    )
+    lengths = integrate(order)
+    return lengths, np.abs(lengths - integrate(max(order // 2, 1)))
 
 
 class Movement(RobotActivity):
     # TODO - return normalized params
 
-    def __init__(self, start: Point3D, end: Point3D, mass: float, robot: Robot):
+    def __init__(self, points: Points3D, mass: float, robot: Robot):
         super().__init__(mass, robot)
-        self.start = start
-        self.end = end
+        # coordinates are kept as an array (e.g. a view of all points loaded from JSON at once), Point3D instances
+        # are created only when start or end is accessed
+        self.points = points
+        self._start: Optional[Point3D] = None
+        self._end: Optional[Point3D] = None
+
+    @property
+    def start(self) -> Point3D:
+        """
+        Returns starting 3D coordinates (in millimeters).
+        """
+        if self._start is None:
+            self._start = self.points[0]
+
+        return self._start
+
+    @property
+    def end(self) -> Point3D:
+        """
+        Returns ending 3D coordinates (in millimeters).
+        """
+        if self._end is None:
+            self._end = self.points[-1]
+
+        return self._end
 
     @abstractmethod
     def length(self) -> float:
@@ -64,17 +152,13 @@ class Movement(RobotActivity):
         """
         Returns payload distance from robot axis at the beginning of the movement (in millimeters).
         """
-        projected_axis = g3d.null_z(self.axis())
-        projected_start = g3d.null_z(self.start)
-        return g3d.distance(projected_axis, projected_start)
+        return g3d.horizontal_distance(self.axis(), self.start)
 
     def end_distance(self):
         """
         Returns payload distance from robot axis at the end of the movement (in millimeters).
         """
-        projected_axis = g3d.null_z(self.axis())
-        projected_end = g3d.null_z(self.end)
-        return g3d.distance(projected_axis, projected_end)
+        return g3d.horizontal_distance(self.axis(), self.end)
 
     def margin_distance(self):
         """
@@ -113,16 +197,15 @@ class SimpleMovement(Movement, ABC):
     Linear or joint movement. Can be used as a partial movement in CompoundMovement.
     """
 
-    def __init__(self, start: Point3D, end: Point3D, mass: float, robot: Robot):
+    def __init__(self, points: Points3D, mass: float, robot: Robot):
         """
         Creates a new simple movement.
 
-        :param start: starting 3D coordinates in millimeters
-        :param end: ending 3D coordinates in millimeters
+        :param points: starting and ending 3D coordinates in millimeters
         :param mass: payload mass during the movement in kilograms
         :param robot: robot of the movement
         """
-        super().__init__(start, end, mass, robot)
+        super().__init__(points, mass, robot)
         self._start_vertical_angle = None
         self._end_vertical_angle = None
         self._horizontal_angle = None
@@ -133,8 +216,7 @@ class SimpleMovement(Movement, ABC):
         Returns starting angle relative to vertical line (z-axis).
         """
         if self._start_vertical_angle is None:
-            top_vector = Point3D(0, 0, 1)
-            self._start_vertical_angle = g3d.angle(top_vector, self.start - self.axis())
+            self._start_vertical_angle = g3d.vertical_angle(self.axis(), self.start)
 
         return self._start_vertical_angle
 
@@ -143,8 +225,7 @@ class SimpleMovement(Movement, ABC):
         Returns ending angle relative to vertical line (z-axis).
         """
         if self._end_vertical_angle is None:
-            top_vector = Point3D(0, 0, 1)
-            self._end_vertical_angle = g3d.angle(top_vector, self.end - self.axis())
+            self._end_vertical_angle = g3d.vertical_angle(self.axis(), self.end)
 
         return self._end_vertical_angle
 
@@ -153,12 +234,7 @@ class SimpleMovement(Movement, ABC):
         Returns absolute horizontal angular change.
         """
         if self._horizontal_angle is None:
-            start_vector = g3d.null_z(self.start - self.axis())
-            end_vector = g3d.null_z(self.end - self.axis())
-            if start_vector.is_zero() or end_vector.is_zero():
-                self._horizontal_angle = 0
-            else:
-                self._horizontal_angle = g3d.angle(start_vector, end_vector)
+            self._horizontal_angle = g3d.horizontal_angle(self.axis(), self.start, self.end)
 
         return self._horizontal_angle
 
@@ -177,18 +253,24 @@ class SimpleMovement(Movement, ABC):
         """
         return abs(self.signed_vertical_angle())
 
+    def signature(self) -> Tuple:
+        return (
+            type(self).__name__,
+            (self.start.x, self.start.y, self.start.z),
+            (self.end.x, self.end.y, self.end.z),
+        ) + super().signature()
+
 
 class LinearMovement(SimpleMovement):
-    def __init__(self, start: Point3D, end: Point3D, mass: float, robot: Robot):
+    def __init__(self, points: Points3D, mass: float, robot: Robot):
         """
         Creates a new linear movement.
 
-        :param start: starting 3D coordinates in millimeters
-        :param end: ending 3D coordinates in millimeters
+        :param points: starting and ending 3D coordinates in millimeters
         :param mass: payload mass during the movement in kilograms
         :param robot: robot of the movement
         """
-        super().__init__(start, end, mass, robot)
+        super().__init__(points, mass, robot)
         self._length = None
         self._avg_distance_from_axis = None
 
@@ -200,15 +282,12 @@ class LinearMovement(SimpleMovement):
 
     def avg_distance_from_axis(self) -> float:
         if self._avg_distance_from_axis is None:
-            def parametrized_distance(t):
-                """
-                Distance between axis and parametrized definition of line segment.
-                """
-                x_part = (self.start.x + (self.end.x - self.start.x)*t - self.axis().x)**2
-                y_part = (self.start.y + (self.end.y - self.start.y)*t - self.axis().y)**2
-                return sqrt(x_part + y_part)
-
-            self._avg_distance_from_axis = integral(parametrized_distance, 0, 1)[0]
+            axis = self.axis()
+            self._avg_distance_from_axis = float(g2d.avg_distances_to_segments(
+                np.array([[axis.x, axis.y]]),
+                np.array([[self.start.x, self.start.y]]),
+                np.array([[self.end.x, self.end.y]]),
+            )[0])
 
         return self._avg_distance_from_axis
 
@@ -222,51 +301,35 @@ class LinearMovement(SimpleMovement):
 
 
 class JointMovement(SimpleMovement):
-    def __init__(self, start: Point3D, end: Point3D, mass: float, robot: Robot):
+    def __init__(self, points: Points3D, mass: float, robot: Robot):
         """
         Creates a new joint movement.
 
-        :param start: starting 3D coordinates in millimeters
-        :param end: ending 3D coordinates in millimeters
+        :param points: starting and ending 3D coordinates in millimeters
         :param mass: payload mass during the movement in kilograms
         :param robot: robot of the movement
         """
-        super().__init__(start, end, mass, robot)
+        super().__init__(points, mass, robot)
         self._length = None
         self._avg_distance_from_axis = None
 
     def length(self) -> float:
         if self._length is None:
-            start_dist = g3d.distance(self.axis(), self.start)
-            end_dist = g3d.distance(self.axis(), self.end)
-            horizontal_angle = self.horizontal_angle()
-            start_angle = self.start_vertical_angle()
-            signed_vertical_angle = self.signed_vertical_angle()
-
-            def spherical_form_movement_length(t):
-                """
-                Movement parametrized in spherical form, i.e. t = r*sin(theta)*cos(phi), y = r*sin(theta)*sin(phi),
-                z = r*cos(theta) (where r, theta and phi are functions of t, 0 <= t <= 1) and transformed to
-                length relation.
-                """
-                r = (start_dist + (end_dist - start_dist) * t)
-                r_t_derivative = end_dist - start_dist
-                sin_theta = sin(start_angle + signed_vertical_angle * t)
-                phi_t_derivative = horizontal_angle
-                theta_t_derivative = signed_vertical_angle
-                return sqrt(r_t_derivative**2 + sin_theta**2 * phi_t_derivative**2 + r**2 * theta_t_derivative**2)
-
-            self._length = integral(spherical_form_movement_length, 0, 1)[0]
+            lengths, _ = joint_lengths(
+                g3d.distance(self.axis(), self.start),
+                g3d.distance(self.axis(), self.end),
+                self.horizontal_angle(),
+                self.start_vertical_angle(),
+                self.signed_vertical_angle(),
+            )
+            self._length = float(lengths[0])
 
         return self._length
 
     def avg_distance_from_axis(self) -> float:
         if self._avg_distance_from_axis is None:
-            projected_axis = g3d.null_z(self.axis())
-            projected_start = g3d.null_z(self.start)
-            projected_end = g3d.null_z(self.end)
-            self._avg_distance_from_axis = (g3d.distance(projected_axis, projected_start) +
-                                           g3d.distance(projected_start, projected_end)) / 2
+            self._avg_distance_from_axis = (g3d.horizontal_distance(self.axis(), self.start) +
+                                           g3d.horizontal_distance(self.start, self.end)) / 2
 
         return self._avg_distance_from_axis
 
@@ -290,13 +353,19 @@ class CompoundMovement(Movement):
         """
         assert len(parts) > 0
 
-        super().__init__(parts[0].start, parts[-1].end, mass, robot)
+        super().__init__(Points3D(np.vstack((parts[0].points.coords[0], parts[-1].points.coords[-1]))), mass, robot)
         self._length = None
         self._horizontal_angle = None
         self._vertical_angle = None
         self._avg_distance_from_axis = None
         self._parts = parts
 
+    def parts(self) -> List[SimpleMovement]:
+        """
+        Returns partial simple movements.
+        """
+        return self._parts
+
     def length(self) -> float:
         return sum(map(lambda part: part.length(), self._parts))
 
@@ -307,7 +376,14 @@ class CompoundMovement(Movement):
         return sum(map(lambda part: part.vertical_angle(), self._parts))
 
     def avg_distance_from_axis(self) -> float:
-        return sum(map(lambda part: part.avg_distance_from_axis() * part.length(), self._parts)) / self.length()
+        length = self.length()
+        if length == 0:
+            # average over a zero-length path is undefined, as with the vectorized features
+            return nan
+        return sum(map(lambda part: part.avg_distance_from_axis() * part.length(), self._parts)) / length
+
+    def signature(self) -> Tuple:
+        return (type(self).__name__, tuple(map(lambda part: part.signature(), self._parts))) + super().signature()
 
     def __str__(self):
         a = 'Compound movement from {} to {} of robot {} with {}kg payload through points '.format(
@@ -341,7 +417,7 @@ if __name__ == '__main__':
         robot_weight = 260.0
         input_power = 2000
         robot = Robot('r_1', axis, robot_weight, load_capacity, input_power)
-        joint = JointMovement(start, end, mass, robot)
+        joint = JointMovement(Points3D.from_points((start, end)), mass, robot)
         print(joint.length())
 
     def compound_test():
@@ -355,8 +431,8 @@ if __name__ == '__main__':
         point_1 = Point3D(0, 1, 0)
         point_2 = Point3D(1, 1, 0)
         point_3 = Point3D(1, 0, 0)
-        part_1 = JointMovement(point_1, point_2, mass, robot)
-        part_2 = LinearMovement(point_2, point_3, mass, robot)
+        part_1 = JointMovement(Points3D.from_points((point_1, point_2)), mass, robot)
+        part_2 = LinearMovement(Points3D.from_points((point_2, point_3)), mass, robot)
         compound_movement = CompoundMovement([part_1, part_2], mass, robot)
 
         print('length', compound_movement.length())
@@ -1,31 +1,42 @@
+from typing import Optional
+
 import utils.geometry_3d as g3d
 from preprocessing.robot import Robot
 from preprocessing.robot_activity import RobotActivity
-from utils.geometry_3d import Point3D
+from utils.geometry_3d import Point3D, Points3D
 
 
 class Position(RobotActivity):
-    def __init__(self, position: Point3D, mass: float, robot: Robot):
+    def __init__(self, points: Points3D, mass: float, robot: Robot):
         """
         Creates a new position.
 
-        :param position: 3D coordinates in millimeters
+        :param points: 3D coordinates in millimeters (one point)
         :param mass: payload mass at the position in kilograms
         :param robot: robot of the position
         """
         super().__init__(mass, robot)
-        self.position = position
+        self.points = points
+        self._position: Optional[Point3D] = None
         self._distance_from_axis = None
 
+    @property
+    def position(self) -> Point3D:
+        """
+        Returns 3D coordinates (in millimeters).
+        """
+        if self._position is None:
+            self._position = self.points[0]
+
+        return self._position
+
     def distance_from_axis(self) -> float:
         """
         Computes distance from axis to movement (in millimeters).
         Uses 2D projection, i.e. only 'x' and 'y' coordinates.
         """
         if self._distance_from_axis is None:
-            projected_axis = g3d.null_z(self.axis())
-            projected_position = g3d.null_z(self.position)
-            self._distance_from_axis = g3d.distance(projected_axis, projected_position)
+            self._distance_from_axis = g3d.horizontal_distance(self.axis(), self.position)
 
         return self._distance_from_axis
 
@@ -1,3 +1,5 @@
+from typing import Tuple
+
 from preprocessing.robot import Robot
 from utils.geometry_3d import Point3D
 from utils.unsupported_parameter_error import UnsupportedParameterError
@@ -50,6 +52,20 @@ class RobotActivity:
         """
         return self.robot.axis
 
+    def signature(self) -> Tuple:
+        """
+        Returns a tuple describing the activity content, i.e. everything what its NN parameters depend on.
+        Activities with equal signatures have equal NN parameters (robot id is not part of the signature).
+        """
+        axis = self.robot.axis
+        return (
+            self._mass,
+            self.robot.weight,
+            self.robot.load_capacity,
+            self.robot.input_power,
+            (axis.x, axis.y, axis.z),
+        )
+
     def get_nn_param(self, param: str) -> float:
         """
         Returns given parameter value. Raises UnsupportedParameterError if the parameter is not supported.
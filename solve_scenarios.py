@@ -0,0 +1,55 @@
+import argparse
+import os
+from typing import List, Optional
+
+from ilp.scenarios import solve_scenarios, random_scenarios
+from nn.movement_duration_nn import MovementDurationNN
+from nn.movement_energy_nn import MovementEnergyNN
+from nn.position_nn import PositionNN
+from utils.json import read_json_from_file, save_to_json_file
+from utils.validation import check_cell
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description='Optimizes a robotic cell under payload weight and robot position perturbations.',
+    )
+    parser.add_argument('input', help='base robotic cell file')
+    parser.add_argument('--scenarios', help='JSON file with a list of scenarios (see ilp.scenarios.Scenario)')
+    parser.add_argument('--random', type=int, default=0, help='number of randomly generated scenarios')
+    parser.add_argument('--payload-sigma', type=float, default=0.1,
+                        help='relative deviation of payload weights of random scenarios')
+    parser.add_argument('--position-sigma', type=float, default=10.0,
+                        help='deviation of robot positions of random scenarios in millimeters')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='number of worker processes')
+    parser.add_argument('--threads', type=int, default=1, help='Gurobi threads per worker')
+    parser.add_argument('--keep-solutions', action='store_true', help='save solutions of all scenarios')
+    parser.add_argument('--output', help='JSON file to save the results to')
+    parsed = parser.parse_args(args)
+
+    cell_json = read_json_from_file(parsed.input)
+    check_cell(cell_json)
+    scenarios = read_json_from_file(parsed.scenarios) if parsed.scenarios is not None else []
+    scenarios += random_scenarios(cell_json, parsed.random, parsed.payload_sigma, parsed.position_sigma, parsed.seed)
+
+    results = solve_scenarios(
+        cell_json, scenarios, PositionNN(), MovementEnergyNN(), MovementDurationNN(),
+        workers=parsed.workers, threads=parsed.threads, keep_solutions=parsed.keep_solutions, bulk=True,
+    )
+    print('{:<24} {:>14} {:>11} {:>10}  {}'.format('scenario', 'objective', 'recomputed', 'solve [s]', 'status'))
+    for result in [results['base']] + results['scenarios']:
+        print('{:<24} {:>14} {:>11} {:>10.4f}  {}'.format(
+            str(result['id']), '{:.6g}'.format(result['objective']) if result['objective'] is not None else '-',
+            result['recomputed'], result['solve_time'], result['status'],
+        ))
+    summary = results['statistics']
+    print('Solved {} of {} scenarios'.format(summary['solved'], summary['scenarios']))
+    if 'objective' in summary:
+        print('Objective: ' + ', '.join('{} {:.6g}'.format(k, v) for k, v in summary['objective'].items()))
+    if parsed.output is not None:
+        save_to_json_file(parsed.output, results)
+
+
+if __name__ == '__main__':
+    main()
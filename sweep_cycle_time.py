@@ -0,0 +1,60 @@
+import argparse
+from typing import List, Optional
+
+from ilp.cycle_time_sweep import cycle_time_grid, sweep_cycle_times, pareto_front, minimize_cycle_time
+from ilp.model import Model
+from nn.movement_duration_nn import MovementDurationNN
+from nn.movement_energy_nn import MovementEnergyNN
+from nn.position_nn import PositionNN
+from utils.json import read_json_from_file, save_to_json_file
+from utils.validation import check_cell
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description='Optimizes a robotic cell for a range of cycle times and prints the cycle time - energy front.',
+    )
+    parser.add_argument('input', help='robotic cell file')
+    parser.add_argument('--range', type=float, default=0.1,
+                        help='relative range of cycle times around the cell cycle time, e.g. 0.05 for +-5 %%')
+    parser.add_argument('--count', type=int, default=9, help='number of cycle times')
+    parser.add_argument('--energy-cap', type=float,
+                        help='also find the shortest cycle time whose minimal energy does not exceed this cap')
+    parser.add_argument('--threads', type=int, default=1, help='Gurobi threads')
+    parser.add_argument('--time-limit', type=float, help='time limit of each optimization in seconds')
+    parser.add_argument('--output', help='JSON file to save the sweep (and the capped solution) to')
+    parsed = parser.parse_args(args)
+
+    cell_json = read_json_from_file(parsed.input)
+    check_cell(cell_json)
+    model = Model(PositionNN(), MovementEnergyNN(), MovementDurationNN())
+    model.backend.set_params(threads=parsed.threads, output=False)
+    model.load_from_json(cell_json, bulk=True)
+
+    grid = cycle_time_grid(cell_json['cycle_time'], parsed.range, parsed.count)
+    points = sweep_cycle_times(model, grid, time_limit=parsed.time_limit)
+    front = pareto_front(points)
+    print('{:>12} {:>14} {:>10}  {}'.format('cycle time', 'energy', 'solve [s]', 'status'))
+    for point in points:
+        print('{:>12.4f} {:>14} {:>10.4f}  {}{}'.format(
+            point['cycle_time'], '{:.6g}'.format(point['energy']) if point['energy'] is not None else '-',
+            point['solve_time'], point['status'], ' (front)' if point in front else '',
+        ))
+
+    output = {'points': points, 'front': front}
+    if parsed.energy_cap is not None:
+        capped = minimize_cycle_time(model, parsed.energy_cap, grid, time_limit=parsed.time_limit)
+        output['energy_cap'] = parsed.energy_cap
+        output['capped'] = capped
+        if capped is None:
+            print('Energy cap {} is exceeded at all cycle times'.format(parsed.energy_cap))
+        else:
+            print('Shortest cycle time within energy cap {}: {:.4f} (energy {:.6g})'.format(
+                parsed.energy_cap, capped['cycle_time'], capped['energy'],
+            ))
+    if parsed.output is not None:
+        save_to_json_file(parsed.output, output)
+
+
+if __name__ == '__main__':
+    main()
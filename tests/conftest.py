@@ -0,0 +1,32 @@
+import glob
+import os
+import sys
+from typing import Dict, List
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmark.cell_generator import generate_cell  # noqa: E402
+from nn.movement_duration_nn import MovementDurationNN  # noqa: E402
+from nn.movement_energy_nn import MovementEnergyNN  # noqa: E402
+from nn.position_nn import PositionNN  # noqa: E402
+from utils.json import read_json_from_file  # noqa: E402
+
+SAMPLE_CELL_FILES = sorted(glob.glob(os.path.join(ROOT, '_inputs', 'optimization', 'robotic_cell_0?.json')))
+
+
+@pytest.fixture(scope='session')
+def nns():
+    return PositionNN(), MovementEnergyNN(), MovementDurationNN()
+
+
+@pytest.fixture(scope='session')
+def sample_cells() -> List[Dict]:
+    return [read_json_from_file(f) for f in SAMPLE_CELL_FILES]
+
+
+@pytest.fixture(scope='session')
+def generated_cells() -> List[Dict]:
+    return [generate_cell(3, 6, collision_density=0.5, offset_density=0.2, seed=seed) for seed in range(3)]
@@ -0,0 +1,48 @@
+import pytest
+
+from benchmark.cell_generator import generate_cell
+from ilp.model import Model
+
+
+def solve(nns, cell_json, **load_kwargs) -> Model:
+    model = Model(*nns)
+    model.backend.set_params(output=False)
+    model.load_from_json(cell_json, **load_kwargs)
+    model.optimize()
+    assert model.backend.has_solution()
+    return model
+
+
+def presolve_cells(sample_cells, generated_cells):
+    # collision pairs of activities of one robot are always redundant
+    same_robot = generate_cell(2, 6, collision_density=0, offset_density=0.2, seed=5)
+    same_robot['collisions'] = [{'a_id': 'r_0_a_1', 'b_id': 'r_0_a_3'}, {'a_id': 'r_1_a_5', 'b_id': 'r_1_a_0'}]
+    # tight time offsets force the order of the colliding activities
+    forced_order = generate_cell(2, 4, collision_density=0, offset_density=0, seed=6)
+    forced_order['time_offsets'] = [{'a_id': 'r_0_a_0', 'b_id': 'r_1_a_0', 'min_offset': 2.0, 'max_offset': 3.0}]
+    forced_order['collisions'] = [{'a_id': 'r_0_a_0', 'b_id': 'r_1_a_0'}, {'a_id': 'r_0_a_1', 'b_id': 'r_1_a_3'}]
+    return sample_cells + generated_cells + [same_robot, forced_order]
+
+
+def test_presolve_keeps_optimal_objective(nns, sample_cells, generated_cells):
+    for cell_json in presolve_cells(sample_cells, generated_cells):
+        model = solve(nns, cell_json)
+        presolved = solve(nns, cell_json, presolve=True)
+        assert presolved.presolved
+        assert presolved.backend.objective_value() == pytest.approx(model.backend.objective_value(), rel=1e-4)
+        assert presolved.backend.statistics()['binaries'] <= model.backend.statistics()['binaries']
+
+
+def test_presolve_drops_and_fixes_pairs(nns, sample_cells, generated_cells):
+    same_robot, forced_order = presolve_cells(sample_cells, generated_cells)[-2:]
+    assert len(solve(nns, same_robot, presolve=True).collisions) == 0
+
+    presolved = solve(nns, forced_order, presolve=True)
+    fixed = [x for a, b, x in presolved.collisions if (a.id, b.id) == ('r_0_a_0', 'r_1_a_0')]
+    assert len(fixed) == 1 and fixed[0].LB == fixed[0].UB == 1
+
+
+def test_presolved_model_cannot_be_edited(nns, sample_cells):
+    presolved = solve(nns, sample_cells[1], presolve=True)
+    with pytest.raises(ValueError):
+        presolved.set_cycle_time(presolved.cycle_time + 1)
@@ -0,0 +1,103 @@
+import io
+import json
+
+import pytest
+
+from ilp.model import Model
+from utils.bad_input_file_error import BadInputFileError
+from utils.json_stream import JsonStreamReader, read_top_level_value
+
+BUFFER_SIZES = [1, 3, 7, 64, 1 << 16]
+
+
+def write_cell(tmp_path, cell_json, name: str = 'cell.json', indent=2) -> str:
+    filename = str(tmp_path / name)
+    with open(filename, 'w') as file:
+        json.dump(cell_json, file, indent=indent)
+    return filename
+
+
+def stream_cell(text: str, buffer_size: int):
+    """
+    Reads robotic cell by the pull parser, robots and their keys one at a time.
+    """
+    reader = JsonStreamReader(io.StringIO(text), buffer_size)
+    cell_json = dict()
+    for key in reader.iter_object():
+        if key != 'robots':
+            cell_json[key] = reader.read_value()
+            continue
+        cell_json[key] = []
+        for _ in reader.iter_array():
+            cell_json[key].append({robot_key: reader.read_value() for robot_key in reader.iter_object()})
+    return cell_json
+
+
+def reordered(cell_json):
+    """
+    Returns the cell with relations before robots and activities before the other robot parameters.
+    """
+    return {
+        'collisions': cell_json.get('collisions', []),
+        'robots': [dict([('activities', r['activities'])] + [(k, v) for k, v in r.items() if k != 'activities'])
+                   for r in cell_json['robots']],
+        'time_offsets': cell_json.get('time_offsets', []),
+        'cycle_time': cell_json['cycle_time'],
+    }
+
+
+@pytest.mark.parametrize('buffer_size', BUFFER_SIZES)
+def test_reader_matches_json_module(sample_cells, generated_cells, buffer_size):
+    special = dict(sample_cells[0], description='quotes " and \\\\ backslashes \\" é \U0001f916 [{,:}]',
+                   numbers=[0, -1, 1.5e-3, 12345678901234567890, -0.0, 1E+2, True, False, None], empty=[{}, []])
+    for cell_json in sample_cells + generated_cells + [special]:
+        for indent in (None, 2):
+            text = json.dumps(cell_json, indent=indent)
+            assert stream_cell(text, buffer_size) == json.loads(text)
+
+
+def test_skipped_values_and_top_level_lookup(tmp_path, generated_cells):
+    cell_json = reordered(generated_cells[0])
+    filename = write_cell(tmp_path, cell_json)
+    for key in cell_json:
+        assert read_top_level_value(filename, key) == cell_json[key]
+    assert read_top_level_value(filename, 'missing', 42) == 42
+
+
+@pytest.mark.parametrize('text', ['{"cycle_time": 10, "robots": [{"id": "r"', '{"cycle_time" 10}', '[1, 2 3]',
+                                  '{"robots": [1, 2], "cycle_time": 1', '{1: 2}'])
+def test_invalid_json_is_rejected(text):
+    reader = JsonStreamReader(io.StringIO(text), 4)
+    with pytest.raises(BadInputFileError):
+        if text.startswith('['):
+            for _ in reader.iter_array():
+                reader.read_value()
+        else:
+            for _ in reader.iter_object():
+                reader.skip_value()
+
+
+def model_summary(model: Model):
+    model.model.update()
+    constraints = sorted(
+        (c.ConstrName, c.Sense, round(c.RHS, 9),
+         tuple(sorted((model.model.getRow(c).getVar(i).VarName, round(model.model.getRow(c).getCoeff(i), 9))
+                      for i in range(model.model.getRow(c).size()))))
+        for c in model.model.getConstrs()
+    )
+    variables = sorted((v.VarName, v.LB, v.UB, v.VType, round(v.Obj, 9)) for v in model.model.getVars())
+    return variables, constraints
+
+
+@pytest.mark.parametrize('load_kwargs', [dict(), dict(bulk=True, chunk_size=2), dict(presolve=True)])
+def test_streamed_model_matches_loaded_model(tmp_path, nns, sample_cells, generated_cells, load_kwargs):
+    for i, cell_json in enumerate(sample_cells + generated_cells):
+        model = Model(*nns)
+        model.load_from_json(cell_json, **{k: v for k, v in load_kwargs.items() if k != 'chunk_size'})
+        for streamed_json in (cell_json, reordered(cell_json)):
+            streamed = Model(*nns)
+            streamed.load_from_json_stream(write_cell(tmp_path, streamed_json, 'cell_{}.json'.format(i)),
+                                           **load_kwargs)
+            assert streamed.cycle_time == model.cycle_time
+            assert list(streamed.activities.keys()) == list(model.activities.keys())
+            assert model_summary(streamed) == model_summary(model)
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pytest
+from scipy.integrate import quad
+
+from preprocessing.movement import JointMovement, LinearMovement, joint_lengths
+from preprocessing.robot import Robot
+from utils.geometry_2d import avg_distances_to_segments
+import utils.geometry_3d as g3d
+from utils.geometry_3d import Point3D, Points3D
+from utils.json import movement_from_json, read_json_from_file, robot_from_json
+
+TRAINING_MOVEMENTS_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '_inputs', 'training', 'movements_01.json'
+)
+
+
+def training_movements(movement_type: str):
+    training_json = read_json_from_file(TRAINING_MOVEMENTS_FILE)
+    robots = {r['id']: robot_from_json(r) for r in training_json['robots']}
+    return [
+        movement_from_json(m, robots)
+        for m in training_json['movements'] if m['movement_type'] == movement_type
+    ]
+
+
+def random_movements(movement_class, count: int = 50, seed: int = 0):
+    rnd = np.random.default_rng(seed)
+    robot = Robot('r', Point3D(100, 200, 0), 240, 15, 2000)
+    return [movement_class(Points3D(rnd.uniform(-2000, 2000, (2, 3))), 5, robot) for _ in range(count)]
+
+
+def quad_avg_distance_from_axis(movement) -> float:
+    """
+    Average horizontal distance of linear movement from robot axis integrated by adaptive quadrature.
+    """
+    start, end, axis = movement.start, movement.end, movement.axis()
+
+    def parametrized_distance(t):
+        return np.hypot(start.x + (end.x - start.x) * t - axis.x, start.y + (end.y - start.y) * t - axis.y)
+
+    return quad(parametrized_distance, 0, 1, epsabs=1e-12, epsrel=1e-12)[0]
+
+
+def quad_joint_length(movement) -> float:
+    """
+    Length of joint movement in spherical form integrated by adaptive quadrature.
+    """
+    start_dist = g3d.distance(movement.axis(), movement.start)
+    end_dist = g3d.distance(movement.axis(), movement.end)
+    horizontal_angle = movement.horizontal_angle()
+    start_angle = movement.start_vertical_angle()
+    signed_vertical_angle = movement.signed_vertical_angle()
+
+    def spherical_form_movement_length(t):
+        r = start_dist + (end_dist - start_dist) * t
+        sin_theta = np.sin(start_angle + signed_vertical_angle * t)
+        return np.sqrt((end_dist - start_dist) ** 2 + sin_theta ** 2 * horizontal_angle ** 2 +
+                       r ** 2 * signed_vertical_angle ** 2)
+
+    return quad(spherical_form_movement_length, 0, 1, epsabs=1e-12, epsrel=1e-12)[0]
+
+
+def test_linear_avg_distance_from_axis_matches_quadrature():
+    movements = training_movements('linear') + random_movements(LinearMovement)
+    assert len(movements) > 50
+    for movement in movements:
+        assert movement.avg_distance_from_axis() == pytest.approx(quad_avg_distance_from_axis(movement), rel=1e-9,
+                                                                  abs=1e-9)
+
+
+def test_avg_distances_to_special_segments():
+    points = np.array([[0.0, 0.0], [0.0, 0.0], [1.0, 1.0], [5.0, 0.0]])
+    starts = np.array([[1.0, 0.0], [-1.0, 0.0], [1.0, 1.0], [2.0, 3.0]])
+    ends = np.array([[3.0, 0.0], [3.0, 0.0], [4.0, 5.0], [2.0, 3.0]])
+    # collinear segment not containing the point, collinear segment containing it, segment from the point itself
+    # and zero-length segment
+    expected = [2.0, (1 * 1 / 2 + 3 * 3 / 2) / 4, 2.5, np.hypot(3, 3)]
+    assert avg_distances_to_segments(points, starts, ends) == pytest.approx(expected)
+
+
+def test_joint_length_matches_quadrature():
+    movements = training_movements('joint') + random_movements(JointMovement)
+    assert len(movements) > 50
+    for movement in movements:
+        assert movement.length() == pytest.approx(quad_joint_length(movement), rel=1e-10, abs=1e-9)
+
+
+def test_joint_lengths_batch_matches_single_movements():
+    rnd = np.random.default_rng(1)
+    params = [rnd.uniform(0, 2000, 20), rnd.uniform(0, 2000, 20), rnd.uniform(0, np.pi, 20),
+              rnd.uniform(0, np.pi, 20), rnd.uniform(-np.pi / 2, np.pi / 2, 20)]
+    lengths, errors = joint_lengths(*params)
+    for i in range(20):
+        single_lengths, single_errors = joint_lengths(*(p[i] for p in params))
+        assert single_lengths[0] == pytest.approx(lengths[i], rel=1e-12)
+        assert single_errors[0] == pytest.approx(errors[i], rel=1e-6, abs=1e-12)
+    # the error estimate (difference from the rule with half of the nodes) bounds the actual error
+    exact, _ = joint_lengths(*params, order=64)
+    assert np.all(np.abs(lengths - exact) <= errors + 1e-9)
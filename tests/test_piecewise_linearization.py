@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from preprocessing.interpolation import interpolate
+from preprocessing.piecewise_linearization import (
+    evaluate, interpolation_points, linearization_error_bound, pieces_for_error, piecewise_linearize,
+    piecewise_linearize_batch,
+)
+from utils.geometry_2d import Point2D
+
+DATA_POINTS = [Point2D(7.476, 32068), Point2D(9, 26673), Point2D(12.108, 22682), Point2D(20.169, 22030),
+               Point2D(61.956, 40581)]
+
+
+def convex_functions(count: int = 20, seed: int = 0):
+    """
+    Random convex interpolating functions (a, b >= 0) with their domains.
+    """
+    rnd = np.random.default_rng(seed)
+    coefs = np.column_stack([rnd.uniform(0, 50, count), rnd.uniform(0, 50, count), rnd.uniform(-10, 10, count),
+                             rnd.uniform(0, 5, count)])
+    min_xs = rnd.uniform(0.2, 2, count)
+    return coefs, min_xs, min_xs + rnd.uniform(1, 10, count)
+
+
+def max_of_lines(lines, xs: np.ndarray) -> np.ndarray:
+    return np.max([line.q * xs + line.c for line in lines], axis=0)
+
+
+def exact(coefs, xs: np.ndarray) -> np.ndarray:
+    a, b, c, d = coefs
+    return a * xs ** -2 + b * xs ** -1 + c + d * xs
+
+
+@pytest.mark.parametrize('count', [1, 2, 4, 8])
+def test_error_is_half_of_interpolation_error(count):
+    coefs, min_xs, max_xs = convex_functions()
+    for function_coefs, min_x, max_x in zip(coefs, min_xs, max_xs):
+        xs = np.linspace(min_x, max_x, 4001)
+        error = max_of_lines(piecewise_linearize(function_coefs, min_x, max_x, count), xs) - exact(function_coefs, xs)
+
+        breakpoints, values = interpolation_points(function_coefs, min_x, max_x, count)
+        interpolation_error = np.max(np.interp(xs, breakpoints, values) - exact(function_coefs, xs))
+        bound = linearization_error_bound(function_coefs[np.newaxis], min_x, max_x, count)[0]
+
+        # minimax lines deviate to both sides by half of the interpolation error (up to the grid resolution)
+        assert np.max(np.abs(error)) <= interpolation_error / 2 * 1.01 + 1e-9
+        assert np.max(np.abs(error)) <= bound / 2 * 1.01 + 1e-9
+        assert error.max() == pytest.approx(-error.min(), rel=0.05, abs=1e-9)
+
+
+def test_interpolated_data_is_approximated():
+    coefs = interpolate(DATA_POINTS)
+    xs = np.linspace(7.476, 61.956, 4001)
+    errors = [
+        np.max(np.abs(max_of_lines(piecewise_linearize(coefs, 7.476, 61.956, count), xs) - exact(coefs, xs)))
+        for count in (2, 4, 8)
+    ]
+    assert errors[0] > errors[1] > errors[2]
+    assert errors[2] < 5e-3 * np.max(exact(coefs, xs))
+
+
+def test_batch_matches_single_functions():
+    coefs, min_xs, max_xs = convex_functions()
+    counts = np.arange(len(coefs)) % 5 + 1
+    batch = piecewise_linearize_batch(coefs, min_xs, max_xs, counts)
+    for lines, function_coefs, min_x, max_x, count in zip(batch, coefs, min_xs, max_xs, counts):
+        single = piecewise_linearize(function_coefs, min_x, max_x, int(count))
+        assert len(lines) == count
+        assert [(line.q, line.c) for line in lines] == pytest.approx([(line.q, line.c) for line in single])
+
+
+def test_degenerated_domain_gives_one_constant_line():
+    coefs = interpolate(DATA_POINTS)
+    lines = piecewise_linearize(coefs, 12, 12, 4)
+    assert len(lines) == 1
+    assert lines[0].q == 0
+    assert lines[0].c == pytest.approx(evaluate(coefs, 12))
+    assert lines[0].c == pytest.approx(exact(coefs, np.array([12.0]))[0])
+
+
+def test_pieces_for_error_meets_error():
+    coefs, min_xs, max_xs = convex_functions()
+    counts = pieces_for_error(coefs, min_xs, max_xs, 0.05, max_count=32)
+    for function_coefs, min_x, max_x, count in zip(coefs, min_xs, max_xs, counts):
+        if count < 32:
+            assert linearization_error_bound(function_coefs[np.newaxis], min_x, max_x, count)[0] <= 0.05
+        if 1 < count < 32:
+            assert linearization_error_bound(function_coefs[np.newaxis], min_x, max_x, count - 1)[0] > 0.05
@@ -0,0 +1,118 @@
+import copy
+import random
+
+import numpy as np
+import pytest
+
+from ilp.model import Model
+from ilp.solution_cache import SolutionCache, canonical_cell, cell_signature
+
+SETTINGS = {'nns': ['v1'], 'energy_tolerance': None}
+
+
+def reordered(value, rnd: random.Random):
+    """
+    Returns the value with shuffled keys of all objects.
+    """
+    if isinstance(value, dict):
+        keys = list(value.keys())
+        rnd.shuffle(keys)
+        return {k: reordered(value[k], rnd) for k in keys}
+    if isinstance(value, list):
+        return [reordered(v, rnd) for v in value]
+    return value
+
+
+def with_noise(value, relative: float):
+    if isinstance(value, dict):
+        return {k: with_noise(v, relative) for k, v in value.items()}
+    if isinstance(value, list):
+        return [with_noise(v, relative) for v in value]
+    if isinstance(value, float):
+        return value * (1 + relative)
+    return value
+
+
+def equivalent_variants(cell_json):
+    """
+    Semantically identical variants of the cell: reordered keys, float noise, another description,
+    swapped and shuffled collision pairs and shuffled time offsets.
+    """
+    rnd = random.Random(0)
+    relations = copy.deepcopy(cell_json)
+    relations['collisions'] = [{'b_id': c['a_id'], 'a_id': c['b_id']} for c in cell_json.get('collisions', [])][::-1]
+    relations['time_offsets'] = cell_json.get('time_offsets', [])[::-1]
+    return [
+        reordered(cell_json, rnd),
+        with_noise(cell_json, 1e-12),
+        dict(cell_json, description='regenerated'),
+        relations,
+    ]
+
+
+def solve(nns, cell_json, cache=None) -> Model:
+    model = Model(*nns, solution_cache=cache)
+    model.backend.set_params(output=False)
+    model.load_from_json(cell_json)
+    model.optimize()
+    return model
+
+
+def test_equivalent_cells_have_the_same_signature(sample_cells, generated_cells):
+    for cell_json in sample_cells + generated_cells:
+        key, structure, features = cell_signature(cell_json, SETTINGS)
+        for variant in equivalent_variants(cell_json):
+            assert canonical_cell(variant) == canonical_cell(cell_json)
+            variant_key, variant_structure, variant_features = cell_signature(variant, SETTINGS)
+            assert (variant_key, variant_structure) == (key, structure)
+            assert variant_features == pytest.approx(features)
+
+
+def test_different_cells_have_different_keys(generated_cells):
+    cell_json = generated_cells[0]
+    key, structure, features = cell_signature(cell_json, SETTINGS)
+
+    changed = copy.deepcopy(cell_json)
+    changed['robots'][0]['activities'][0]['min_duration'] *= 1.01
+    changed_key, changed_structure, changed_features = cell_signature(changed, SETTINGS)
+    assert changed_key != key
+    assert changed_structure == structure
+    assert np.count_nonzero(np.array(changed_features) != np.array(features)) == 1
+
+    robots = dict(cell_json, robots=cell_json['robots'][::-1])
+    assert cell_signature(robots, SETTINGS)[0] != key
+    assert cell_signature(cell_json, dict(SETTINGS, energy_tolerance=0.01))[0] != key
+
+
+def test_cache_hit_returns_solution_of_direct_solve(tmp_path, nns, sample_cells, generated_cells):
+    for i, cell_json in enumerate(sample_cells + generated_cells):
+        direct = solve(nns, cell_json)
+        directory = str(tmp_path / str(i))
+        solved = solve(nns, cell_json, SolutionCache(directory))
+        assert solved.cached_entry is None
+
+        # a new cache reads the stored entry, variants of the cell are hits too
+        cache = SolutionCache(directory)
+        for variant in [cell_json] + equivalent_variants(cell_json):
+            cached = solve(nns, variant, cache)
+            assert cached.cached_entry is not None
+            assert cached.cached_entry['objective'] == pytest.approx(direct.backend.objective_value())
+            assert cached.solution_json_dict() == solved.solution_json_dict()
+        # full precision values of the solution which filled the cache
+        cached_columns = solve(nns, cell_json, cache).solution_columns()
+        for column, values in solved.solution_columns().items():
+            assert list(cached_columns[column]) == list(values)
+        assert cache.stats()['hits'] == 6
+
+
+def test_near_miss_gives_the_same_optimum(nns, generated_cells):
+    cache = SolutionCache()
+    for cell_json in generated_cells:
+        solve(nns, cell_json, cache)
+        changed = copy.deepcopy(cell_json)
+        changed['cycle_time'] *= 1.05
+        near_miss = solve(nns, changed, cache)
+        assert near_miss.cached_entry is None
+        assert near_miss.backend.objective_value() == pytest.approx(solve(nns, changed).backend.objective_value(),
+                                                                    rel=1e-4)
+    assert cache.stats()['near_misses'] == len(generated_cells)
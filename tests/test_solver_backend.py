@@ -0,0 +1,47 @@
+import pytest
+
+from ilp.model import Model
+from ilp.solver_backend import GUROBI, HIGHS, OPTIMAL
+
+
+def solve(nns, cell_json, backend: str, **load_kwargs) -> Model:
+    model = Model(*nns, backend=backend)
+    model.backend.set_params(output=False)
+    model.load_from_json(cell_json, bulk=True, **load_kwargs)
+    model.optimize()
+    return model
+
+
+@pytest.mark.parametrize('presolve', [False, True])
+def test_highs_matches_gurobi(nns, sample_cells, generated_cells, presolve):
+    for cell_json in sample_cells + generated_cells:
+        gurobi = solve(nns, cell_json, GUROBI, presolve=presolve)
+        highs = solve(nns, cell_json, HIGHS, presolve=presolve)
+        assert highs.backend.status() == gurobi.backend.status() == OPTIMAL
+        assert highs.backend.statistics() == gurobi.backend.statistics()
+        assert highs.backend.objective_value() == pytest.approx(gurobi.backend.objective_value(), rel=1e-4)
+        assert highs.backend.objective_bound() <= highs.backend.objective_value() + 1e-6
+
+
+def test_highs_solution_is_feasible(nns, generated_cells):
+    for cell_json in generated_cells:
+        model = solve(nns, cell_json, HIGHS)
+        columns = model.solution_columns()
+        assert sum(columns['energy']) == pytest.approx(model.backend.objective_value(), rel=1e-6)
+
+        assert len(model.collisions) == len(cell_json['collisions'])
+        for a, b, _ in model.collisions:
+            a_start, a_end = a.start_time.x, a.start_time.x + a.duration.x
+            b_start, b_end = b.start_time.x, b.start_time.x + b.duration.x
+            assert a_end <= b_start + 1e-6 or b_end <= a_start + 1e-6
+        for activity in model.activities.values():
+            assert activity.duration.x >= activity.min_duration - 1e-6
+
+
+def test_highs_rejects_gurobi_only_modes(nns):
+    with pytest.raises(ValueError):
+        Model(*nns, backend=HIGHS, energy_tolerance=0.01)
+    with pytest.raises(ValueError):
+        Model(*nns, backend=HIGHS, energy_breakpoints=16)
+    with pytest.raises(ValueError):
+        Model(*nns, backend='cplex')
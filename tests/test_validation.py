@@ -0,0 +1,117 @@
+import copy
+import json
+
+import pytest
+
+from ilp.model import Model
+from utils.bad_input_file_error import BadInputFileError
+from utils.validation import SCHEMA_FILENAME, check_cell, compile_schema, load_validator, validate_cell
+
+
+def delete(path):
+    def mutate(cell_json):
+        *parents, key = path
+        for p in parents:
+            cell_json = cell_json[p]
+        del cell_json[key]
+    return mutate
+
+
+def assign(path, value):
+    def mutate(cell_json):
+        *parents, key = path
+        for p in parents:
+            cell_json = cell_json[p]
+        cell_json[key] = value
+    return mutate
+
+
+# each mutation makes the cell robotic_cell_03 invalid
+MUTATIONS = {
+    'missing cycle time': delete(['cycle_time']),
+    'missing robots': delete(['robots']),
+    'no robots': assign(['robots'], []),
+    'cycle time string': assign(['cycle_time'], '10'),
+    'missing robot id': delete(['robots', 0, 'id']),
+    'robot position not object': assign(['robots', 0, 'position'], [0, 0, 0]),
+    'missing axis coordinate': delete(['robots', 0, 'position', 'z']),
+    'negative weight': assign(['robots', 0, 'weight'], -1),
+    'no activities': assign(['robots', 1, 'activities'], []),
+    'unknown activity type': assign(['robots', 0, 'activities', 0, 'type'], 'moving'),
+    'missing activity id': delete(['robots', 0, 'activities', 1, 'id']),
+    'unknown movement type': assign(['robots', 0, 'activities', 2, 'movement_type'], 'circular'),
+    'missing movement end': delete(['robots', 0, 'activities', 2, 'end']),
+    'missing static position': delete(['robots', 0, 'activities', 0, 'position']),
+    'negative min duration': assign(['robots', 0, 'activities', 0, 'min_duration'], -2),
+    'boolean payload': assign(['robots', 0, 'activities', 0, 'payload_weight'], True),
+    'missing offset id': delete(['time_offsets', 0, 'b_id']),
+    'string offset': assign(['time_offsets', 0, 'min_offset'], 'one'),
+    'collisions not array': assign(['collisions'], {'a_id': 'x', 'b_id': 'y'}),
+}
+
+# mutations which are valid by the schema but break cross-references
+REFERENCE_MUTATIONS = {
+    'duplicate robot id': assign(['robots', 1, 'id'], 'r_01'),
+    'duplicate activity id': assign(['robots', 1, 'activities', 0, 'id'], 'sa_01_01a'),
+    'unknown offset activity': assign(['time_offsets', 0, 'a_id'], 'unknown'),
+    'unknown collision activity': assign(['collisions', 0, 'b_id'], 'unknown'),
+}
+
+
+def mutated(cell_json, mutation):
+    result = copy.deepcopy(cell_json)
+    mutation(result)
+    return result
+
+
+def test_valid_cells_have_no_errors(sample_cells, generated_cells):
+    for cell_json in sample_cells + generated_cells:
+        assert validate_cell(cell_json) == []
+        check_cell(cell_json)
+
+
+@pytest.mark.parametrize('name', sorted(MUTATIONS) + sorted(REFERENCE_MUTATIONS))
+def test_invalid_cells_are_rejected(sample_cells, name):
+    mutation = dict(MUTATIONS, **REFERENCE_MUTATIONS)[name]
+    cell_json = mutated(sample_cells[2], mutation)
+    assert len(validate_cell(cell_json)) > 0
+    with pytest.raises(BadInputFileError):
+        check_cell(cell_json)
+
+
+@pytest.mark.parametrize('name', sorted(MUTATIONS) + sorted(REFERENCE_MUTATIONS))
+def test_cells_failing_in_model_are_rejected_up_front(nns, sample_cells, name):
+    cell_json = mutated(sample_cells[2], dict(MUTATIONS, **REFERENCE_MUTATIONS)[name])
+    try:
+        Model(*nns).load_from_json(cell_json)
+    except Exception:
+        assert len(validate_cell(cell_json)) > 0
+
+
+def test_all_errors_are_reported_at_once(sample_cells):
+    cell_json = copy.deepcopy(sample_cells[2])
+    for name in ('negative weight', 'missing movement end', 'string offset', 'unknown collision activity'):
+        dict(MUTATIONS, **REFERENCE_MUTATIONS)[name](cell_json)
+    errors = validate_cell(cell_json)
+    assert len(errors) == 4
+    assert any(error.startswith('$.robots[0].weight') for error in errors)
+    assert any(error.startswith('$.collisions[0].b_id') for error in errors)
+
+
+def test_validator_is_compiled_once():
+    assert load_validator(SCHEMA_FILENAME) is load_validator(SCHEMA_FILENAME)
+
+
+def test_compiled_schema_matches_jsonschema(sample_cells, generated_cells):
+    jsonschema = pytest.importorskip('jsonschema')
+    with open(SCHEMA_FILENAME) as file:
+        schema = json.load(file)
+    # inclusiveMinimum of the schema is meant as minimum (it is not a JSON schema keyword)
+    reference = jsonschema.Draft202012Validator(json.loads(json.dumps(schema).replace('inclusiveMinimum', 'minimum')))
+    validator = compile_schema(schema)
+
+    cells = sample_cells + generated_cells + [mutated(sample_cells[2], m) for m in MUTATIONS.values()]
+    for cell_json in cells:
+        errors = []
+        validator(cell_json, [], errors)
+        assert (len(errors) == 0) == reference.is_valid(cell_json)
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class Point2D:
     def __init__(self, x: float, y: float):
         self.x = x
@@ -23,3 +26,34 @@ def line_through_points(a: Point2D, b: Point2D) -> Line2D:
     q = (a.y - b.y) / (a.x - b.x)
     c = a.y - q * a.x
     return Line2D(q, c)
+
+
+def avg_distances_to_segments(points: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Computes average distances between points and line segments, i.e. (1/|D|) * integral of |P - X| over
+    segment points X, for (N x 2) arrays of points and segment starts and ends.
+
+    With segment parametrized as S + tD (0 <= t <= 1), perpendicular distance h of point P to the segment line
+    and signed projection offsets u0 = ((S - P).D) / |D|^2, u1 = u0 + 1, the average is
+    |D| * (F(u1) - F(u0)) where F(u) = (u * sqrt(u^2 + k^2) + k^2 * asinh(u / k)) / 2 and k = h / |D|.
+    Collinear segments (k = 0) use the limit F(u) = u * |u| / 2 and zero-length segments the distance |S - P|.
+    """
+    w = np.asarray(starts, dtype=float) - np.asarray(points, dtype=float)
+    d = np.asarray(ends, dtype=float) - np.asarray(starts, dtype=float)
+    length_sq = d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1]
+    length = np.sqrt(length_sq)
+    degenerate = length_sq == 0
+    safe_length_sq = np.where(degenerate, 1, length_sq)
+
+    u0 = (w[:, 0] * d[:, 0] + w[:, 1] * d[:, 1]) / safe_length_sq
+    u1 = u0 + 1
+    k = np.abs(w[:, 0] * d[:, 1] - w[:, 1] * d[:, 0]) / safe_length_sq
+    collinear = k == 0
+    safe_k = np.where(collinear, 1, k)
+
+    def antiderivative(u: np.ndarray) -> np.ndarray:
+        general = (u * np.sqrt(u * u + k * k) + k * k * np.arcsinh(u / safe_k)) / 2
+        return np.where(collinear, u * np.abs(u) / 2, general)
+
+    average = length * (antiderivative(u1) - antiderivative(u0))
+    return np.where(degenerate, np.sqrt(w[:, 0] * w[:, 0] + w[:, 1] * w[:, 1]), average)
@@ -1,7 +1,12 @@
-from numpy import sqrt, arccos
+from math import sqrt, acos, nan
+from typing import Dict, Iterable, Sequence, Union
+
+import numpy as np
 
 
 class Point3D:
+    __slots__ = ('x', 'y', 'z')
+
     def __init__(self, x: float, y: float, z: float):
         self.x = x
         self.y = y
@@ -29,6 +34,93 @@ class Point3D:
         return sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
 
 
+class Points3D:
+    """
+    Struct of arrays with N points stored as (N x 3) float64 array of 'x', 'y' and 'z' coordinates.
+    Operations are computed for all points at once without creating Point3D instances.
+    """
+    __slots__ = ('coords',)
+
+    def __init__(self, coords: np.ndarray):
+        self.coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+
+    @staticmethod
+    def from_points(points: Iterable[Point3D]) -> 'Points3D':
+        coords = np.fromiter((c for p in points for c in (p.x, p.y, p.z)), dtype=float)
+        return Points3D(coords)
+
+    @staticmethod
+    def concatenate(points: Sequence['Points3D']) -> 'Points3D':
+        """
+        Stacks coordinates of given point arrays into one array.
+        """
+        if len(points) == 0:
+            return Points3D(np.zeros((0, 3)))
+        return Points3D(np.concatenate([p.coords for p in points]))
+
+    @staticmethod
+    def from_json(points_json: Iterable[Dict]) -> 'Points3D':
+        coords = np.fromiter((c for p in points_json for c in (p['x'], p['y'], p['z'])), dtype=float)
+        return Points3D(coords)
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.coords[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.coords[:, 1]
+
+    @property
+    def z(self) -> np.ndarray:
+        return self.coords[:, 2]
+
+    def __len__(self):
+        return self.coords.shape[0]
+
+    def __getitem__(self, index: int) -> Point3D:
+        x, y, z = self.coords[index]
+        return Point3D(float(x), float(y), float(z))
+
+    def __add__(self, other: Union['Points3D', Point3D]) -> 'Points3D':
+        return Points3D(self.coords + _coords(other))
+
+    def __sub__(self, other: Union['Points3D', Point3D]) -> 'Points3D':
+        return Points3D(self.coords - _coords(other))
+
+    def select(self, mask: np.ndarray) -> 'Points3D':
+        """
+        Returns points selected by given boolean mask, index array or slice (a slice gives a view).
+        """
+        return Points3D(self.coords[mask])
+
+    def is_zero(self) -> np.ndarray:
+        return np.all(self.coords == 0, axis=1)
+
+    def null_z(self) -> 'Points3D':
+        """
+        Creates new points with the same 'x' and 'y' coordinates but 0 'z'.
+        """
+        coords = self.coords.copy()
+        coords[:, 2] = 0
+        return Points3D(coords)
+
+    def magnitude(self) -> np.ndarray:
+        return np.sqrt(np.einsum('ij,ij->i', self.coords, self.coords))
+
+    def __str__(self):
+        return 'Points3D({})'.format(self.coords.tolist())
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def _coords(points: Union[Points3D, Point3D]) -> np.ndarray:
+    if isinstance(points, Points3D):
+        return points.coords
+    return np.array([points.x, points.y, points.z], dtype=float)
+
+
 def distance(a: Point3D, b: Point3D) -> float:
     """
     Computes euclidean distance between given points.
@@ -39,12 +131,53 @@ def distance(a: Point3D, b: Point3D) -> float:
     return sqrt(dx * dx + dy * dy + dz * dz)
 
 
+def horizontal_distance(a: Point3D, b: Point3D) -> float:
+    """
+    Computes euclidean distance between given points projected to x-y plane, i.e. distance(null_z(a), null_z(b)).
+    """
+    dx = (a.x - b.x)
+    dy = (a.y - b.y)
+    return sqrt(dx * dx + dy * dy)
+
+
 def angle(u: Point3D, v: Point3D) -> float:
     """
-    Computes angle between two non-zero vectors.
+    Computes angle between two non-zero vectors. Returns nan if any of the vectors is zero.
+    """
+    magnitudes = u.magnitude() * v.magnitude()
+    if magnitudes == 0:
+        return nan
+    cos_angle = (u.x * v.x + u.y * v.y + u.z * v.z) / magnitudes
+    return acos(min(1.0, max(-1.0, cos_angle)))
+
+
+def vertical_angle(origin: Point3D, point: Point3D) -> float:
+    """
+    Computes angle between vertical line (z-axis) and the vector from origin to point, i.e. angle(Point3D(0, 0, 1),
+    point - origin) without creating the vector. Returns nan if the points are equal.
+    """
+    dx = (point.x - origin.x)
+    dy = (point.y - origin.y)
+    dz = (point.z - origin.z)
+    magnitude = sqrt(dx * dx + dy * dy + dz * dz)
+    if magnitude == 0:
+        return nan
+    return acos(min(1.0, max(-1.0, dz / magnitude)))
+
+
+def horizontal_angle(origin: Point3D, a: Point3D, b: Point3D) -> float:
+    """
+    Computes angle between vectors from origin to a and to b projected to x-y plane, i.e. angle(null_z(a - origin),
+    null_z(b - origin)) without creating the vectors. Returns 0 if any of the projected vectors is zero.
     """
-    cos_angle = (u.x * v.x + u.y * v.y + u.z * v.z) / (u.magnitude() * v.magnitude())
-    return arccos(cos_angle)
+    ux = (a.x - origin.x)
+    uy = (a.y - origin.y)
+    vx = (b.x - origin.x)
+    vy = (b.y - origin.y)
+    if (ux == 0 and uy == 0) or (vx == 0 and vy == 0):
+        return 0
+    cos_angle = (ux * vx + uy * vy) / (sqrt(ux * ux + uy * uy) * sqrt(vx * vx + vy * vy))
+    return acos(min(1.0, max(-1.0, cos_angle)))
 
 
 def null_z(a: Point3D) -> Point3D:
@@ -52,3 +185,30 @@ def null_z(a: Point3D) -> Point3D:
     Creates a new point with the same 'x' and 'y' coordinates but 0 'z'.
     """
     return Point3D(a.x, a.y, 0)
+
+
+def distances(a: Points3D, b: Union[Points3D, Point3D]) -> np.ndarray:
+    """
+    Computes euclidean distances between corresponding points.
+    """
+    return (a - b).magnitude()
+
+
+def horizontal_distances(a: Points3D, b: Union[Points3D, Point3D]) -> np.ndarray:
+    """
+    Computes euclidean distances between corresponding points projected to x-y plane.
+    """
+    d = a.coords[:, :2] - _coords(b)[..., :2]
+    return np.sqrt(np.einsum('ij,ij->i', d, d))
+
+
+def angles(u: Points3D, v: Union[Points3D, Point3D]) -> np.ndarray:
+    """
+    Computes angles between corresponding vectors. Returns nan for pairs with a zero vector.
+    """
+    v_coords = np.broadcast_to(_coords(v), u.coords.shape)
+    magnitudes = u.magnitude() * np.sqrt(np.einsum('ij,ij->i', v_coords, v_coords))
+    dots = np.einsum('ij,ij->i', u.coords, v_coords)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cos_angles = np.where(magnitudes > 0, dots / magnitudes, nan)
+    return np.arccos(np.clip(cos_angles, -1, 1))
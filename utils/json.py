@@ -1,13 +1,15 @@
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List
 
 from preprocessing.movement import SimpleMovement, LinearMovement, JointMovement, Movement, CompoundMovement
 from preprocessing.position import Position
 from preprocessing.robot import Robot
 from utils.bad_input_file_error import BadInputFileError
-from utils.geometry_3d import Point3D
+from utils.geometry_3d import Point3D, Points3D
+from utils.profiling import profiled
 
 
+@profiled('json.parse')
 def read_json_from_file(filename: str) -> Any:
     with open(filename) as file:
         data = json.load(file)
@@ -23,6 +25,10 @@ def point3d_from_json(point_json: Dict) -> Point3D:
     return Point3D(point_json['x'], point_json['y'], point_json['z'])
 
 
+def points3d_from_json(points_json: Iterable[Dict]) -> Points3D:
+    return Points3D.from_json(points_json)
+
+
 def robot_from_json(robot_json: Dict) -> Robot:
     return Robot(
         robot_json['id'],
@@ -33,29 +39,79 @@ def robot_from_json(robot_json: Dict) -> Robot:
     )
 
 
+def _simple_movement(movement_type: str, points: Points3D, payload_weight: float, robot: Robot) -> SimpleMovement:
+    if movement_type == 'linear':
+        return LinearMovement(points, payload_weight, robot)
+    elif movement_type == 'joint':
+        return JointMovement(points, payload_weight, robot)
+    else:
+        raise BadInputFileError(
+            'Partial movement type must be "linear" or "joint", not {}'.format(movement_type)
+        )
+
+
 def simple_movement_from_partial_json(
     partial_movement_json: Dict,
     payload_weight: float,
     robot: Robot,
 ) -> SimpleMovement:
-    movement_type = partial_movement_json['movement_type']
-    start = partial_movement_json['start']
-    end = partial_movement_json['end']
+    return _simple_movement(
+        partial_movement_json['movement_type'],
+        points3d_from_json((partial_movement_json['start'], partial_movement_json['end'])),
+        payload_weight,
+        robot,
+    )
+
+
+def simple_movements_from_partial_json(
+    partial_movements_json: List[Dict],
+    payload_weight: float,
+    robot: Robot,
+) -> List[SimpleMovement]:
+    """
+    Creates partial movements of a compound movement. Coordinates of all parts are loaded into one array
+    and each part uses a view of its rows.
+    """
+    points = points3d_from_json(p[key] for p in partial_movements_json for key in ('start', 'end'))
+    return [
+        _simple_movement(partial_json['movement_type'], points.select(slice(2 * i, 2 * i + 2)), payload_weight, robot)
+        for i, partial_json in enumerate(partial_movements_json)
+    ]
+
+
+def dynamic_movement_from_json(activity_json: Dict, robot: Robot) -> Movement:
+    """
+    Creates a movement of a dynamic activity from robotic cell input JSON.
+    """
+    movement_type = activity_json['movement_type']
+    payload_weight = activity_json['payload_weight']
 
     if movement_type == 'linear':
-        return LinearMovement(start, end, payload_weight, robot)
+        return LinearMovement(
+            points3d_from_json((activity_json['start'], activity_json['end'])),
+            payload_weight,
+            robot,
+        )
     elif movement_type == 'joint':
-        return JointMovement(start, end, payload_weight, robot)
+        return JointMovement(
+            points3d_from_json((activity_json['start'], activity_json['end'])),
+            payload_weight,
+            robot,
+        )
+    elif movement_type == 'compound':
+        partial_movements = simple_movements_from_partial_json(
+            activity_json['partial_movements'], payload_weight, robot,
+        )
+        return CompoundMovement(partial_movements, payload_weight, robot)
     else:
         raise BadInputFileError(
-            'Partial movement type must be "linear" or "joint", not {}'.format(movement_type)
+            'Movement type must be "linear", "joint" or "compound", not {}'.format(movement_type)
         )
 
 
 def linear_movement_from_json(json_dict: Dict, robots: Dict[str, Robot]) -> Movement:
     return LinearMovement(
-        point3d_from_json(json_dict['start']),
-        point3d_from_json(json_dict['end']),
+        points3d_from_json((json_dict['start'], json_dict['end'])),
         json_dict['mass'],
         robots[json_dict['robot_id']]
     )
@@ -63,8 +119,7 @@ def linear_movement_from_json(json_dict: Dict, robots: Dict[str, Robot]) -> Move
 
 def joint_movement_from_json(json_dict: Dict, robots: Dict[str, Robot]) -> Movement:
     return JointMovement(
-        point3d_from_json(json_dict['start']),
-        point3d_from_json(json_dict['end']),
+        points3d_from_json((json_dict['start'], json_dict['end'])),
         json_dict['mass'],
         robots[json_dict['robot_id']]
     )
@@ -73,10 +128,7 @@ def joint_movement_from_json(json_dict: Dict, robots: Dict[str, Robot]) -> Movem
 def compound_movement_from_json(json_dict: Dict, robots: Dict[str, Robot]) -> Movement:
     mass = json_dict['mass']
     robot = robots[json_dict['robot_id']]
-    part_movements = [
-        simple_movement_from_partial_json(partial_json, mass, robot)
-        for partial_json in json_dict['parts']
-    ]
+    part_movements = simple_movements_from_partial_json(json_dict['parts'], mass, robot)
 
     return CompoundMovement(part_movements, mass, robot)
 
@@ -96,7 +148,7 @@ def movement_from_json(json_dict: Dict, robots: Dict[str, Robot]) -> Movement:
 
 def position_from_json(json_dict: Dict, robots: Dict[str, Robot]) -> Position:
     return Position(
-        point3d_from_json(json_dict['coordinates']),
+        points3d_from_json((json_dict['coordinates'],)),
         json_dict['mass'],
         robots[json_dict['robot_id']],
     )
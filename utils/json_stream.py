@@ -0,0 +1,150 @@
+import json
+import re
+from typing import Any, Iterator, TextIO
+
+from utils.bad_input_file_error import BadInputFileError
+
+DEFAULT_BUFFER_SIZE = 1 << 16
+
+_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+# complete string, unterminated string (needs more data) or a bracket
+_SKIP_RE = re.compile(r'"(?:[^"\\]|\\.)*"|"|[\[\]{}]')
+_NUMBER_CONTINUATION = '.eE+-'
+
+
+class JsonStreamReader:
+    """
+    Pull parser reading a JSON document from a text file incrementally. Objects and arrays can be traversed
+    key by key and element by element (iter_object, iter_array), their values are decoded (read_value) or skipped
+    (skip_value) one at a time, so only the currently read value and a small buffer are held in memory.
+
+    Each key yielded by iter_object and each step of iter_array has to be followed by exactly one call consuming
+    the value (read_value, skip_value, iter_object or iter_array).
+    """
+    def __init__(self, file: TextIO, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.file = file
+        self.buffer_size = buffer_size
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, size: int = 0) -> bool:
+        """
+        Drops consumed part of the buffer and reads at least given number of characters more.
+        Returns False at the end of the file.
+        """
+        if self._eof:
+            return False
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        data = self.file.read(max(size, self.buffer_size))
+        if data == '':
+            self._eof = True
+            return False
+        self._buffer += data
+        return True
+
+    def _peek(self) -> str:
+        """
+        Skips whitespace and returns the next character without consuming it ('' at the end of the file).
+        """
+        while True:
+            self._pos = _WHITESPACE_RE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char: str):
+        found = self._peek()
+        if found != char:
+            raise BadInputFileError('Invalid JSON: expected "{}", found "{}"'.format(char, found))
+        self._pos += 1
+
+    def _iter_container(self, start: str, end: str) -> Iterator[None]:
+        self._expect(start)
+        if self._peek() == end:
+            self._pos += 1
+            return
+        while True:
+            yield
+            char = self._peek()
+            self._pos += 1
+            if char == end:
+                return
+            if char != ',':
+                raise BadInputFileError('Invalid JSON: expected "," or "{}", found "{}"'.format(end, char))
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Traverses JSON object at the current position and yields its keys, the reader is positioned at the value.
+        """
+        for _ in self._iter_container('{', '}'):
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise BadInputFileError('Invalid JSON: object key must be a string, not {}'.format(key))
+            self._expect(':')
+            yield key
+
+    def iter_array(self) -> Iterator[None]:
+        """
+        Traverses JSON array at the current position, the reader is positioned at an element in each step.
+        """
+        return self._iter_container('[', ']')
+
+    def read_value(self) -> Any:
+        """
+        Decodes JSON value at the current position.
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # a number at the end of the buffer may continue in the not yet read data
+                # (e.g. "1" of "12" or "1." of "1.5", such characters cannot follow a complete value)
+                if self._eof or (end < len(self._buffer) and self._buffer[end] not in _NUMBER_CONTINUATION):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self._eof:
+                    raise BadInputFileError('Invalid JSON: {}'.format(e))
+            self._fill(len(self._buffer) - self._pos)
+
+    def skip_value(self):
+        """
+        Skips JSON value at the current position without decoding it.
+        """
+        if self._peek() not in ('{', '['):
+            self.read_value()
+            return
+
+        depth = 0
+        while True:
+            match = _SKIP_RE.search(self._buffer, self._pos)
+            if match is None or match.group() == '"':
+                self._pos = match.start() if match is not None else len(self._buffer)
+                if not self._fill(len(self._buffer) - self._pos):
+                    raise BadInputFileError('Invalid JSON: unexpected end of file')
+                continue
+            self._pos = match.end()
+            token = match.group()
+            if token in ('{', '['):
+                depth += 1
+            elif token in ('}', ']'):
+                depth -= 1
+                if depth == 0:
+                    return
+
+
+def read_top_level_value(filename: str, key: str, default: Any = None) -> Any:
+    """
+    Reads value of given key of the top-level JSON object in the file, other values are skipped without decoding.
+    """
+    with open(filename) as file:
+        reader = JsonStreamReader(file)
+        for found in reader.iter_object():
+            if found == key:
+                return reader.read_value()
+            reader.skip_value()
+    return default
@@ -0,0 +1,209 @@
+import cProfile
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Optional, Iterator, Callable, Any
+
+
+class PhaseStats:
+    """
+    Accumulated statistics of one phase: number of calls, wall and CPU time in seconds and peak memory
+    in bytes (peak of traced memory above the memory at the start of the phase, 0 if memory is not tracked).
+    Times of nested phases are included in their parents.
+    """
+    __slots__ = ('calls', 'wall_time', 'cpu_time', 'peak_memory')
+
+    def __init__(self):
+        self.calls = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_memory = 0
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'peak_memory': self.peak_memory,
+        }
+
+
+class _Frame:
+    __slots__ = ('name', 'wall_start', 'cpu_start', 'memory_start', 'peak')
+
+    def __init__(self, name: str, memory_start: int):
+        self.name = name
+        self.memory_start = memory_start
+        self.peak = memory_start
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+
+class Profiler:
+    """
+    Collects per-phase statistics of the optimization pipeline. Phases are marked in the code by phase context
+    managers and profiled decorators, which do nothing unless a profiling session is active.
+
+    If track_memory is True, peak memory of phases is measured by tracemalloc (which slows the code down).
+    If cprofile is True, the whole session also runs under cProfile and its statistics can be dumped
+    in pstats format. Only the current process is profiled, i.e. not the workers of parallel preprocessing.
+    """
+    def __init__(self, track_memory: bool = False, cprofile: bool = False):
+        self.track_memory = track_memory
+        self.stats: Dict[str, PhaseStats] = dict()
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self._stack: List[_Frame] = []
+
+    def _traced_peak(self) -> int:
+        return tracemalloc.get_traced_memory()[1] if self.track_memory else 0
+
+    def enter(self, name: str):
+        if self.track_memory:
+            if len(self._stack) > 0:
+                parent = self._stack[-1]
+                parent.peak = max(parent.peak, self._traced_peak())
+            tracemalloc.reset_peak()
+            self._stack.append(_Frame(name, tracemalloc.get_traced_memory()[0]))
+        else:
+            self._stack.append(_Frame(name, 0))
+
+    def exit(self):
+        frame = self._stack.pop()
+        stats = self.stats.get(frame.name)
+        if stats is None:
+            stats = self.stats[frame.name] = PhaseStats()
+        stats.calls += 1
+        stats.wall_time += time.perf_counter() - frame.wall_start
+        stats.cpu_time += time.process_time() - frame.cpu_start
+        if self.track_memory:
+            peak = max(frame.peak, self._traced_peak())
+            stats.peak_memory = max(stats.peak_memory, peak - frame.memory_start)
+            if len(self._stack) > 0:
+                self._stack[-1].peak = max(self._stack[-1].peak, peak)
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'phases': {name: stats.to_json_dict() for name, stats in sorted(self.stats.items())},
+        }
+
+    def save_json(self, filename: str):
+        with open(filename, 'w') as file:
+            json.dump(self.to_json_dict(), file, indent=2)
+
+    def dump_stats(self, filename: str):
+        """
+        Saves cProfile statistics of the session, they can be loaded by pstats.Stats or snakeviz.
+        """
+        if self.cprofile is None:
+            raise ValueError('The profiler was created without cProfile')
+        self.cprofile.dump_stats(filename)
+
+    def format_table(self) -> str:
+        """
+        Formats phase statistics as a text table sorted by wall time.
+        """
+        lines = ['{:<40} {:>8} {:>10} {:>10} {:>12}'.format('phase', 'calls', 'wall [s]', 'cpu [s]', 'peak [B]')]
+        for name, stats in sorted(self.stats.items(), key=lambda item: -item[1].wall_time):
+            lines.append('{:<40} {:>8} {:>10.4f} {:>10.4f} {:>12}'.format(
+                name, stats.calls, stats.wall_time, stats.cpu_time, stats.peak_memory
+            ))
+        return '\n'.join(lines)
+
+
+_active: Optional[Profiler] = None
+
+
+class _NoPhase:
+    """
+    Shared context manager of phases when profiling is disabled.
+    """
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+class _Phase:
+    __slots__ = ('profiler', 'name')
+
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.enter(self.name)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.exit()
+        return False
+
+
+def phase(name: str):
+    """
+    Returns a context manager measuring given phase in the active profiling session (no-op without a session).
+    """
+    if _active is None:
+        return _NO_PHASE
+    return _Phase(_active, name)
+
+
+def profiled(name: str) -> Callable:
+    """
+    Decorator measuring each call of the function as given phase in the active profiling session.
+    """
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return function(*args, **kwargs)
+            with _Phase(_active, name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def session(track_memory: bool = False, cprofile: bool = False) -> Iterator[Profiler]:
+    """
+    Runs a profiling session, phases executed inside it are recorded by the yielded profiler:
+
+        with profiling.session(cprofile=True) as profiler:
+            model.load_from_json(cell_json)
+            model.optimize()
+        profiler.save_json('profile.json')
+        profiler.dump_stats('profile.prof')
+    """
+    global _active
+    if _active is not None:
+        raise RuntimeError('A profiling session is already active')
+
+    profiler = Profiler(track_memory, cprofile)
+    started_tracing = track_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    _active = profiler
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    if profiler.cprofile is not None:
+        profiler.cprofile.enable()
+    try:
+        yield profiler
+    finally:
+        if profiler.cprofile is not None:
+            profiler.cprofile.disable()
+        profiler.wall_time = time.perf_counter() - wall_start
+        profiler.cpu_time = time.process_time() - cpu_start
+        _active = None
+        if started_tracing:
+            tracemalloc.stop()
@@ -0,0 +1,133 @@
+import json
+import zipfile
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+COLUMNS = ['robot_id', 'activity_id', 'start_time', 'duration', 'end_time', 'energy']
+"""
+Columns of a result file, one row for each activity.
+"""
+
+METADATA_KEY = 'metadata'
+
+Columns = Dict[str, np.ndarray]
+Result = Tuple[Columns, Dict[str, Any]]
+"""
+Result columns and run metadata (e.g. objective, MIP gap, build and solve time).
+"""
+
+_LOCAL_HEADER_SIZE = 30
+
+
+Row = Tuple[str, str, float, float, float, float]
+"""
+Values of COLUMNS for one activity.
+"""
+
+
+def rows_to_columns(rows: List[Row]) -> Columns:
+    """
+    Converts activity rows to result columns. Ids are stored as fixed-width unicode strings, so all columns
+    can be memory-mapped.
+    """
+    columns = {
+        'robot_id': np.array([row[0] for row in rows], dtype=str),
+        'activity_id': np.array([row[1] for row in rows], dtype=str),
+    }
+    for i, column in enumerate(COLUMNS[2:], 2):
+        columns[column] = np.array([row[i] for row in rows], dtype=float)
+    return columns
+
+
+def solution_columns(solution_json: Dict) -> Columns:
+    """
+    Converts a solution JSON dictionary (as created by Model.solution_json_dict) to result columns. The values
+    are rounded as in the JSON, Model.solution_columns gives columns of a solved model with full precision.
+    """
+    return rows_to_columns([
+        (robot['id'], activity['id']) + tuple(activity[column] for column in COLUMNS[2:])
+        for robot in solution_json['robots']
+        for activity in robot['activities']
+    ])
+
+
+def save_result(filename: str, solution_json: Dict, metadata: Dict[str, Any] = None):
+    """
+    Saves a solution as an uncompressed .npz file with a column array for each of COLUMNS and run metadata
+    (cycle time and given values) stored as a JSON string.
+    """
+    metadata = dict(metadata or dict())
+    if 'cycle_time' in solution_json:
+        metadata.setdefault('cycle_time', solution_json['cycle_time'])
+    save_columns(filename, solution_columns(solution_json), metadata)
+
+
+def save_columns(filename: str, columns: Columns, metadata: Dict[str, Any]):
+    """
+    Saves given columns and metadata as an uncompressed .npz file.
+    """
+    arrays = dict(columns)
+    arrays[METADATA_KEY] = np.array(json.dumps(metadata))
+    # members are stored uncompressed, so they can be memory-mapped by load_result
+    np.savez(filename, **arrays)
+
+
+def load_result(filename: str, mmap: bool = True) -> Result:
+    """
+    Loads columns and metadata of a result file. If mmap is True, columns are read-only memory-mapped views
+    of the file, i.e. nothing is read until the values are accessed.
+    """
+    columns = dict()
+    with zipfile.ZipFile(filename) as archive:
+        metadata = json.loads(str(np.load(archive.open(METADATA_KEY + '.npy'))))
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')]
+            if name == METADATA_KEY:
+                continue
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                columns[name] = _memmap_member(filename, info)
+            else:
+                columns[name] = np.load(archive.open(info))
+    return columns, metadata
+
+
+def _memmap_member(filename: str, info: zipfile.ZipInfo) -> np.ndarray:
+    """
+    Memory-maps an uncompressed .npy member of a .npz file. Data of a stored member follows its local header,
+    whose variable-length fields have to be read from the file.
+    """
+    with open(filename, 'rb') as file:
+        file.seek(info.header_offset)
+        header = file.read(_LOCAL_HEADER_SIZE)
+        name_length = int.from_bytes(header[26:28], 'little')
+        extra_length = int.from_bytes(header[28:30], 'little')
+        file.seek(info.header_offset + _LOCAL_HEADER_SIZE + name_length + extra_length)
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+        offset = file.tell()
+    if dtype.hasobject:
+        raise ValueError('Object arrays cannot be memory-mapped')
+    if int(np.prod(shape)) == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape,
+                     order='F' if fortran_order else 'C')
+
+
+def concatenate_results(results: List[Result]) -> Tuple[Columns, List[Dict[str, Any]]]:
+    """
+    Concatenates columns of given results into one table with an additional 'run' column (index of the result
+    in the list) and returns it with the list of run metadata.
+    """
+    columns = {
+        column: np.concatenate([result_columns[column] for result_columns, _ in results])
+        for column in COLUMNS
+    }
+    columns['run'] = np.concatenate([
+        np.full(len(result_columns[COLUMNS[0]]), i, dtype=np.int32)
+        for i, (result_columns, _) in enumerate(results)
+    ])
+    return columns, [metadata for _, metadata in results]
@@ -0,0 +1,281 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Pattern, Tuple, Union
+
+from utils.bad_input_file_error import BadInputFileError
+
+SCHEMA_FILENAME = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'json_schema', 'robotic_cell.schema.json')
+
+Path = List[Union[str, int]]
+Validator = Callable[[Any, Path, List[str]], None]
+"""
+Compiled schema validator, it appends errors of given value at given path to the list of errors.
+"""
+
+_TYPES = {
+    'object': lambda v: isinstance(v, dict),
+    'array': lambda v: isinstance(v, list),
+    'string': lambda v: isinstance(v, str),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'integer': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'null': lambda v: v is None,
+}
+
+
+def format_path(path: Path) -> str:
+    return '$' + ''.join('[{}]'.format(p) if isinstance(p, int) else '.{}'.format(p) for p in path)
+
+
+def _error(errors: List[str], path: Path, message: str):
+    errors.append('{}: {}'.format(format_path(path), message))
+
+
+class _SchemaCompiler:
+    """
+    Compiles a JSON schema into nested closures, so keywords are interpreted only once and validation of a value
+    is a sequence of plain Python checks. Supported keywords are type, properties, required, items, minItems,
+    oneOf, pattern, minimum, maximum, inclusiveMinimum (as minimum) and local references to $defs.
+    """
+    def __init__(self, root: Dict):
+        self.root = root
+        self.refs: Dict[str, Validator] = dict()
+
+    def compile(self, schema: Dict) -> Validator:
+        if '$ref' in schema:
+            return self._compile_ref(schema['$ref'])
+
+        checks: List[Validator] = []
+        if 'pattern' in schema:
+            checks.append(self._compile_pattern(schema['pattern']))
+        if 'minimum' in schema or 'inclusiveMinimum' in schema:
+            checks.append(self._compile_minimum(schema.get('minimum', schema.get('inclusiveMinimum'))))
+        if 'maximum' in schema:
+            checks.append(self._compile_maximum(schema['maximum']))
+        if 'required' in schema:
+            checks.append(self._compile_required(schema['required']))
+        if 'properties' in schema:
+            checks.append(self._compile_properties(schema['properties']))
+        if 'minItems' in schema:
+            checks.append(self._compile_min_items(schema['minItems']))
+        if 'items' in schema:
+            checks.append(self._compile_items(schema['items']))
+        if 'oneOf' in schema:
+            checks.append(self._compile_one_of(schema['oneOf']))
+
+        type_name = schema.get('type')
+        is_type = _TYPES[type_name] if type_name is not None else None
+
+        def validate(value: Any, path: Path, errors: List[str]):
+            if is_type is not None and not is_type(value):
+                _error(errors, path, '{} is not of type {}'.format(json.dumps(value), type_name))
+                return
+            for check in checks:
+                check(value, path, errors)
+
+        return validate
+
+    def _compile_ref(self, ref: str) -> Validator:
+        if ref not in self.refs:
+            # the reference is registered before compiling, so recursive schemas terminate
+            compiled: List[Validator] = []
+            self.refs[ref] = lambda value, path, errors: compiled[0](value, path, errors)
+            compiled.append(self.compile(self._resolve(ref)))
+        return self.refs[ref]
+
+    def _resolve(self, ref: str) -> Dict:
+        if not ref.startswith('#/'):
+            raise ValueError('Only local schema references are supported, not {}'.format(ref))
+        schema = self.root
+        for part in ref[2:].split('/'):
+            schema = schema[part]
+        return schema
+
+    @staticmethod
+    def _compile_pattern(pattern: str) -> Validator:
+        regex = re.compile(pattern)
+
+        def validate(value: Any, path: Path, errors: List[str]):
+            if isinstance(value, str) and regex.search(value) is None:
+                _error(errors, path, '"{}" does not match "{}"'.format(value, pattern))
+
+        return validate
+
+    @staticmethod
+    def _compile_minimum(minimum: float) -> Validator:
+        def validate(value: Any, path: Path, errors: List[str]):
+            if _TYPES['number'](value) and value < minimum:
+                _error(errors, path, '{} is less than the minimum of {}'.format(value, minimum))
+
+        return validate
+
+    @staticmethod
+    def _compile_maximum(maximum: float) -> Validator:
+        def validate(value: Any, path: Path, errors: List[str]):
+            if _TYPES['number'](value) and value > maximum:
+                _error(errors, path, '{} is greater than the maximum of {}'.format(value, maximum))
+
+        return validate
+
+    @staticmethod
+    def _compile_required(required: List[str]) -> Validator:
+        def validate(value: Any, path: Path, errors: List[str]):
+            if isinstance(value, dict):
+                for key in required:
+                    if key not in value:
+                        _error(errors, path, '"{}" is a required property'.format(key))
+
+        return validate
+
+    def _compile_properties(self, properties: Dict[str, Dict]) -> Validator:
+        validators = [(key, self.compile(schema)) for key, schema in properties.items()]
+
+        def validate(value: Any, path: Path, errors: List[str]):
+            if not isinstance(value, dict):
+                return
+            for key, validator in validators:
+                if key in value:
+                    path.append(key)
+                    validator(value[key], path, errors)
+                    path.pop()
+
+        return validate
+
+    @staticmethod
+    def _compile_min_items(min_items: int) -> Validator:
+        def validate(value: Any, path: Path, errors: List[str]):
+            if isinstance(value, list) and len(value) < min_items:
+                _error(errors, path, 'should have at least {} items'.format(min_items))
+
+        return validate
+
+    def _compile_items(self, items: Dict) -> Validator:
+        validator = self.compile(items)
+
+        def validate(value: Any, path: Path, errors: List[str]):
+            if not isinstance(value, list):
+                return
+            for i, item in enumerate(value):
+                path.append(i)
+                validator(item, path, errors)
+                path.pop()
+
+        return validate
+
+    def _compile_one_of(self, schemas: List[Dict]) -> Validator:
+        validators = [self.compile(schema) for schema in schemas]
+        discriminators = [self._discriminators(schema) for schema in schemas]
+
+        def validate(value: Any, path: Path, errors: List[str]):
+            # alternatives whose required pattern properties (e.g. activity type) do not match are rejected
+            # without full validation
+            candidates = [
+                validator for validator, checks in zip(validators, discriminators)
+                if not isinstance(value, dict) or all(
+                    key in value and isinstance(value[key], str) and regex.search(value[key]) is not None
+                    for key, regex in checks
+                )
+            ]
+            if len(candidates) == 0:
+                _error(errors, path, 'does not match any of the allowed alternatives')
+                return
+
+            branch_errors = []
+            for validator in candidates:
+                branch_errors.append([])
+                validator(value, path, branch_errors[-1])
+            matched = sum(1 for e in branch_errors if len(e) == 0)
+            if matched == 0:
+                # reports errors of the closest alternative
+                errors.extend(min(branch_errors, key=len))
+            elif matched > 1:
+                _error(errors, path, 'matches more than one of the allowed alternatives')
+
+        return validate
+
+    def _discriminators(self, schema: Dict) -> List[Tuple[str, Pattern]]:
+        """
+        Returns required string properties of given schema restricted by a pattern.
+        """
+        while '$ref' in schema:
+            schema = self._resolve(schema['$ref'])
+        properties = schema.get('properties', dict())
+        return [
+            (key, re.compile(properties[key]['pattern']))
+            for key in schema.get('required', [])
+            if 'pattern' in properties.get(key, dict())
+        ]
+
+
+def compile_schema(schema: Dict) -> Validator:
+    """
+    Compiles given JSON schema into a validator.
+    """
+    return _SchemaCompiler(schema).compile(schema)
+
+
+@lru_cache(maxsize=None)
+def load_validator(schema_filename: str = SCHEMA_FILENAME) -> Validator:
+    """
+    Returns compiled validator of given JSON schema file. The schema is compiled once per process.
+    """
+    with open(schema_filename) as file:
+        return compile_schema(json.load(file))
+
+
+def cell_reference_errors(cell_json: Dict) -> List[str]:
+    """
+    Checks cross-references of robotic cell JSON which JSON schema cannot express: robot and activity ids
+    are unique and time offsets and collisions refer to existing activities.
+    """
+    errors = []
+    robot_ids, activity_ids = set(), set()
+    for i, robot in enumerate(cell_json.get('robots', [])):
+        if not isinstance(robot, dict):
+            continue
+        robot_id = robot.get('id')
+        if robot_id in robot_ids:
+            _error(errors, ['robots', i, 'id'], 'duplicate robot id "{}"'.format(robot_id))
+        robot_ids.add(robot_id)
+        activities = robot.get('activities', [])
+        for j, activity in enumerate(activities if isinstance(activities, list) else []):
+            if not isinstance(activity, dict) or 'id' not in activity:
+                continue
+            if activity['id'] in activity_ids:
+                _error(errors, ['robots', i, 'activities', j, 'id'], 'duplicate activity id "{}"'.format(
+                    activity['id']
+                ))
+            activity_ids.add(activity['id'])
+
+    for key in ('time_offsets', 'collisions'):
+        pairs = cell_json.get(key, [])
+        for i, pair in enumerate(pairs if isinstance(pairs, list) else []):
+            if not isinstance(pair, dict):
+                continue
+            for id_key in ('a_id', 'b_id'):
+                if id_key in pair and pair[id_key] not in activity_ids:
+                    _error(errors, [key, i, id_key], 'unknown activity id "{}"'.format(pair[id_key]))
+    return errors
+
+
+def validate_cell(cell_json: Any, schema_filename: str = SCHEMA_FILENAME) -> List[str]:
+    """
+    Validates robotic cell JSON against the JSON schema and checks its cross-references.
+    Returns all found errors, empty list for a valid cell.
+    """
+    errors = []
+    load_validator(schema_filename)(cell_json, [], errors)
+    if isinstance(cell_json, dict):
+        errors.extend(cell_reference_errors(cell_json))
+    return errors
+
+
+def check_cell(cell_json: Any, schema_filename: str = SCHEMA_FILENAME):
+    """
+    Validates robotic cell JSON, if it is not valid, throws BadInputFileError with all found errors.
+    """
+    errors = validate_cell(cell_json, schema_filename)
+    if len(errors) > 0:
+        raise BadInputFileError('Invalid robotic cell ({} errors):\n{}'.format(len(errors), '\n'.join(errors)))